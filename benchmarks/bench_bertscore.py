@@ -0,0 +1,61 @@
+#!/usr/bin/env python3
+"""Per-pair vs batched BERTScore on synthetic (hypothesis, 3 references) pairs.
+
+    python benchmarks/bench_bertscore.py --pairs 2000 --model roberta-large
+"""
+from __future__ import annotations
+import argparse
+import random
+import time
+
+from bert_score import BERTScorer
+
+from rag_eval.metrics import bertscore_best, bertscore_best_batch
+
+WORDS = (
+    "mercury planet sun exosphere atmosphere temperature rotation resonance surface crater "
+    "columbus spain voyage caribbean trade gold spices colonization smoke carcinogen dna mutation "
+    "tumor cancer network loss gradient weights epoch beethoven bonn germany berlin spree river "
+    "the a of and in to with by from is has was closest slow extreme heavily"
+).split()
+
+
+def synth_sentence(rng: random.Random) -> str:
+    return " ".join(rng.choice(WORDS) for _ in range(rng.randint(15, 40))) + "."
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--pairs", type=int, default=2000)
+    parser.add_argument("--refs-per-example", type=int, default=3)
+    parser.add_argument("--hyps-per-example", type=int, default=4, help="models × modes sharing one ref set")
+    parser.add_argument("--model", default="roberta-large")
+    parser.add_argument("--batch-size", type=int, default=64)
+    parser.add_argument("--skip-per-pair", action="store_true", help="Only time the batched path")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    n_examples = max(1, args.pairs // args.hyps_per_example)
+    ref_sets = [[synth_sentence(rng) for _ in range(args.refs_per_example)] for _ in range(n_examples)]
+    hyps = [synth_sentence(rng) for _ in range(args.pairs)]
+    refs = [ref_sets[i % n_examples] for i in range(args.pairs)]
+
+    scorer = BERTScorer(model_type=args.model, lang="en", rescale_with_baseline=True)
+
+    t0 = time.perf_counter()
+    batched = bertscore_best_batch(hyps, refs, scorer, batch_size=args.batch_size)
+    t_batch = time.perf_counter() - t0
+    print(f"batched : {args.pairs} pairs in {t_batch:8.2f}s  ({args.pairs / t_batch:8.1f} pairs/s)")
+
+    if not args.skip_per_pair:
+        t0 = time.perf_counter()
+        per_pair = [bertscore_best(h, r, scorer) for h, r in zip(hyps, refs)]
+        t_pair = time.perf_counter() - t0
+        print(f"per-pair: {args.pairs} pairs in {t_pair:8.2f}s  ({args.pairs / t_pair:8.1f} pairs/s)")
+        print(f"speedup : {t_pair / t_batch:.1f}x")
+        print(f"max |Δ| : {max(abs(a - b) for a, b in zip(per_pair, batched)):.2e}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,139 @@
+#!/usr/bin/env python3
+"""End-to-end throughput of the CLI against the bundled mock server, across dataset sizes and concurrency.
+
+    python benchmarks/bench_end_to_end.py --sizes 20 100 --concurrency 1 4 16 --latency lognormal:0.2,0.5
+    python benchmarks/bench_end_to_end.py --sizes 50 --concurrency 8 --stream --json e2e.json
+
+Each cell runs scripts/run_eval.py (cli.main) in a fresh process in a scratch
+directory, with the LLM cache and BERTScore off, and records examples/sec, the
+child's peak RSS and the mean per-stage times from its profile.json.
+"""
+from __future__ import annotations
+import argparse
+import glob
+import json
+import os
+import random
+import re
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Any, Dict, List, Tuple
+
+from rag_eval.data import Example, build_examples, write_examples_jsonl
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+STAGES = ("context", "answer", "answer_ttft", "latency", "rouge", "bleu")
+
+
+def synthetic_examples(n: int, seed: int) -> List[Example]:
+    """n examples cycled from the built-in set; each query gets a suffix so no two requests are identical."""
+    rng = random.Random(seed)
+    base = build_examples()
+    out = []
+    for i in range(n):
+        ex = base[i % len(base)]
+        paths = rng.sample(ex.paths, len(ex.paths))
+        out.append(Example(f"{ex.query} (variant {i})", paths, list(ex.gold_refs)))
+    return out
+
+
+def _env(base_url: str) -> Dict[str, str]:
+    env = dict(os.environ)
+    env.update(
+        PYTHONPATH=ROOT + os.pathsep + env.get("PYTHONPATH", ""),
+        OPENAI_API_KEY="mock",
+        OPENAI_BASE_URL=base_url,
+        TOKENIZERS_PARALLELISM="false",
+    )
+    return env
+
+
+def start_mock(args: argparse.Namespace) -> Tuple[subprocess.Popen, str]:
+    cmd = [
+        sys.executable, "-m", "rag_eval.mock_server", "--port", "0", "--latency", args.latency,
+        "--token-latency", str(args.token_latency), "--error-rate", str(args.error_rate), "--seed", str(args.seed),
+    ]
+    proc = subprocess.Popen(cmd, stdout=subprocess.PIPE, text=True, env=_env(""))
+    line = proc.stdout.readline()
+    m = re.search(r"(http://\S+)", line)
+    if not m:
+        proc.kill()
+        raise RuntimeError(f"Mock server did not start: {line!r}")
+    return proc, m.group(1)
+
+
+def run_cell(dataset: str, n_models: int, concurrency: int, base_url: str, extra: List[str]) -> Dict[str, Any]:
+    """Run the CLI once; returns wall time, peak RSS (MiB) and per-stage means (s)."""
+    models = [f"mock-{i}" for i in range(n_models)]
+    with tempfile.TemporaryDirectory() as cwd:
+        cmd = [
+            sys.executable, os.path.join(ROOT, "scripts", "run_eval.py"), "--dataset", dataset,
+            "--models", *models, "--concurrency", str(concurrency), "--no-cache", "--no-bertscore", *extra,
+        ]
+        t0 = time.perf_counter()
+        proc = subprocess.Popen(cmd, cwd=cwd, env=_env(base_url), stdout=subprocess.PIPE, stderr=subprocess.STDOUT)
+        out = proc.stdout.read()
+        _, status, usage = os.wait4(proc.pid, 0)
+        wall = time.perf_counter() - t0
+        if os.waitstatus_to_exitcode(status) != 0:
+            raise RuntimeError(f"run_eval.py failed:\n{out.decode(errors='replace')[-2000:]}")
+        profiles = glob.glob(os.path.join(cwd, "outputs", "*", "profile.json"))
+        with open(profiles[0], encoding="utf-8") as f:
+            profile = json.load(f)
+
+    totals: Dict[str, List[float]] = {}
+    for by_mode in profile.values():
+        for entry in by_mode.values():
+            for stage, st in entry["stages"].items():
+                t = totals.setdefault(stage, [0.0, 0])
+                t[0] += st["total_s"]
+                t[1] += st["n"]
+    stages = {s: totals[s][0] / totals[s][1] for s in STAGES if s in totals and totals[s][1]}
+    return {"wall_s": wall, "peak_rss_mib": usage.ru_maxrss / 1024.0, "stages": stages}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[20, 100], help="Examples per dataset")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 4, 16])
+    parser.add_argument("--models", type=int, default=2, help="Answer models per run")
+    parser.add_argument("--latency", default="lognormal:0.2,0.5", help="Mock latency spec (see rag_eval.mock_server)")
+    parser.add_argument("--token-latency", type=float, default=0.0)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--stream", action="store_true", help="Pass --stream to the CLI (records TTFT)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--json", default=None, metavar="PATH", help="Also write the results as JSON")
+    args = parser.parse_args()
+
+    extra = ["--stream"] if args.stream else []
+    mock, base_url = start_mock(args)
+    results: List[Dict[str, Any]] = []
+    try:
+        with tempfile.TemporaryDirectory() as d:
+            print(f"mock server {base_url}, latency {args.latency}, {args.models} models")
+            print(f"{'examples':>8s} {'conc':>5s} {'wall s':>8s} {'ex/s':>8s} {'RSS MiB':>8s} "
+                  + " ".join(f"{s:>12s}" for s in STAGES))
+            for size in args.sizes:
+                dataset = os.path.join(d, f"examples_{size}.jsonl")
+                write_examples_jsonl(synthetic_examples(size, args.seed), dataset)
+                for conc in args.concurrency:
+                    r = run_cell(dataset, args.models, conc, base_url, extra)
+                    r.update(examples=size, concurrency=conc, examples_per_s=size / r["wall_s"])
+                    results.append(r)
+                    stage_cols = " ".join(
+                        f"{r['stages'][s]:>12.4f}" if s in r["stages"] else f"{'-':>12s}" for s in STAGES
+                    )
+                    print(f"{size:>8d} {conc:>5d} {r['wall_s']:>8.2f} {r['examples_per_s']:>8.2f}"
+                          f" {r['peak_rss_mib']:>8.1f} {stage_cols}")
+    finally:
+        mock.terminate()
+        mock.wait()
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump({"args": vars(args), "results": results}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
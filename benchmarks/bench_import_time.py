@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+"""Import time of the CLI (python -X importtime) and a guard against heavy imports creeping back in.
+
+    python benchmarks/bench_import_time.py --runs 5 --max-ms 500
+
+Exits non-zero if `import rag_eval.cli` pulls in any of HEAVY_MODULES or, with
+--max-ms, takes longer than that (best of --runs), so it can run in CI.
+"""
+from __future__ import annotations
+import argparse
+import os
+import subprocess
+import sys
+import time
+from typing import Dict, List, Tuple
+
+# Modules that must only be imported once they are needed (scoring, API calls).
+HEAVY_MODULES = (
+    "torch", "transformers", "bert_score", "rouge_score", "nltk", "sacrebleu", "openai", "tiktoken",
+    "numpy", "pyarrow", "http.server",
+)
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def _env() -> Dict[str, str]:
+    env = dict(os.environ)
+    env["PYTHONPATH"] = ROOT + os.pathsep + env.get("PYTHONPATH", "")
+    return env
+
+
+def importtime(module: str) -> List[Tuple[str, int, int]]:
+    """(module, self µs, cumulative µs) for every import made by `import module` in a fresh interpreter."""
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        capture_output=True, text=True, env=_env(), check=True,
+    )
+    out = []
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cum_us, name = line[len("import time:"):].split("|")
+        out.append((name.strip(), int(self_us), int(cum_us)))
+    return out
+
+
+def loaded_heavy(module: str) -> List[str]:
+    code = f"import sys, {module}; print(' '.join(m for m in {HEAVY_MODULES!r} if m in sys.modules))"
+    proc = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, env=_env(), check=True)
+    return proc.stdout.split()
+
+
+def help_wall_s() -> float:
+    t0 = time.perf_counter()
+    subprocess.run(
+        [sys.executable, os.path.join(ROOT, "scripts", "run_eval.py"), "--help"],
+        capture_output=True, env=_env(), check=True,
+    )
+    return time.perf_counter() - t0
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--module", default="rag_eval.cli")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--top", type=int, default=10, help="Slowest imports to list")
+    parser.add_argument("--max-ms", type=float, default=None, help="Fail if the best cumulative import time exceeds this")
+    args = parser.parse_args()
+
+    best: List[Tuple[str, int, int]] = []
+    best_total = None
+    for _ in range(args.runs):
+        rows = importtime(args.module)
+        total = next(cum for name, _, cum in rows if name == args.module)
+        if best_total is None or total < best_total:
+            best, best_total = rows, total
+    help_s = min(help_wall_s() for _ in range(args.runs))
+
+    print(f"import {args.module}: {best_total / 1000:.1f} ms (best of {args.runs}); run_eval.py --help: {help_s * 1000:.0f} ms wall")
+    print("slowest imports by self time:")
+    for name, self_us, cum_us in sorted(best, key=lambda r: r[1], reverse=True)[:args.top]:
+        print(f"  {self_us / 1000:8.1f} ms self {cum_us / 1000:8.1f} ms cumulative  {name}")
+
+    failed = False
+    heavy = loaded_heavy(args.module)
+    if heavy:
+        print(f"FAIL: importing {args.module} loads {', '.join(heavy)}")
+        failed = True
+    if args.max_ms is not None and best_total / 1000 > args.max_ms:
+        print(f"FAIL: {best_total / 1000:.1f} ms > --max-ms {args.max_ms}")
+        failed = True
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,117 @@
+#!/usr/bin/env python3
+"""Resident bytes per edge for dict-backed dataclasses, slotted Node/Edge/Path, and PathStore.
+
+    python benchmarks/bench_memory.py --paths 200000 --hops 3
+"""
+from __future__ import annotations
+import argparse
+import gc
+import random
+import tracemalloc
+from dataclasses import dataclass
+from typing import Callable, List
+
+from rag_eval.data import Edge, Node, Path
+from rag_eval.formatters import linearize_path
+from rag_eval.pathstore import PathStore
+
+
+# The original (pre-slots) representation, kept here as the baseline.
+@dataclass
+class DictNode:
+    id: str
+    text: str
+
+@dataclass
+class DictEdge:
+    src: str
+    dst: str
+    relation: str
+
+@dataclass
+class DictPath:
+    nodes: List[DictNode]
+    edges: List[DictEdge]
+
+
+def _spec(n_paths: int, hops: int, n_nodes: int, n_rel: int, seed: int):
+    rng = random.Random(seed)
+    return [[rng.randrange(n_nodes) for _ in range(hops + 1)] for _ in range(n_paths)], [
+        rng.randrange(n_rel) for _ in range(n_paths * hops)
+    ]
+
+
+def build_dict(spec, n_nodes: int, n_rel: int, hops: int):
+    walks, rels = spec
+    nodes = [DictNode(f"N{i}", f"Node {i} text.") for i in range(n_nodes)]
+    out, k = [], 0
+    for w in walks:
+        edges = []
+        for a, b in zip(w, w[1:]):
+            # ids/relations rebuilt per edge, as json.loads would produce them
+            edges.append(DictEdge(f"N{a}", f"N{b}", f"rel_{rels[k]}"))
+            k += 1
+        out.append(DictPath([nodes[i] for i in w], edges))
+    return out
+
+
+def build_slotted(spec, n_nodes: int, n_rel: int, hops: int):
+    walks, rels = spec
+    nodes = [Node(f"N{i}", f"Node {i} text.") for i in range(n_nodes)]
+    rel_names = [f"rel_{i}" for i in range(n_rel)]
+    out, k = [], 0
+    for w in walks:
+        edges = []
+        for a, b in zip(w, w[1:]):
+            edges.append(Edge(nodes[a].id, nodes[b].id, rel_names[rels[k]]))
+            k += 1
+        out.append(Path([nodes[i] for i in w], edges))
+    return out
+
+
+def build_store(spec, n_nodes: int, n_rel: int, hops: int):
+    store = PathStore()
+    for p in build_slotted(spec, n_nodes, n_rel, hops):  # transient; only the store is retained
+        store.add_path(p)
+    return store
+
+
+def measure(fn: Callable, *args):
+    gc.collect()
+    tracemalloc.start()
+    obj = fn(*args)
+    gc.collect()
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return obj, current
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--paths", type=int, default=200_000)
+    parser.add_argument("--hops", type=int, default=3)
+    parser.add_argument("--nodes", type=int, default=50_000)
+    parser.add_argument("--relations", type=int, default=200)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    spec = _spec(args.paths, args.hops, args.nodes, args.relations, args.seed)
+    n_edges = args.paths * args.hops
+    print(f"{args.paths} paths, {n_edges} edges, {args.nodes} nodes, {args.relations} relations")
+
+    results = {}
+    for name, fn in (("dataclass+dict", build_dict), ("slotted", build_slotted), ("PathStore", build_store)):
+        obj, nbytes = measure(fn, spec, args.nodes, args.relations, args.hops)
+        results[name] = obj
+        print(f"{name:>15s}: {nbytes / 2**20:9.1f} MiB  {nbytes / n_edges:7.1f} bytes/edge")
+        del obj
+
+    sample = range(0, args.paths, max(1, args.paths // 100))
+    same = all(
+        linearize_path(results["slotted"][i]) == linearize_path(results["PathStore"][i]) for i in sample
+    )
+    print(f"linearize_path identical on sampled paths: {same}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,57 @@
+#!/usr/bin/env python3
+"""Per-pair rouge_best/bleu_multi_ref vs a cached ReferenceIndex over many hypotheses.
+
+    python benchmarks/bench_reference_index.py --hyps 100000
+"""
+from __future__ import annotations
+import argparse
+import random
+import time
+
+from rouge_score import rouge_scorer
+
+from rag_eval.data import build_examples
+from rag_eval.metrics import bleu_multi_ref, reference_index, rouge_best
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--hyps", type=int, default=100_000)
+    parser.add_argument("--baseline-hyps", type=int, default=5_000, help="Per-pair path is timed on this subset")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    exs = build_examples()
+    vocab = " ".join(r for ex in exs for r in ex.gold_refs).split()
+    work = []
+    for i in range(args.hyps):
+        ex = exs[i % len(exs)]
+        work.append((" ".join(rng.choice(vocab) for _ in range(rng.randint(15, 40))), ex.gold_refs))
+
+    t0 = time.perf_counter()
+    indexed = []
+    for hyp, refs in work:
+        idx = reference_index(refs)
+        indexed.append((idx.rouge(hyp), idx.bleu(hyp)))
+    t_idx = time.perf_counter() - t0
+    print(f"ReferenceIndex: {args.hyps} hyps in {t_idx:8.2f}s  ({args.hyps / t_idx:9.1f} hyps/s)")
+
+    n = min(args.baseline_hyps, args.hyps)
+    rouge = rouge_scorer.RougeScorer(["rouge1", "rougeL"], use_stemmer=True)
+    t0 = time.perf_counter()
+    baseline = [(rouge_best(h, refs, rouge), bleu_multi_ref(h, refs)) for h, refs in work[:n]]
+    t_base = time.perf_counter() - t0
+    print(f"per-pair      : {n} hyps in {t_base:8.2f}s  ({n / t_base:9.1f} hyps/s)")
+    print(f"speedup       : {(args.hyps / t_idx) / (n / t_base):.1f}x")
+
+    mismatches = sum(
+        1
+        for (r_a, b_a), (r_b, b_b) in zip(baseline, indexed)
+        if any(f"{r_a[k]:.4f}" != f"{r_b[k]:.4f}" for k in r_a) or f"{b_a:.4f}" != f"{b_b:.4f}"
+    )
+    print(f"rows differing at 4 decimals: {mismatches}/{n}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+"""Graph build time, memory and flow-pruned path retrieval throughput for growing graph sizes.
+
+    python benchmarks/bench_retrieval.py --edges 100000 1000000 3000000 --queries 200
+"""
+from __future__ import annotations
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+from collections import deque
+from typing import List
+
+from rag_eval.retrieval import Graph, PathRetriever, write_graph_jsonl
+
+
+def random_graph(n_edges: int, avg_degree: float, n_rel: int, seed: int) -> Graph:
+    """Graph whose edge endpoints are drawn with a skew toward low node numbers (a few hubs, a long tail)."""
+    rng = random.Random(seed)
+    n_nodes = max(2, int(2 * n_edges / avg_degree))
+    g = Graph()
+    for i in range(n_nodes):
+        g.add_node(f"N{i}", f"Node {i} text.")
+    rel_names = [f"rel_{i}" for i in range(n_rel)]
+    for _ in range(n_edges):
+        a = int(n_nodes * rng.random() ** 2)
+        b = rng.randrange(n_nodes)
+        g.add_edge(f"N{a}", f"N{b}", rel_names[rng.randrange(n_rel)])
+    return g.build()
+
+
+def graph_bytes(g: Graph) -> int:
+    """Resident bytes of a Graph: CSR and edge arrays plus the id/text/relation tables and their strings."""
+    total = sum(sys.getsizeof(a) for a in (g._src, g._dst, g._rel, g.offsets, g.targets, g.rels))
+    for table in (g.ids, g.texts, g.relations, g._index, g._rel_index):
+        total += sys.getsizeof(table)
+    total += sum(sys.getsizeof(x) for x in g.ids) + sum(sys.getsizeof(x) for x in g.texts)
+    total += sum(sys.getsizeof(x) for x in g.relations)
+    return total
+
+
+def local_seeds(g: Graph, rng: random.Random, n_seeds: int, radius: int) -> List[str]:
+    """A random node plus up to n_seeds - 1 others within `radius` hops, so paths between them exist."""
+    start = rng.randrange(len(g))
+    seen = {start}
+    frontier = deque([(start, 0)])
+    while frontier and len(seen) < 50 * n_seeds:
+        u, d = frontier.popleft()
+        if d == radius:
+            continue
+        for v, _ in g.neighbors(u):
+            if v not in seen:
+                seen.add(v)
+                frontier.append((v, d + 1))
+    others = rng.sample(sorted(seen - {start}), min(n_seeds - 1, len(seen) - 1))
+    return [g.ids[i] for i in [start] + others]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--edges", type=int, nargs="+", default=[100_000, 1_000_000])
+    parser.add_argument("--avg-degree", type=float, default=8.0)
+    parser.add_argument("--relations", type=int, default=200)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--seeds", type=int, default=5, help="Seed nodes per query")
+    parser.add_argument("--max-hops", type=int, default=3)
+    parser.add_argument("--threshold", type=float, default=0.05)
+    parser.add_argument("--top-k", type=int, default=10)
+    parser.add_argument("--via-file", action="store_true", help="Also time Graph.load from a .jsonl.gz graph file")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    print(f"{'edges':>10s} {'nodes':>10s} {'build s':>8s} {'MiB':>8s} {'B/edge':>7s} {'CSR MiB':>8s}"
+          f" {'load s':>7s} {'queries/s':>10s} {'paths/s':>10s} {'paths/q':>8s}")
+    for n_edges in args.edges:
+        t0 = time.perf_counter()
+        g = random_graph(n_edges, args.avg_degree, args.relations, args.seed)
+        build_s = time.perf_counter() - t0
+        nbytes = graph_bytes(g)
+
+        load_s = float("nan")
+        if args.via_file:
+            with tempfile.TemporaryDirectory() as d:
+                path = os.path.join(d, "graph.jsonl.gz")
+                edges = ((g.ids[s], g.ids[t], g.relations[r]) for s, t, r in zip(g._src, g._dst, g._rel))
+                write_graph_jsonl(zip(g.ids, g.texts), edges, path)
+                t0 = time.perf_counter()
+                Graph.load(path)
+                load_s = time.perf_counter() - t0
+
+        rng = random.Random(args.seed + 1)
+        queries = [local_seeds(g, rng, args.seeds, radius=args.max_hops - 1) for _ in range(args.queries)]
+        retriever = PathRetriever(g, max_hops=args.max_hops, threshold=args.threshold, top_k=args.top_k)
+        n_paths = 0
+        t0 = time.perf_counter()
+        for seeds in queries:
+            n_paths += len(retriever.retrieve("", seeds=seeds))
+        search_s = time.perf_counter() - t0
+
+        print(
+            f"{n_edges:>10d} {len(g):>10d} {build_s:>8.2f} {nbytes / 2**20:>8.1f} {nbytes / n_edges:>7.1f}"
+            f" {g.nbytes() / 2**20:>8.1f} {load_s:>7.2f} {len(queries) / search_s:>10.1f}"
+            f" {n_paths / search_s:>10.1f} {n_paths / len(queries):>8.2f}"
+        )
+        del g, retriever
+
+
+if __name__ == "__main__":
+    main()
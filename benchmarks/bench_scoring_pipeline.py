@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+"""Units/sec of inline scoring vs the ScoringPool, with generation simulated by a fixed delay per unit.
+
+    python benchmarks/bench_scoring_pipeline.py --units 400 --gen-ms 20 --workers 4
+    python benchmarks/bench_scoring_pipeline.py --bertscore-model roberta-large   # include BERTScore
+"""
+from __future__ import annotations
+import argparse
+import random
+import time
+from typing import Iterator, List, Optional
+
+from rag_eval.data import Example, build_examples
+from rag_eval.metrics import shared_bertscorer
+from rag_eval.runner import fill_bertscore, score_answers
+from rag_eval.scoring import ScoreJob, ScoringPool
+
+
+def _jobs(n: int, seed: int) -> List[ScoreJob]:
+    rng = random.Random(seed)
+    exs = build_examples()
+    words = " ".join(r for ex in exs for r in ex.gold_refs).split()
+    jobs = []
+    for i in range(n):
+        ex = exs[i % len(exs)]
+        answers = {m: " ".join(rng.choice(words) for _ in range(rng.randint(15, 40))) for m in ("concat", "fluent")}
+        jobs.append(ScoreJob(f"m{i % 2}", ex.query, ex.gold_refs, answers))
+    return jobs
+
+
+def generated(jobs: List[ScoreJob], gen_s: float) -> Iterator[ScoreJob]:
+    """Yield jobs at the rate a generation stage with `gen_s` seconds per unit would (sleep releases the CPU)."""
+    for job in jobs:
+        time.sleep(gen_s)
+        yield job
+
+
+def run_inline(jobs: List[ScoreJob], gen_s: float, bertscore_model: Optional[str], batch_size: int) -> float:
+    scorer = shared_bertscorer(bertscore_model) if bertscore_model else None
+    t0 = time.perf_counter()
+    for job in generated(jobs, gen_s):
+        rows = score_answers(Example(job.query, [], job.gold_refs), job.model, job.answers, None, None)
+        if scorer is not None:
+            fill_bertscore(rows, [job.gold_refs] * len(rows), scorer, batch_size=batch_size)
+    return time.perf_counter() - t0
+
+
+def run_pool(jobs: List[ScoreJob], gen_s: float, bertscore_model: Optional[str], batch_size: int, workers: int) -> float:
+    with ScoringPool(workers, bertscore_model, batch_size=batch_size) as pool:
+        list(pool.score((None, j) for j in _jobs(workers * 4, 1)))  # warm up: workers load their models
+        t0 = time.perf_counter()
+        n = sum(1 for _ in pool.score((None, j) for j in generated(jobs, gen_s)))
+        elapsed = time.perf_counter() - t0
+    assert n == len(jobs)
+    return elapsed
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--units", type=int, default=400)
+    parser.add_argument("--gen-ms", type=float, default=20.0, help="Simulated generation time per unit")
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--bertscore-model", default=None)
+    parser.add_argument("--batch-size", type=int, default=64)
+    args = parser.parse_args()
+
+    jobs = _jobs(args.units, 0)
+    gen_s = args.gen_ms / 1000.0
+    t_gen = args.units * gen_s
+    t_score = run_inline(jobs, 0.0, args.bertscore_model, args.batch_size)
+    t_inline = run_inline(jobs, gen_s, args.bertscore_model, args.batch_size)
+    t_pool = run_pool(jobs, gen_s, args.bertscore_model, args.batch_size, args.workers)
+    print(f"{args.units} units, generation {args.gen_ms:.0f} ms/unit, {args.workers} scoring workers")
+    print(f"  generation only : {args.units / t_gen:8.1f} units/s")
+    print(f"  scoring only    : {args.units / t_score:8.1f} units/s (inline, one process)")
+    print(f"  inline pipeline : {args.units / t_inline:8.1f} units/s")
+    print(f"  ScoringPool     : {args.units / t_pool:8.1f} units/s")
+
+
+if __name__ == "__main__":
+    main()
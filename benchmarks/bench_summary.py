@@ -0,0 +1,77 @@
+#!/usr/bin/env python3
+"""Summary-step time for large result sets: per-row Python aggregation vs ResultTable, plus paired bootstrap.
+
+    python benchmarks/bench_summary.py --rows 1000000 --models 4 --bootstrap 1000
+"""
+from __future__ import annotations
+import argparse
+import random
+import time
+from typing import Any, Dict, List
+
+from rag_eval.profiling import percentile
+from rag_eval.results import METRIC_FIELDS, ResultTable
+
+
+def synthetic_rows(n_rows: int, n_models: int, seed: int) -> List[Dict[str, Any]]:
+    """Detailed rows as the CLI produces them (float metrics, other columns as strings),
+    concat/fluent pairs per (model, example)."""
+    rng = random.Random(seed)
+    rows = []
+    for i in range(n_rows // 2):
+        model, example = f"model-{i % n_models}", str(i // n_models + 1)
+        for mode, shift in (("concat", 0.0), ("fluent", 0.01)):
+            row = {m: min(1.0, rng.random() * 0.6 + shift) for m in METRIC_FIELDS}
+            row.update(
+                model=model, mode=mode, example=example, context_tokens=str(rng.randint(80, 400)),
+                ttft_s=f"{rng.random():.6f}", latency_s=f"{rng.random() * 2:.6f}",
+            )
+            rows.append(row)
+    return rows
+
+
+def per_row_summary(rows: List[Dict[str, Any]]) -> int:
+    """The dict-grouping, float()-per-value aggregation ResultTable replaces (for timing only)."""
+    groups: Dict[tuple, List[Dict[str, Any]]] = {}
+    for r in rows:
+        groups.setdefault((r["model"], r["mode"]), []).append(r)
+    for items in groups.values():
+        n = len(items)
+        for m in METRIC_FIELDS:
+            sum(float(x[m]) for x in items) / n
+        [int(x["context_tokens"]) for x in items if x.get("context_tokens")]
+        [float(x["ttft_s"]) for x in items if x.get("ttft_s")]
+        percentile(sorted(float(x["latency_s"]) for x in items if x.get("latency_s")), 95)
+    return len(groups)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--models", type=int, default=4)
+    parser.add_argument("--bootstrap", type=int, default=1000)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    rows = synthetic_rows(args.rows, args.models, args.seed)
+    t0 = time.perf_counter()
+    per_row_summary(rows)
+    t_rows = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    table = ResultTable.from_rows(rows)
+    table.summary()
+    t_table = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    deltas = table.paired_deltas(n_boot=args.bootstrap, seed=args.seed)
+    t_delta = time.perf_counter() - t0
+
+    print(f"{len(rows)} rows, {args.models} models")
+    print(f"  per-row summary     : {t_rows:7.2f} s")
+    print(f"  ResultTable summary : {t_table:7.2f} s")
+    print(f"  paired deltas       : {t_delta:7.2f} s ({args.bootstrap} resamples, {len(deltas)} model/metric pairs)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,309 @@
+from __future__ import annotations
+import hashlib
+import json
+import os
+import shutil
+import time
+import uuid
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Set, Tuple
+
+from .cache import ResponseCache, cache_key
+from .config import Settings
+from .runner import (
+    ANSWER_MAX_TOKENS, SUMMARY_MAX_TOKENS, answer_messages, concat_context, context_columns, fluent_context_messages,
+    summary_final_line,
+)
+from .scheduler import UnitResult, WorkUnit, example_signature
+
+ENDPOINT = "/v1/chat/completions"
+BATCH_MAX_REQUESTS = 50_000  # per input file, as limited by the Batch API
+TERMINAL_STATES = {"completed", "failed", "expired", "cancelled"}
+
+
+def request_line(custom_id: str, model: str, messages: List[Dict[str, str]], max_tokens: int, seed: Optional[int]) -> Dict[str, Any]:
+    """One Batch API input line; the body matches what Chat.call sends."""
+    return {
+        "custom_id": custom_id,
+        "method": "POST",
+        "url": ENDPOINT,
+        "body": {"model": model, "messages": messages, "temperature": 0.0, "max_tokens": max_tokens, "seed": seed},
+    }
+
+
+def parse_output_line(rec: Dict[str, Any]) -> Tuple[str, str]:
+    """(custom_id, answer text or "[ERROR: ...]") from one Batch API output/error line."""
+    cid = rec["custom_id"]
+    err = rec.get("error")
+    resp = rec.get("response") or {}
+    if err:
+        return cid, f"[ERROR: BatchError: {err.get('code')}: {err.get('message')}]"
+    if resp.get("status_code") != 200:
+        body_err = (resp.get("body") or {}).get("error") or {}
+        return cid, f"[ERROR: BatchError: HTTP {resp.get('status_code')}: {body_err.get('message')}]"
+    content = resp["body"]["choices"][0]["message"].get("content") or ""
+    return cid, content.strip()
+
+
+def _file_digest(path: str) -> str:
+    h = hashlib.sha1()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            h.update(block)
+    return h.hexdigest()
+
+
+class OpenAIBatchBackend:
+    """Batch API via the OpenAI SDK (files + batches endpoints)."""
+
+    def __init__(self, client):
+        self.client = client
+        self.endpoint = str(client.base_url)  # the same cache namespace as Chat on this client
+
+    def submit(self, input_path: str, description: str) -> str:
+        with open(input_path, "rb") as f:
+            file_obj = self.client.files.create(file=f, purpose="batch")
+        batch = self.client.batches.create(
+            input_file_id=file_obj.id, endpoint=ENDPOINT, completion_window="24h", metadata={"description": description},
+        )
+        return batch.id
+
+    def status(self, batch_id: str) -> str:
+        return self.client.batches.retrieve(batch_id).status
+
+    def download(self, batch_id: str, dest_path: str) -> None:
+        """Write output and error lines of a finished batch to dest_path."""
+        batch = self.client.batches.retrieve(batch_id)
+        with open(dest_path, "w", encoding="utf-8") as out:
+            for file_id in (batch.output_file_id, batch.error_file_id):
+                if file_id:
+                    out.write(self.client.files.content(file_id).text)
+
+
+class LocalBatchBackend:
+    """File-based stand-in for the Batch API.
+
+    submit() copies the input to <root>/<id>/input.jsonl. A batch is complete
+    once <root>/<id>/output.jsonl exists, written either by an external
+    worker or, if `respond` is given, inline on the first status() call, with
+    respond(request_body) -> content producing each completion.
+    """
+
+    def __init__(self, root: str, respond: Optional[Callable[[Dict[str, Any]], str]] = None):
+        self.root = root
+        self.respond = respond
+        self.endpoint = "local-batch:" + os.path.abspath(root)
+        os.makedirs(root, exist_ok=True)
+
+    def submit(self, input_path: str, description: str) -> str:
+        batch_id = f"batch_{uuid.uuid4().hex[:16]}"
+        os.makedirs(os.path.join(self.root, batch_id))
+        shutil.copyfile(input_path, os.path.join(self.root, batch_id, "input.jsonl"))
+        return batch_id
+
+    def _fulfil(self, batch_id: str) -> None:
+        d = os.path.join(self.root, batch_id)
+        tmp = os.path.join(d, "output.jsonl.tmp")
+        with open(os.path.join(d, "input.jsonl"), encoding="utf-8") as src, open(tmp, "w", encoding="utf-8") as dst:
+            for line in src:
+                req = json.loads(line)
+                body = {"choices": [{"index": 0, "message": {"role": "assistant", "content": self.respond(req["body"])}}]}
+                out = {"custom_id": req["custom_id"], "response": {"status_code": 200, "body": body}, "error": None}
+                dst.write(json.dumps(out, ensure_ascii=False) + "\n")
+        os.replace(tmp, os.path.join(d, "output.jsonl"))
+
+    def status(self, batch_id: str) -> str:
+        out = os.path.join(self.root, batch_id, "output.jsonl")
+        if not os.path.exists(out) and self.respond is not None:
+            self._fulfil(batch_id)
+        return "completed" if os.path.exists(out) else "in_progress"
+
+    def download(self, batch_id: str, dest_path: str) -> None:
+        shutil.copyfile(os.path.join(self.root, batch_id, "output.jsonl"), dest_path)
+
+
+class BatchRunner:
+    """Submits a phase of requests as one or more batches, polls them, and collects the results.
+
+    Batch ids are recorded in <work_dir>/<phase>.batches.json together with a
+    digest of their input file, so a restarted run re-attaches to identical
+    batches it already submitted instead of paying again.
+    Requests already in the response cache are answered from it and skipped.
+    """
+
+    def __init__(self, backend, work_dir: str, poll_interval: float = 30.0, cache: Optional[ResponseCache] = None):
+        self.backend = backend
+        self.work_dir = work_dir
+        self.poll_interval = poll_interval
+        self.cache = cache
+        os.makedirs(work_dir, exist_ok=True)
+
+    def run_phase(self, phase: str, requests: Iterable[Dict[str, Any]]) -> Dict[str, str]:
+        results: Dict[str, str] = {}
+        chunks = self._write_chunks(phase, requests, results)
+        manifest_path = os.path.join(self.work_dir, f"{phase}.batches.json")
+        manifest: Dict[str, Dict[str, str]] = {}
+        if os.path.exists(manifest_path):
+            with open(manifest_path, encoding="utf-8") as f:
+                manifest = json.load(f)
+        pending: Set[str] = set()
+        for path in chunks:
+            name, digest = os.path.basename(path), _file_digest(path)
+            entry = manifest.get(name)
+            if entry is None or entry["digest"] != digest:
+                entry = {"batch_id": self.backend.submit(path, f"rag-eval {phase} {name}"), "digest": digest}
+                manifest[name] = entry
+                with open(manifest_path, "w", encoding="utf-8") as f:
+                    json.dump(manifest, f, indent=2)
+                print(f"    submitted {name} as {entry['batch_id']}")
+            else:
+                print(f"    re-attached {name} to {entry['batch_id']}")
+            pending.add(entry["batch_id"])
+
+        while pending:
+            for batch_id in sorted(pending):
+                state = self.backend.status(batch_id)
+                if state not in TERMINAL_STATES:
+                    continue
+                pending.discard(batch_id)
+                if state != "completed":
+                    print(f"[WARN] batch {batch_id} ended as {state}; its requests are recorded as errors")
+                    continue
+                out_path = os.path.join(self.work_dir, f"{batch_id}.output.jsonl")
+                self.backend.download(batch_id, out_path)
+                results.update(self._read_output(out_path))
+            if pending:
+                time.sleep(self.poll_interval)
+
+        self._fill_missing(chunks, results)
+        return results
+
+    def _write_chunks(self, phase: str, requests: Iterable[Dict[str, Any]], results: Dict[str, str]) -> List[str]:
+        chunks: List[str] = []
+        f = None
+        n = 0
+        try:
+            for req in requests:
+                key = self._cache_key(req)
+                if self.cache is not None:
+                    hit = self.cache.get(key)
+                    if hit is not None:
+                        results[req["custom_id"]] = hit
+                        continue
+                if f is None or n >= BATCH_MAX_REQUESTS:
+                    if f is not None:
+                        f.close()
+                    path = os.path.join(self.work_dir, f"{phase}-{len(chunks):03d}.jsonl")
+                    chunks.append(path)
+                    f = open(path, "w", encoding="utf-8")
+                    n = 0
+                f.write(json.dumps(req, ensure_ascii=False) + "\n")
+                n += 1
+        finally:
+            if f is not None:
+                f.close()
+        return chunks
+
+    def _cache_key(self, req: Dict[str, Any]) -> str:
+        b = req["body"]
+        return cache_key(self.backend.endpoint, b["model"], b["messages"], b["temperature"], b["max_tokens"], b["seed"])
+
+    def _read_output(self, path: str) -> Dict[str, str]:
+        out: Dict[str, str] = {}
+        with open(path, encoding="utf-8") as f:
+            for line in f:
+                if line.strip():
+                    cid, text = parse_output_line(json.loads(line))
+                    out[cid] = text
+        return out
+
+    def _fill_missing(self, chunks: List[str], results: Dict[str, str]) -> None:
+        """Error strings for requests with no output; write successes through to the cache."""
+        for path in chunks:
+            with open(path, encoding="utf-8") as f:
+                for line in f:
+                    req = json.loads(line)
+                    cid = req["custom_id"]
+                    if cid not in results:
+                        results[cid] = "[ERROR: BatchError: no result returned]"
+                    elif self.cache is not None:
+                        self.cache.put(self._cache_key(req), req["body"]["model"], results[cid])  # errors are skipped
+
+
+def run_batch_grid(
+    units: Callable[[], Iterator[WorkUnit]], settings: Settings, runner: BatchRunner, fluent_final_line: bool = False,
+) -> Iterator[UnitResult]:
+    """Batch-API equivalent of GridScheduler.run.
+
+    `units` is called once per pass (it must yield the same units each time):
+    phase 1 submits concat answers and fluent summaries, phase 2 the fluent
+    answers, and a final pass yields UnitResults in unit order. Requests are
+    deduplicated exactly like the scheduler's memo. With fluent_final_line the
+    fluent answers get only the summary's final sentence, as in the scheduler
+    (there is nothing to stream here, so no latency columns are produced).
+    """
+    s = settings
+
+    def summarizer(unit: WorkUnit) -> str:
+        return s.model_summarizer_fixed or unit.model
+
+    def phase1() -> Iterator[Dict[str, Any]]:
+        seen: Set[str] = set()
+        for unit in units():
+            ex, sig = unit.example, example_signature(unit.example)
+            if "concat" in unit.modes:
+                cid = f"concat|{unit.model}|{sig}"
+                if cid not in seen:
+                    seen.add(cid)
+                    msgs = answer_messages(ex.query, concat_context(ex.paths, s)[0], s.min_words, s.max_words, s.strict_context_only)
+                    yield request_line(cid, unit.model, msgs, ANSWER_MAX_TOKENS, s.seed)
+            if "fluent" in unit.modes:
+                cid = f"summary|{summarizer(unit)}|{sig}"
+                if cid not in seen:
+                    seen.add(cid)
+                    msgs = fluent_context_messages(ex.query, ex.paths, s.min_words, s.max_words)
+                    yield request_line(cid, summarizer(unit), msgs, SUMMARY_MAX_TOKENS, s.seed)
+
+    print("  Batch phase 1: concat answers + fluent summaries")
+    first = runner.run_phase("phase1", phase1())
+
+    def fluent_context(unit: WorkUnit, sig: str) -> str:
+        summary = first[f"summary|{summarizer(unit)}|{sig}"]
+        return summary_final_line(summary) if fluent_final_line else summary
+
+    def phase2() -> Iterator[Dict[str, Any]]:
+        seen: Set[str] = set()
+        for unit in units():
+            if "fluent" not in unit.modes:
+                continue
+            ex, sig = unit.example, example_signature(unit.example)
+            cid = f"fluent|{unit.model}|{sig}"
+            if cid not in seen:
+                seen.add(cid)
+                summary = fluent_context(unit, sig)
+                if summary.startswith("[ERROR"):
+                    continue  # the fluent answer is the summary's error, as in the scheduler
+                msgs = answer_messages(ex.query, summary, s.min_words, s.max_words, s.strict_context_only)
+                yield request_line(cid, unit.model, msgs, ANSWER_MAX_TOKENS, s.seed)
+
+    print("  Batch phase 2: fluent answers")
+    second = runner.run_phase("phase2", phase2())
+
+    seen: Set[str] = set()
+    for unit in units():
+        sig = example_signature(unit.example)
+        answers: Dict[str, str] = {}
+        meta: Dict[str, Dict[str, str]] = {}
+        if "concat" in unit.modes:
+            cid = f"concat|{unit.model}|{sig}"
+            answers["concat"] = first[cid]
+            meta["concat"] = {"answer_reused": str(int(cid in seen)), **context_columns(*concat_context(unit.example.paths, s))}
+            seen.add(cid)
+        if "fluent" in unit.modes:
+            sid, cid = f"summary|{summarizer(unit)}|{sig}", f"fluent|{unit.model}|{sig}"
+            answers["fluent"] = second[cid] if cid in second else fluent_context(unit, sig)
+            meta["fluent"] = {
+                "summary_reused": str(int(sid in seen)), "answer_reused": str(int(cid in seen)),
+                **context_columns(fluent_context(unit, sig)),
+            }
+            seen.update((sid, cid))
+        yield UnitResult(unit=unit, answers=answers, meta=meta)
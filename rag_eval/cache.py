@@ -0,0 +1,120 @@
+from __future__ import annotations
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, List, Optional
+
+# read: serve hits, never store; write: always call the API and store; readwrite: both.
+CACHE_MODES = ("readwrite", "read", "write")
+
+
+def cache_key(
+    endpoint: str, model: str, messages: List[Dict[str, str]], temperature: float, max_tokens: int, seed: Optional[int],
+) -> str:
+    """Content hash of everything that determines a chat completion, including the endpoint
+    that serves it (a mock server's text must never be replayed for the real model)."""
+    payload = json.dumps(
+        {
+            "endpoint": endpoint, "model": model, "messages": messages,
+            "temperature": temperature, "max_tokens": max_tokens, "seed": seed,
+        },
+        sort_keys=True,
+        ensure_ascii=False,
+        separators=(",", ":"),
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class ResponseCache:
+    """SQLite-backed, content-addressed store of chat responses with LRU eviction by total size."""
+
+    def __init__(self, cache_dir: str, mode: str = "readwrite", max_bytes: Optional[int] = None):
+        if mode not in CACHE_MODES:
+            raise ValueError(f"Unknown cache mode '{mode}', expected one of {CACHE_MODES}")
+        os.makedirs(cache_dir, exist_ok=True)
+        self.path = os.path.join(cache_dir, "responses.sqlite3")
+        self.mode = mode
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.writes = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS responses ("
+            " key TEXT PRIMARY KEY,"
+            " model TEXT NOT NULL,"
+            " response TEXT NOT NULL,"
+            " size INTEGER NOT NULL,"
+            " created REAL NOT NULL,"
+            " accessed REAL NOT NULL)"
+        )
+        self._db.execute("CREATE INDEX IF NOT EXISTS responses_accessed ON responses(accessed)")
+        self._total_bytes = self._db.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+
+    def get(self, key: str) -> Optional[str]:
+        with self._lock:
+            if self.mode == "write":
+                self.misses += 1
+                return None
+            row = self._db.execute("SELECT response FROM responses WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            self._db.execute("UPDATE responses SET accessed = ? WHERE key = ?", (time.time(), key))
+            self.hits += 1
+            return row[0]
+
+    def put(self, key: str, model: str, response: str) -> None:
+        if self.mode == "read" or response.startswith("[ERROR"):
+            return
+        now = time.time()
+        size = len(response.encode("utf-8"))
+        if self.max_bytes is not None and size > self.max_bytes:
+            return  # could only be stored by evicting everything, itself included
+        with self._lock:
+            old = self._db.execute("SELECT size FROM responses WHERE key = ?", (key,)).fetchone()
+            self._db.execute(
+                "INSERT OR REPLACE INTO responses (key, model, response, size, created, accessed) VALUES (?, ?, ?, ?, ?, ?)",
+                (key, model, response, size, now, now),
+            )
+            self._total_bytes += size - (old[0] if old else 0)
+            self.writes += 1
+            if self.max_bytes is not None:
+                self._evict(keep=key)
+
+    def _evict(self, keep: str) -> None:
+        """Drop least-recently-used entries, never `keep` (the one just written), until the
+        stored responses fit in max_bytes."""
+        if self._total_bytes <= self.max_bytes:
+            return
+        doomed = []
+        rows = self._db.execute("SELECT key, size FROM responses WHERE key != ? ORDER BY accessed ASC", (keep,))
+        for key, size in rows:
+            if self._total_bytes <= self.max_bytes:
+                break
+            doomed.append((key,))
+            self._total_bytes -= size
+        self._db.executemany("DELETE FROM responses WHERE key = ?", doomed)
+        self.evictions += len(doomed)
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "writes": self.writes,
+            "evictions": self.evictions,
+            "bytes": self._total_bytes,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+        }
+
+    def close(self) -> None:
+        with self._lock:
+            self._db.close()
@@ -0,0 +1,121 @@
+from __future__ import annotations
+import json
+import os
+from typing import Any, Dict, Iterable, Iterator, List, Sequence, Set, TextIO, Tuple
+
+from .data import Example
+from .runner import MODES, score_answers
+
+CHECKPOINT_FILE = "checkpoint.jsonl"
+
+# (model, 1-based example index, mode)
+RowKey = Tuple[str, int, str]
+
+
+class Checkpoint:
+    """Append-only JSONL log of finished rows, fsync'ed per work unit.
+
+    Each row is a line {"model", "index", "mode", "row"}. An example's gold refs
+    are written once, as {"index", "refs"} before its first row, so the deferred
+    BERTScore pass can run from the checkpoint alone; read_checkpoint joins
+    them back onto the row records.
+    """
+
+    def __init__(self, out_dir: str):
+        os.makedirs(out_dir, exist_ok=True)
+        self.path = os.path.join(out_dir, CHECKPOINT_FILE)
+        self._f = open(self.path, "a", encoding="utf-8")
+        self._refs_written: Set[int] = set()  # example indices whose refs are in the file
+        if self._f.tell() > 0:
+            self._refs_written = {rec["index"] for rec in _iter_records(self.path) if "mode" not in rec}
+            with open(self.path, "rb") as f:
+                f.seek(-1, os.SEEK_END)
+                if f.read(1) != b"\n":  # terminate a torn line so the next record starts clean
+                    self._f.write("\n")
+
+    def append(self, model: str, index: int, refs: Sequence[str], rows: List[Dict[str, str]]) -> None:
+        if index not in self._refs_written:
+            self._f.write(json.dumps({"index": index, "refs": list(refs)}, ensure_ascii=False))
+            self._f.write("\n")
+            self._refs_written.add(index)
+        for row in rows:
+            rec = {"model": model, "index": index, "mode": row["mode"], "row": row}
+            self._f.write(json.dumps(rec, ensure_ascii=False))
+            self._f.write("\n")
+        self._f.flush()
+        os.fsync(self._f.fileno())
+
+    def load(self) -> List[Dict[str, Any]]:
+        """All intact records; a torn last line from a crash is ignored, later duplicates win."""
+        self._f.flush()
+        return read_checkpoint(self.path)
+
+    def score_unscored(self) -> int:
+        """Score rows that were checkpointed before scoring (runner.answer_rows) and lost their
+        scores in a crash; the scored rows are appended. Returns how many there were.
+        BERTScore is left to the post-pass, as for inline scoring."""
+        n = 0
+        for rec in self.load():
+            row = rec["row"]
+            if row["rouge1"] not in (None, ""):  # "" in checkpoints written before metrics were floats
+                continue
+            [scored] = score_answers(Example(row["query"], [], rec["refs"]), rec["model"], {rec["mode"]: row["answer"]}, None, None)
+            self.append(rec["model"], rec["index"], rec["refs"], [{**row, **scored}])
+            n += 1
+        return n
+
+    def completed_keys(self) -> Set[RowKey]:
+        """Keys to skip on resume; rows whose answer is an [ERROR ...] are retried (unscored rows are not)."""
+        return {(r["model"], r["index"], r["mode"]) for r in self.load() if not r["row"]["answer"].startswith("[ERROR")}
+
+    def close(self) -> None:
+        self._f.close()
+
+
+def _iter_records(path: str) -> Iterator[Dict[str, Any]]:
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            try:
+                yield json.loads(line)
+            except json.JSONDecodeError:  # a torn last line
+                continue
+
+
+def read_checkpoint(path: str) -> List[Dict[str, Any]]:
+    """Row records of a checkpoint file, each with its example's "refs" (one shared list per
+    example), without opening it for writing (see Checkpoint.load)."""
+    refs: Dict[int, List[str]] = {}
+    latest: Dict[RowKey, Dict[str, Any]] = {}
+    for rec in _iter_records(path):
+        if "mode" not in rec:
+            refs[rec["index"]] = rec["refs"]
+        else:
+            latest[(rec["model"], rec["index"], rec["mode"])] = rec
+    for rec in latest.values():
+        rec.setdefault("refs", refs.get(rec["index"], []))  # older checkpoints kept refs on every row
+    return list(latest.values())
+
+
+def write_checkpoint(f: TextIO, records: Iterable[Dict[str, Any]]) -> None:
+    """Write row records (as returned by read_checkpoint) in the Checkpoint file format."""
+    written: Set[int] = set()
+    for rec in records:
+        if rec["index"] not in written:
+            written.add(rec["index"])
+            f.write(json.dumps({"index": rec["index"], "refs": rec["refs"]}, ensure_ascii=False))
+            f.write("\n")
+        f.write(json.dumps({k: v for k, v in rec.items() if k != "refs"}, ensure_ascii=False))
+        f.write("\n")
+
+
+def ordered_rows(records: List[Dict[str, Any]], model_order: Sequence[str]) -> Tuple[List[Dict[str, str]], List[List[str]]]:
+    """Rows (and their gold refs) in CSV order: model_order, then example index, then MODES.
+    Each row gets its example index as the `example` column."""
+    rank = {m: i for i, m in enumerate(model_order)}
+    recs = sorted(
+        records,
+        key=lambda r: (rank.get(r["model"], len(rank)), r["model"], r["index"], MODES.index(r["mode"])),
+    )
+    for r in recs:
+        r["row"]["example"] = str(r["index"])
+    return [r["row"] for r in recs], [r["refs"] for r in recs]
@@ -1,63 +1,481 @@
 from __future__ import annotations
 import argparse
-from rouge_score import rouge_scorer
+import dataclasses
+import os
+import sys
+from typing import Any, Dict, List, Optional, Sequence, Set, Tuple
 
+from .batch import BatchRunner, LocalBatchBackend, OpenAIBatchBackend, run_batch_grid
+from .cache import CACHE_MODES, ResponseCache
+from .checkpoint import CHECKPOINT_FILE, Checkpoint, ordered_rows, write_checkpoint
 from .config import Settings
-from .data import build_examples
+from .data import iter_examples, parse_shard
+from .metrics import shared_bertscorer
 from .openai_client import Chat
-from .runner import run_one_example_on_model, summarize, write_csvs, timestamped_outdir
+from .profiling import write_profile
+from .ratelimit import RateLimiter, RetryPolicy
+from .retrieval import Graph, PathRetriever, retrieve_examples
+from .runner import CONCAT_FORMATS, MODES, answer_rows, csv_value, fill_bertscore, score_answers, write_csvs, timestamped_outdir
+from .scheduler import GridScheduler, ModelLimits, UnitResult, WorkUnit, parse_model_limits
+from .scoring import ScoreJob, ScoringPool
+from .sequential import SequentialMonitor, example_stratum, stratified_order
+from .sharding import find_shard_dirs, merge_shards, shard_dirname, unit_shard, write_manifest
 
-try:
-    from bert_score import BERTScorer  # type: ignore
-except Exception:
-    BERTScorer = None  # type: ignore
 
+def write_results(
+    all_rows: List[Dict[str, Any]], out_dir: str, bootstrap: int, seed: int, parquet: bool, with_bertscore: bool,
+) -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]], str]:
+    """Summary, delta and profile outputs for the final rows; returns (summaries, deltas, profile path)."""
+    from .results import METRIC_FIELDS, ResultTable, write_parquet
 
-def main() -> None:
-    parser = argparse.ArgumentParser(description="Evaluate FluentPathRAG vs concatenation on long-form answers.")
+    table = ResultTable.from_rows(all_rows)
+    summaries = table.summary()
+    metrics = [m for m in METRIC_FIELDS if with_bertscore or m != "bertscore_f1"]
+    deltas = table.paired_deltas(metrics, n_boot=bootstrap, seed=seed)
+    write_csvs(all_rows, summaries, out_dir, deltas)
+    if parquet:
+        write_parquet(table, summaries, deltas, out_dir)
+    return summaries, deltas, write_profile(all_rows, out_dir)
+
+
+def print_results(summaries: List[Dict[str, Any]], deltas: List[Dict[str, Any]], bootstrap: int) -> None:
+    print("\n== SUMMARY (mean metrics) ==")
+    for r in summaries:
+        r = {k: csv_value(k, v) for k, v in r.items()}
+        latency = f" | TTFT={r['mean_ttft_s']}s | latency={r['mean_latency_s']}s" if r["mean_latency_s"] else ""
+        print(
+            f"{r['model']:>10s} | {r['mode']:>6s} | N={r['n_examples']}" \
+            f" | R1={r['mean_rouge1']} | RL={r['mean_rougeL']} | BLEU={r['mean_bleu']} | BERT-F1={r['mean_bertscore_f1']}"
+            f" | ctx_tokens={r['mean_context_tokens']}" + latency
+        )
+    if deltas:
+        print(f"\n== FLUENT - CONCAT (paired over examples, 95% bootstrap CI, sign-flip p; {bootstrap} resamples) ==")
+        for d in deltas:
+            d = {k: csv_value(k, v) for k, v in d.items()}
+            ci = f" [{d['ci_low']}, {d['ci_high']}] p={d['p_value']}" if d["ci_low"] else ""
+            print(f"{d['model']:>10s} | {d['metric']:>12s} | N={d['n_pairs']} | delta={d['mean_delta']}" + ci)
+
+
+def merge_main(argv: Sequence[str]) -> None:
+    parser = argparse.ArgumentParser(
+        prog="run_eval.py merge",
+        description="Combine the outputs of a sharded run (--shard-index/--shard-count) into one set of results.",
+    )
+    parser.add_argument("paths", nargs="+", help="Shard directories, or the run directory holding shard-* subdirectories")
+    parser.add_argument("--out", default=None, help="Output directory (default: <run directory>/merged)")
+    parser.add_argument("--allow-incomplete", action="store_true", help="Merge even if shards or rows are missing")
+    parser.add_argument("--parquet", action="store_true", help="Also write Parquet tables (needs pyarrow)")
+    args = parser.parse_args(argv)
+
+    shard_dirs = find_shard_dirs(args.paths)
+    try:
+        manifest, records = merge_shards(shard_dirs, allow_incomplete=args.allow_incomplete)
+    except ValueError as e:
+        parser.exit(1, f"merge: {e}\n")
+    config: Dict[str, Any] = manifest["config"]
+    parents = {os.path.dirname(os.path.normpath(d)) for d in shard_dirs}
+    out_dir = args.out or (os.path.join(parents.pop(), "merged") if len(parents) == 1 else None)
+    if out_dir is None:
+        parser.error("shards live in different directories; pass --out")
+    os.makedirs(out_dir, exist_ok=True)
+
+    # The merged checkpoint makes the output directory look like a single-process run's.
+    with open(os.path.join(out_dir, CHECKPOINT_FILE), "w", encoding="utf-8") as f:
+        write_checkpoint(f, records)
+    all_rows, _ = ordered_rows(records, config["models"])
+    summaries, deltas, _ = write_results(
+        all_rows, out_dir, bootstrap=config["bootstrap"], seed=config["seed"], parquet=args.parquet,
+        with_bertscore=not config["no_bertscore"],
+    )
+    print(f"Merged {len(shard_dirs)} shard directories: {len(all_rows)} rows")
+    print_results(summaries, deltas, config["bootstrap"])
+    print(f"\nResults written to: {out_dir}")
+
+
+def main(argv: Optional[Sequence[str]] = None) -> None:
+    argv = sys.argv[1:] if argv is None else list(argv)
+    if argv[:1] == ["merge"]:
+        merge_main(argv[1:])
+        return
+    parser = argparse.ArgumentParser(
+        description="Evaluate FluentPathRAG vs concatenation on long-form answers.",
+        epilog="Subcommand: merge SHARD_DIR... combines the outputs of a sharded run (see: merge --help).",
+    )
     parser.add_argument("--models", nargs="*", default=None, help="Override models, e.g. --models gpt-4.1 gpt-4o")
     parser.add_argument("--no-bertscore", action="store_true", help="Disable BERTScore")
-    args = parser.parse_args()
+    parser.add_argument("--dataset", default=None, help="JSONL(.gz) dataset of examples (default: built-in examples)")
+    parser.add_argument("--limit", type=int, default=None, help="Only use the first N examples of the dataset")
+    parser.add_argument("--shard", default=None, metavar="I/N", help="Only run examples whose position %% N == I (0-based)")
+    parser.add_argument(
+        "--graph", default=None, metavar="FILE",
+        help="Retrieve each example's paths from this JSONL(.gz) graph (rag_eval.retrieval) instead of using the dataset's",
+    )
+    parser.add_argument("--graph-max-hops", type=int, default=3, help="Longest retrieved path, in edges")
+    parser.add_argument("--graph-top-k", type=int, default=10, help="Paths retrieved per query")
+    parser.add_argument("--graph-seeds", type=int, default=5, help="Seed nodes matched per query")
+    parser.add_argument("--bertscore-batch-size", type=int, default=64, help="Texts per BERTScore forward pass")
+    parser.add_argument(
+        "--score-workers", type=int, default=0,
+        help="Score on N worker processes (each loads BERTScore once) while generation continues;"
+        " 0 = ROUGE/BLEU inline and BERTScore in one batched pass at the end",
+    )
+    parser.add_argument(
+        "--concat-format", choices=sorted(CONCAT_FORMATS), default=None,
+        help="Concat context rendering: full (every path verbatim) or compact (prefix trie, each node text once); env CONCAT_FORMAT",
+    )
+    parser.add_argument(
+        "--max-context-tokens", type=int, default=None,
+        help="Drop the lowest-ranked paths (the top one is always kept) until the concat context fits this many tokens;"
+        " env MAX_CONTEXT_TOKENS",
+    )
+    parser.add_argument(
+        "--base-url", default=None,
+        help="OpenAI-compatible API base URL, e.g. http://127.0.0.1:8000/v1 for rag_eval.mock_server (default: OPENAI_BASE_URL)",
+    )
+    parser.add_argument("--concurrency", type=int, default=4, help="Max concurrent API requests across all models (1 = serial)")
+    parser.add_argument(
+        "--model-concurrency", nargs="*", default=None, metavar="MODEL=N",
+        help="Per-model in-flight request caps, e.g. --model-concurrency gpt-4o=4 gpt-4.1=2 (default: --concurrency)",
+    )
+    parser.add_argument("--cache-dir", default=".cache/llm", help="Directory for the on-disk LLM response cache")
+    parser.add_argument("--no-cache", action="store_true", help="Disable the LLM response cache")
+    parser.add_argument(
+        "--cache-mode", choices=CACHE_MODES, default="readwrite",
+        help="readwrite: serve and store; read: serve only; write: always call the API and refresh entries",
+    )
+    parser.add_argument("--cache-max-mb", type=float, default=None, help="Evict least-recently-used entries above this size")
+    parser.add_argument("--rpm", type=float, default=None, help="Client-side requests/min budget per model")
+    parser.add_argument("--tpm", type=float, default=None, help="Client-side tokens/min budget per model (prompt estimate + max_tokens)")
+    parser.add_argument("--max-retries", type=int, default=5, help="Retries for 429/timeout/5xx, with jittered exponential backoff")
+    parser.add_argument(
+        "--breaker-threshold", type=int, default=5,
+        help="Consecutive retryable failures that pause a model's queue for --breaker-cooldown seconds",
+    )
+    parser.add_argument("--breaker-cooldown", type=float, default=30.0)
+    parser.add_argument(
+        "--stream", action="store_true",
+        help="Stream completions so time-to-first-token is measured (ttft_s / latency_s columns)",
+    )
+    parser.add_argument(
+        "--fluent-final-line", action="store_true",
+        help="Stream the fluent summary and answer from its final sentence alone, starting as soon as that line is complete",
+    )
+    parser.add_argument(
+        "--batch-mode", action="store_true",
+        help="Submit requests through the Batch API in two phases (summaries + concat answers, then fluent answers)",
+    )
+    parser.add_argument("--batch-poll-interval", type=float, default=30.0, help="Seconds between batch status polls")
+    parser.add_argument(
+        "--batch-local", default=None, metavar="DIR",
+        help="Use a file-based batch stand-in in DIR instead of the OpenAI Batch API (outputs written by an external worker)",
+    )
+    parser.add_argument(
+        "--batch-local-mock", action="store_true",
+        help="Complete --batch-local batches in-process with the mock server's deterministic responses (no worker needed)",
+    )
+    parser.add_argument(
+        "--resume", default=None, metavar="OUT_DIR",
+        help="Continue an interrupted run in OUT_DIR, skipping (model, example, mode) rows already checkpointed",
+    )
+    parser.add_argument(
+        "--bootstrap", type=int, default=1000, metavar="N",
+        help="Bootstrap resamples (and sign flips) for the paired fluent-vs-concat CIs and p-values (0 = means only)",
+    )
+    parser.add_argument("--parquet", action="store_true", help="Also write the detailed/summary/delta tables as Parquet (needs pyarrow)")
+    parser.add_argument(
+        "--sequential", action="store_true",
+        help="Run examples in a stratified random order and stop a model once its fluent-concat delta is decided",
+    )
+    parser.add_argument("--seq-metric", default="rougeL", choices=("rouge1", "rougeL", "bleu"), help="Metric the sequential test watches")
+    parser.add_argument("--seq-alpha", type=float, default=0.05, help="Error rate of the sequential test, over all looks")
+    parser.add_argument("--seq-min-examples", type=int, default=20, help="Paired examples before the first look")
+    parser.add_argument("--seq-check-every", type=int, default=10, help="Paired examples between looks")
+    parser.add_argument(
+        "--min-effect", type=float, default=None,
+        help="With --sequential, also stop a model once its delta CI lies within +/- this value",
+    )
+    parser.add_argument(
+        "--max-consecutive-errors", type=int, default=0, metavar="N",
+        help="Stop running a model after N consecutive [ERROR answers (0 = never)",
+    )
+    parser.add_argument(
+        "--shard-count", type=int, default=1,
+        help="Split the (model, example) work units over this many processes by a stable hash; see the merge subcommand",
+    )
+    parser.add_argument("--shard-index", type=int, default=0, help="This process's shard, 0 <= index < --shard-count")
+    parser.add_argument(
+        "--run-name", default=None,
+        help="Output directory name under OUT_DIR (default: a timestamp); shards write to <run-name>/shard-I-of-N",
+    )
+    args = parser.parse_args(argv)
+    try:
+        shard = parse_shard(args.shard)
+    except ValueError as e:
+        parser.error(str(e))
+    shards = args.shard_count
+    if shards < 1 or not 0 <= args.shard_index < shards:
+        parser.error("need --shard-count >= 1 and 0 <= --shard-index < --shard-count")
+    if shards > 1 and not (args.run_name or args.resume):
+        parser.error("--shard-count > 1 needs --run-name so that all shards write into one run directory")
+    if shards > 1 and args.sequential:
+        parser.error("--sequential decides on all of a model's examples; it cannot run per shard")
+    if args.batch_local_mock and not (args.batch_mode and args.batch_local):
+        parser.error("--batch-local-mock needs --batch-mode --batch-local DIR")
+    if args.batch_mode and (args.sequential or args.max_consecutive_errors):
+        parser.error("--sequential / --max-consecutive-errors need results as they finish; not available with --batch-mode")
+    if args.graph and not os.path.exists(args.graph):
+        parser.error(f"--graph: no such file {args.graph}")
+    if args.parquet:
+        try:
+            import pyarrow  # noqa: F401
+        except ImportError:
+            parser.error("--parquet needs pyarrow (pip install pyarrow)")
+    try:
+        model_limits = parse_model_limits(args.model_concurrency)
+    except ValueError as e:
+        parser.error(str(e))
 
     settings = Settings.from_env()
+    overrides = {
+        "concat_format": args.concat_format, "max_context_tokens": args.max_context_tokens,
+        "openai_base_url": args.base_url,
+    }
+    settings = dataclasses.replace(settings, **{k: v for k, v in overrides.items() if v is not None})
+    if settings.concat_format not in CONCAT_FORMATS:
+        parser.error(f"CONCAT_FORMAT must be one of {', '.join(sorted(CONCAT_FORMATS))}")
     model_list = [m.strip() for m in (args.models or settings.model_list) if m.strip()]
+    # What a shard's rows depend on; merge refuses to combine shards whose configs differ.
+    run_config = {
+        "models": model_list, "shard_count": shards, "dataset": args.dataset, "limit": args.limit, "shard": args.shard,
+        "no_bertscore": args.no_bertscore, "bootstrap": args.bootstrap,
+        **{
+            k: v for k, v in dataclasses.asdict(settings).items()
+            if k not in ("openai_api_key", "openai_base_url", "out_dir", "model_list")
+        },
+    }
 
-    # Metrics
-    rouge = rouge_scorer.RougeScorer(["rouge1", "rougeL"], use_stemmer=True)
+    cache = None
+    if not args.no_cache:
+        max_bytes = int(args.cache_max_mb * 1024 * 1024) if args.cache_max_mb is not None else None
+        cache = ResponseCache(args.cache_dir, mode=args.cache_mode, max_bytes=max_bytes)
+    limiter = RateLimiter(args.rpm, args.tpm, args.breaker_threshold, args.breaker_cooldown)
+    chat = Chat(
+        api_key=settings.openai_api_key, cache=cache, limiter=limiter,
+        retry=RetryPolicy(max_retries=args.max_retries), stream=args.stream,
+        base_url=settings.openai_base_url,
+    )
+    limits = ModelLimits(args.concurrency, model_limits)
 
-    berts = None
-    if not args.no_bertscore and BERTScorer is not None:
-        try:
-            berts = BERTScorer(model_type=settings.bertscore_model, lang="en", rescale_with_baseline=True)
-        except Exception as e:
-            print(f"[WARN] BERTScore disabled ({type(e).__name__}: {e})")
-            berts = None
+    run_dir = os.path.join(settings.out_dir, args.run_name) if args.run_name else timestamped_outdir(settings.out_dir)
+    out_dir = args.resume or (os.path.join(run_dir, shard_dirname(args.shard_index, shards)) if shards > 1 else run_dir)
+    if not args.resume and os.path.exists(os.path.join(out_dir, CHECKPOINT_FILE)):
+        parser.error(f"{out_dir} already holds a run; continue it with --resume {out_dir} or choose another --run-name")
+    ckpt = Checkpoint(out_dir)
+    rescored = ckpt.score_unscored()
+    if rescored:
+        print(f"Scored {rescored} answers checkpointed before a crash interrupted their scoring")
+    done = ckpt.completed_keys()
+    if done:
+        print(f"Resuming {out_dir}: {len(done)} rows already checkpointed")
+
+    # With a fixed summarizer every answer model shares one fluent summary per example, so plan
+    # example-major: all models of an example are in flight together and the scheduler's memo
+    # computes the summary once. CSV order is restored from the checkpoint at the end.
+    by_example = settings.model_summarizer_fixed is not None
 
-    chat = Chat(api_key=settings.openai_api_key)
+    # With --graph, paths come from the graph; the search is repeated on every pass over the
+    # dataset (it is deterministic) and its first time per example is reported as retrieval_s.
+    retriever = None
+    retrieval_s: Dict[int, float] = {}
+    no_paths: Set[int] = set()  # examples whose search found nothing: answered from an empty context
+    if args.graph:
+        graph = Graph.load(args.graph)
+        print(f"Graph {args.graph}: {len(graph)} nodes, {graph.num_edges} edges")
+        retriever = PathRetriever(graph, max_hops=args.graph_max_hops, top_k=args.graph_top_k)
 
-    all_rows = []
-    exs = build_examples()
+    def read_examples():
+        items = enumerate(iter_examples(args.dataset, limit=args.limit, shard=shard), 1)
+        return retrieve_examples(items, retriever, args.graph_seeds, retrieval_s, no_paths) if retriever else items
+
+    # --sequential holds the dataset in memory to draw it in a stratified random order, so a model
+    # stopped early has still seen every kind of example. Indices stay the examples' positions in
+    # the (--shard) stream, as without --sequential.
+    examples = None
+    if args.sequential:
+        examples = list(read_examples())
+        order = stratified_order([example_stratum(ex) for _, ex in examples], settings.seed)
+        examples = [examples[k] for k in order]
+    monitor = SequentialMonitor(
+        enabled=args.sequential, metric=args.seq_metric, alpha=args.seq_alpha, min_effect=args.min_effect,
+        min_examples=args.seq_min_examples, check_every=args.seq_check_every,
+        max_looks=SequentialMonitor.looks_for(len(examples or ()), args.seq_min_examples, args.seq_check_every),
+        max_errors=args.max_consecutive_errors,
+    )
+    if args.sequential:  # a resumed run continues from the rows it already has ([ERROR rows are retried)
+        for rec in ckpt.load():
+            if not rec["row"]["answer"].startswith("[ERROR"):
+                monitor.update(rec["model"], rec["index"], [rec["row"]])
+
+    n_streamed: List[int] = []  # examples seen by each complete pass over the dataset
+
+    def dataset():
+        if examples is not None:
+            yield from examples
+            return
+        n = 0
+        for item in read_examples():
+            n += 1
+            yield item
+        n_streamed.append(n)
+
+    def mine(model: str, i: int) -> bool:
+        return shards == 1 or unit_shard(model, i, shards) == args.shard_index
+
+    def pending_units():
+        # Streamed: the dataset is re-read per pass, so only in-flight examples are held in memory.
+        # Models stopped by the monitor get no new units (units already in flight still finish).
+        if by_example:
+            for i, ex in dataset():
+                for model in model_list:
+                    todo = tuple(m for m in MODES if (model, i, m) not in done) if mine(model, i) else ()
+                    if todo and not monitor.stopped(model):
+                        yield WorkUnit(model, i, ex, todo)
+            return
+        for model in model_list:
+            for i, ex in dataset():
+                if monitor.stopped(model):
+                    break
+                todo = tuple(m for m in MODES if (model, i, m) not in done) if mine(model, i) else ()
+                if todo:
+                    yield WorkUnit(model, i, ex, todo)
 
     print("=" * 96)
     print("Running models:", ", ".join(model_list))
+    if by_example:
+        print(f"Fluent summaries shared across models (summarizer: {settings.model_summarizer_fixed})")
     print("=" * 96)
-    for i_model, model in enumerate(model_list, 1):
-        print(f"\n## Model {i_model}/{len(model_list)}: {model}")
-        for i, ex in enumerate(exs, 1):
-            print(f"  - Example {i}/{len(exs)}: {ex.query}")
-            rows = run_one_example_on_model(ex, model, rouge, berts, chat, settings)
-            all_rows.extend(rows)
+    current_model, current_index = None, None
+    sched = None
+    pool = None
+    can_stop = args.sequential or args.max_consecutive_errors
+    if args.batch_mode:
+        if args.batch_local:
+            respond = None
+            if args.batch_local_mock:
+                from .mock_server import mock_content  # deferred: keeps http.server out of normal startup
+
+                def respond(body: Dict[str, Any]) -> str:
+                    return mock_content(body["messages"], body["max_tokens"])
+            backend = LocalBatchBackend(args.batch_local, respond=respond)
+        else:
+            backend = OpenAIBatchBackend(chat.client)
+        runner = BatchRunner(backend, os.path.join(out_dir, "batches"), poll_interval=args.batch_poll_interval, cache=cache)
+        results = run_batch_grid(pending_units, settings, runner, fluent_final_line=args.fluent_final_line)
+    else:
+        sched = GridScheduler(chat, settings, concurrency=args.concurrency, limits=limits, fluent_final_line=args.fluent_final_line)
+        # A monitor stop only holds back units not yet submitted, so keep the look-ahead short.
+        results = sched.run(pending_units(), window=args.concurrency if can_stop else None)
+
+    def finish(res: UnitResult, rows: List[Dict[str, str]]) -> List[Dict[str, str]]:
+        """Add the unit's detail columns (scheduler meta, retrieval time) to its rows."""
+        for r in rows:
+            r.update(res.meta.get(r["mode"], {}))
+            if res.unit.index in retrieval_s:
+                r["retrieval_s"] = f"{retrieval_s[res.unit.index]:.6f}"
+        return rows
+
+    def answered():
+        # Answers are checkpointed before they wait in the scoring pool, so a crash there does not
+        # lose paid-for answers (a resume scores them); the scored rows appended later supersede them.
+        for res in results:
+            unit = res.unit
+            ckpt.append(unit.model, unit.index, unit.example.gold_refs, finish(res, answer_rows(unit.model, unit.example.query, res.answers)))
+            yield res, ScoreJob(unit.model, unit.example.query, unit.example.gold_refs, res.answers)
+
+    def scored():
+        if pool is None:
+            for res in results:
+                yield res, score_answers(res.unit.example, res.unit.model, res.answers, None, None)
+            return
+        yield from pool.score(answered())
+
+    if args.score_workers > 0:
+        bertscore_model = None if args.no_bertscore else settings.bertscore_model
+        pool = ScoringPool(args.score_workers, bertscore_model, batch_size=args.bertscore_batch_size)
+    try:
+        for res, rows in scored():
+            unit = res.unit
+            if by_example:
+                if unit.index != current_index:
+                    current_index = unit.index
+                    print(f"\n## Example {unit.index}: {unit.example.query}")
+                print(f"  - Model: {unit.model}")
+            else:
+                if unit.model != current_model:
+                    current_model = unit.model
+                    i_model = model_list.index(unit.model) + 1
+                    print(f"\n## Model {i_model}/{len(model_list)}: {unit.model}")
+                print(f"  - Example {unit.index}: {unit.example.query}")
+            ckpt.append(unit.model, unit.index, unit.example.gold_refs, finish(res, rows))
             for r in rows:
-                print(f"    [{r['mode'].upper()}] RL={r['rougeL']} BLEU={r['bleu']} BERT-F1={r['bertscore_f1']}")
+                print(f"    [{r['mode'].upper()}] RL={r['rougeL']:.4f} BLEU={r['bleu']:.4f}")
+            if monitor.update(unit.model, unit.index, rows):
+                print(f"  >> Stopping {monitor.describe(unit.model)}")
+    finally:
+        if sched is not None:
+            sched.close()
+        if pool is not None:
+            pool.close()
 
-    summaries = summarize(all_rows)
-    out_dir = timestamped_outdir(settings.out_dir)
-    write_csvs(all_rows, summaries, out_dir)
+    # Final outputs are rebuilt from the checkpoint, so resumed and fresh runs write identical CSVs.
+    all_rows, row_refs = ordered_rows(ckpt.load(), model_list)
+    ckpt.close()
+    # Rows without bertscore_s have not been through BERTScore yet (inline scoring, or resumed from
+    # such a run). The model is only loaded here, once there is something to score: with
+    # --score-workers the workers load their own, and --help or a fully scored resume never pays for it.
+    todo = [i for i, r in enumerate(all_rows) if not r.get("bertscore_s")]
+    if todo and not args.no_bertscore:
+        berts = shared_bertscorer(settings.bertscore_model)
+        if berts is not None:
+            print(f"\nScoring BERTScore for {len(todo)} answers ...")
+            fill_bertscore([all_rows[i] for i in todo], [row_refs[i] for i in todo], berts, batch_size=args.bertscore_batch_size)
 
-    print("\n== SUMMARY (mean metrics) ==")
-    for r in summaries:
+    summaries, deltas, profile_path = write_results(
+        all_rows, out_dir, bootstrap=args.bootstrap, seed=settings.seed, parquet=args.parquet, with_bertscore=not args.no_bertscore,
+    )
+    sequential_path = monitor.write(out_dir) if can_stop else None
+    if shards > 1:
+        # Counted while the run streamed the dataset. Only if every pass was cut short (all models
+        # stopped) is it read once more, without retrieval.
+        if examples is not None:
+            n_examples = len(examples)
+        elif n_streamed:
+            n_examples = n_streamed[0]
+        else:
+            n_examples = sum(1 for _ in iter_examples(args.dataset, limit=args.limit, shard=shard))
+        write_manifest(out_dir, {"shard_index": args.shard_index, "n_examples": n_examples, "config": run_config})
+
+    print_results(summaries, deltas, args.bootstrap)
+    if no_paths:
+        shown = ", ".join(map(str, sorted(no_paths)[:10])) + (", ..." if len(no_paths) > 10 else "")
+        print(f"\nWarning: retrieval found no paths for {len(no_paths)} examples ({shown}); they were answered from an empty context")
+    for model, st in chat.stats().items():
         print(
-            f"{r['model']:>10s} | {r['mode']:>6s} | N={r['n_examples']}" \
-            f" | R1={r['mean_rouge1']} | RL={r['mean_rougeL']} | BLEU={r['mean_bleu']} | BERT-F1={r['mean_bertscore_f1']}"
+            f"\nAPI {model}: requests={st['requests']} throttled={st['throttled']} ({st['throttle_wait_s']:.1f}s)"
+            f" 429s={st['rate_limited']} retries={st['retries']} failures={st['failures']}"
+            f" breaker_opens={st['breaker_opens']} ({st['breaker_wait_s']:.1f}s)"
+        )
+    if cache is not None:
+        st = cache.stats()
+        print(
+            f"\nLLM cache ({cache.path}): hits={st['hits']} misses={st['misses']}"
+            f" writes={st['writes']} evictions={st['evictions']} hit_rate={st['hit_rate']:.1%}"
         )
-    print(f"\nResults written to: {out_dir}")
\ No newline at end of file
+        cache.close()
+    if sequential_path:
+        print("\n== SEQUENTIAL ==")
+        for model in model_list:
+            print(f"  {monitor.describe(model)}")
+        print(f"Stopping report: {sequential_path}")
+    print(f"\nStage latency profile (p50/p95/p99): {profile_path}")
+    print(f"Results written to: {out_dir}")
\ No newline at end of file
@@ -17,6 +17,9 @@ class Settings:
     min_words: int
     max_words: int
     out_dir: str = "outputs"
+    concat_format: str = "full"  # "full" (make_concat_context) or "compact" (make_compact_context)
+    max_context_tokens: Optional[int] = None  # drop lowest-ranked paths from the concat context beyond this
+    openai_base_url: Optional[str] = None  # e.g. a local mock or proxy; None = the SDK default
 
     @staticmethod
     def from_env() -> "Settings":
@@ -30,6 +33,9 @@ class Settings:
         berts_model = os.getenv("BERTSCORE_MODEL", "roberta-large").strip()
         min_w = int(os.getenv("ANSWER_MIN_WORDS", "15"))
         max_w = int(os.getenv("ANSWER_MAX_WORDS", "40"))
+        concat_format = os.getenv("CONCAT_FORMAT", "full").strip() or "full"
+        max_ctx = os.getenv("MAX_CONTEXT_TOKENS", "").strip()
+        base_url = os.getenv("OPENAI_BASE_URL", "").strip() or None
         return Settings(
             openai_api_key=key,
             model_list=models,
@@ -39,4 +45,7 @@ class Settings:
             bertscore_model=berts_model,
             min_words=min_w,
             max_words=max_w,
+            concat_format=concat_format,
+            max_context_tokens=int(max_ctx) if max_ctx else None,
+            openai_base_url=base_url,
         )
\ No newline at end of file
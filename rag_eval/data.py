@@ -1,25 +1,37 @@
 from __future__ import annotations
+import gzip
+import io
+import json
+import sys
 from dataclasses import dataclass
-from typing import List
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
 
-@dataclass
+# Graph records are slotted (no per-instance __dict__); Node/Edge are immutable so a
+# node can be shared by every path that visits it. See pathstore.PathStore for a
+# columnar alternative when holding millions of edges.
+
+@dataclass(frozen=True)
 class Node:
+    __slots__ = ("id", "text")
     id: str
     text: str
 
-@dataclass
+@dataclass(frozen=True)
 class Edge:
+    __slots__ = ("src", "dst", "relation")
     src: str
     dst: str
     relation: str
 
 @dataclass
 class Path:
+    __slots__ = ("nodes", "edges")
     nodes: List[Node]
     edges: List[Edge]  # edges[i] connects nodes[i] -> nodes[i+1]
 
 @dataclass
 class Example:
+    __slots__ = ("query", "paths", "gold_refs")
     query: str
     paths: List[Path]
     gold_refs: List[str]
@@ -136,4 +148,120 @@ def build_examples() -> List[Example]:
         ]
     ))
 
-    return exs
\ No newline at end of file
+    return exs
+
+
+# ---------------------------------------------------------------------------
+# JSONL datasets
+#
+# One example per line:
+#   {"query": "...", "gold_refs": ["...", ...],
+#    "nodes": [{"id": "ME0", "text": "..."}, ...],
+#    "paths": [{"nodes": ["ME0", "ME1"],
+#               "edges": [{"src": "ME0", "dst": "ME1", "relation": "has_property"}]}, ...]}
+# Path nodes are ids into the example's node table, so a node shared by several
+# paths is stored (and loaded) once.
+# ---------------------------------------------------------------------------
+
+def _open_text(path: str, mode: str) -> io.TextIOBase:
+    if path.endswith(".gz"):
+        return gzip.open(path, mode + "t", encoding="utf-8")  # type: ignore[return-value]
+    return open(path, mode, encoding="utf-8")
+
+
+def example_from_record(rec: Dict[str, Any]) -> Example:
+    """Build an Example from one JSONL record, interning nodes by id.
+
+    Ids and relation labels go through sys.intern, so an Edge's src/dst share
+    storage with the node ids and repeated relation labels are stored once.
+    """
+    nodes: Dict[str, Node] = {}
+    for n in rec.get("nodes", []):
+        nid = sys.intern(n["id"])
+        nodes[nid] = Node(nid, n["text"])
+    paths: List[Path] = []
+    for p in rec["paths"]:
+        try:
+            path_nodes = [nodes[nid] for nid in p["nodes"]]
+        except KeyError as e:
+            raise ValueError(f"Path references unknown node {e} in query {rec.get('query')!r}") from None
+        path_edges = [
+            Edge(sys.intern(e["src"]), sys.intern(e["dst"]), sys.intern(e["relation"])) for e in p.get("edges", [])
+        ]
+        paths.append(Path(nodes=path_nodes, edges=path_edges))
+    return Example(query=rec["query"], paths=paths, gold_refs=list(rec["gold_refs"]))
+
+
+def example_to_record(ex: Example) -> Dict[str, Any]:
+    nodes: Dict[str, str] = {}
+    for p in ex.paths:
+        for n in p.nodes:
+            nodes.setdefault(n.id, n.text)
+    return {
+        "query": ex.query,
+        "gold_refs": list(ex.gold_refs),
+        "nodes": [{"id": nid, "text": text} for nid, text in nodes.items()],
+        "paths": [
+            {
+                "nodes": [n.id for n in p.nodes],
+                "edges": [{"src": e.src, "dst": e.dst, "relation": e.relation} for e in p.edges],
+            }
+            for p in ex.paths
+        ],
+    }
+
+
+def write_examples_jsonl(examples: Iterable[Example], path: str) -> int:
+    """Write examples as JSONL (gzip if path ends with .gz); returns the number written."""
+    n = 0
+    with _open_text(path, "w") as f:
+        for ex in examples:
+            f.write(json.dumps(example_to_record(ex), ensure_ascii=False))
+            f.write("\n")
+            n += 1
+    return n
+
+
+def parse_shard(spec: Optional[str]) -> Tuple[int, int]:
+    """Parse "i/n" (0-based shard i of n) into (i, n); None means the whole dataset."""
+    if not spec:
+        return 0, 1
+    i, sep, n = spec.partition("/")
+    if not sep or not i.strip().isdigit() or not n.strip().isdigit():
+        raise ValueError(f"Invalid shard '{spec}', expected i/n")
+    index, count = int(i), int(n)
+    if count < 1 or not 0 <= index < count:
+        raise ValueError(f"Invalid shard '{spec}', need 0 <= i < n")
+    return index, count
+
+
+def iter_examples_jsonl(path: str, limit: Optional[int] = None, shard: Tuple[int, int] = (0, 1)) -> Iterator[Example]:
+    """Lazily yield Examples from a (optionally gzipped) JSONL file.
+
+    `limit` caps the number of records read from the start of the file; `shard`
+    then keeps records whose 0-based position i satisfies i % n == index.
+    """
+    index, count = shard
+    with _open_text(path, "r") as f:
+        pos = 0
+        for line in f:
+            if not line.strip():
+                continue
+            if limit is not None and pos >= limit:
+                break
+            if pos % count == index:
+                yield example_from_record(json.loads(line))
+            pos += 1
+
+
+def iter_examples(dataset: Optional[str] = None, limit: Optional[int] = None, shard: Tuple[int, int] = (0, 1)) -> Iterator[Example]:
+    """Examples from a JSONL dataset, or the built-in examples when no dataset is given."""
+    if dataset:
+        yield from iter_examples_jsonl(dataset, limit=limit, shard=shard)
+        return
+    index, count = shard
+    for pos, ex in enumerate(build_examples()):
+        if limit is not None and pos >= limit:
+            break
+        if pos % count == index:
+            yield ex
@@ -1,21 +1,103 @@
 from __future__ import annotations
-from typing import List
+from functools import lru_cache
+from typing import Callable, Dict, List, Optional, Sequence, Set, Tuple
 from .data import Path
 
+# Marks an edge that does not join its neighbouring nodes (a malformed path).
+MISMATCH = "(⚠ edge-node mismatch)"
+
+
 def linearize_path(path: Path) -> str:
     """Render a path as a labeled sequence: [N1] text --rel→ [N2] text ..."""
     parts = []
-    for i, node in enumerate(path.nodes):
+    nodes, edges = path.nodes, path.edges  # fetch once: PathView builds these on access
+    for i, node in enumerate(nodes):
         parts.append(f"[{node.id}] {node.text}")
-        if i < len(path.edges):
-            e = path.edges[i]
+        if i < len(edges):
+            e = edges[i]
             # light safety check on alignment
-            if e.src != path.nodes[i].id or e.dst != path.nodes[i + 1].id:
-                parts.append("  (⚠ edge-node mismatch)  ")
+            if e.src != nodes[i].id or e.dst != nodes[i + 1].id:
+                parts.append(f"  {MISMATCH}  ")
             parts.append(f"  --{e.relation}→  ")
     return "".join(parts)
 
 
 def make_concat_context(paths: List[Path]) -> str:
     """Baseline: list each linearized path, separated by blank lines."""
-    return "\n\n".join(linearize_path(p) for p in paths)
\ No newline at end of file
+    return "\n\n".join(linearize_path(p) for p in paths)
+
+
+def make_compact_context(paths: List[Path]) -> str:
+    """Paths merged into a prefix trie, one node per line.
+
+    Paths that share leading nodes share those lines, and a path starting at
+    a node already placed continues from that node; a child is indented under
+    its parent and introduced by its relation. A node's text is written at its
+    first mention only ([ID] text); later mentions are just [ID]. As in
+    linearize_path, an edge that does not join its two nodes is flagged.
+    """
+    root: Dict[Tuple[Optional[str], str], dict] = {}
+    placed: Dict[str, dict] = {}  # node id -> children of its first trie position
+    texts: Dict[str, str] = {}
+    for p in paths:
+        nodes, edges = p.nodes, p.edges
+        if not nodes:
+            continue
+        level = placed.get(nodes[0].id)
+        if level is None:
+            level = root.setdefault((None, nodes[0].id), {})
+        for i, node in enumerate(nodes):
+            texts.setdefault(node.id, node.text)
+            if i:
+                e = edges[i - 1] if i <= len(edges) else None
+                rel = e.relation if e is not None else ""
+                if e is None or e.src != nodes[i - 1].id or e.dst != node.id:
+                    rel = f"{rel} {MISMATCH}".lstrip()
+                level = level.setdefault((rel, node.id), {})
+            placed.setdefault(node.id, level)
+
+    lines: List[str] = []
+    seen: Set[str] = set()
+    stack = [(child, 0) for child in reversed(list(root.items()))]
+    while stack:
+        ((rel, nid), children), depth = stack.pop()
+        label = f"[{nid}]" if nid in seen else f"[{nid}] {texts[nid]}"
+        seen.add(nid)
+        lines.append("  " * depth + (f"--{rel}→ " if rel is not None else "") + label)
+        stack.extend((child, depth + 1) for child in reversed(list(children.items())))
+    return "\n".join(lines)
+
+
+@lru_cache(maxsize=1)
+def _encoding():
+    try:
+        import tiktoken  # type: ignore  # optional; imported on first use
+        return tiktoken.get_encoding("o200k_base")
+    except Exception:  # not installed, or offline without a cached encoding file
+        return None
+
+
+def count_tokens(text: str) -> int:
+    """Tokens in `text` with the GPT-4o tokenizer if tiktoken is available, else ~4 characters per token."""
+    enc = _encoding()
+    if enc is None:
+        return (len(text) + 3) // 4
+    return len(enc.encode(text, disallowed_special=()))
+
+
+def fit_paths(paths: Sequence[Path], render: Callable[[List[Path]], str], max_tokens: Optional[int]) -> List[Path]:
+    """Longest prefix of `paths` (ranked best first) whose rendering fits in max_tokens.
+
+    The top-ranked path is always kept, even if it alone is over budget.
+    """
+    paths = list(paths)
+    if max_tokens is None or count_tokens(render(paths)) <= max_tokens:
+        return paths
+    lo, hi = min(1, len(paths)), len(paths) - 1  # the answer lies in [lo, hi]
+    while lo < hi:
+        mid = (lo + hi + 1) // 2
+        if count_tokens(render(paths[:mid])) <= max_tokens:
+            lo = mid
+        else:
+            hi = mid - 1
+    return paths[:lo]
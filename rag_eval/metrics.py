@@ -1,15 +1,37 @@
-from typing import Dict, List, Optional
-from rouge_score import rouge_scorer
-import sacrebleu
+from __future__ import annotations
+import threading
+from collections import Counter, defaultdict
+from functools import lru_cache
+from typing import TYPE_CHECKING, Dict, List, Optional, Sequence, Tuple
 
-
-try:
+# rouge_score, nltk, sacrebleu and bert_score (torch/transformers) are imported on first
+# use, so importing this module (and the CLI) stays cheap; see benchmarks/bench_import_time.py.
+if TYPE_CHECKING:
     from bert_score import BERTScorer
-except Exception:
-    BERTScorer = None
+
+
+_bertscorers: Dict[str, Optional["BERTScorer"]] = {}
+_bertscorers_lock = threading.Lock()
+
+
+def shared_bertscorer(model_type: str) -> Optional["BERTScorer"]:
+    """Process-wide BERTScorer (English, baseline-rescaled) for `model_type`, loaded on first call.
+
+    Returns None (and warns once) if bert_score is missing or the model cannot be loaded.
+    """
+    with _bertscorers_lock:
+        if model_type not in _bertscorers:
+            try:
+                from bert_score import BERTScorer
+                _bertscorers[model_type] = BERTScorer(model_type=model_type, lang="en", rescale_with_baseline=True)
+            except Exception as e:
+                print(f"[WARN] BERTScore disabled ({type(e).__name__}: {e})")
+                _bertscorers[model_type] = None
+        return _bertscorers[model_type]
 
 
 def bleu_multi_ref(hyp: str, refs: List[str]) -> float:
+    import sacrebleu
     try:
         return sacrebleu.sentence_bleu(hyp, refs).score / 100
     except Exception:
@@ -25,11 +47,210 @@ def rouge_best(hyp: str, refs: List[str], scorer) -> Dict[str, float]:
     return best
 
 
+@lru_cache(maxsize=1)
+def _porter():
+    from nltk.stem.porter import PorterStemmer  # the stemmer rouge_score uses
+    return PorterStemmer()
+
+
+@lru_cache(maxsize=1 << 16)
+def _stem(token: str) -> str:
+    return _porter().stem(token)
+
+
+@lru_cache(maxsize=1)
+def _rouge_tokenize():
+    from rouge_score import tokenize
+    return tokenize
+
+
+def rouge_tokens(text: str, use_stemmer: bool = True) -> List[str]:
+    """rouge_score's default tokenization (lowercase, alnum runs, Porter stem for len > 3), with stems memoized."""
+    tok = _rouge_tokenize()
+    text = tok.NON_ALPHANUM_RE.sub(" ", text.lower())
+    tokens = tok.SPACES_RE.split(text)
+    if use_stemmer:
+        tokens = [_stem(t) if len(t) > 3 else t for t in tokens]
+    return [t for t in tokens if tok.VALID_TOKEN_RE.match(t)]
+
+
+def _fmeasure(p: float, r: float) -> float:
+    return 2 * p * r / (p + r) if p + r > 0 else 0.0
+
+
+def _lcs_masks(tokens: Sequence[str]) -> Dict[str, int]:
+    """token -> bitmask of its positions, for bit-parallel LCS."""
+    masks: Dict[str, int] = {}
+    for i, t in enumerate(tokens):
+        masks[t] = masks.get(t, 0) | (1 << i)
+    return masks
+
+
+def _lcs_length(masks: Dict[str, int], n: int, hyp: Sequence[str]) -> int:
+    """LCS length of the reference behind `masks` (n tokens) and hyp (Hyyrö's bit-vector algorithm)."""
+    full = (1 << n) - 1
+    v = full
+    for t in hyp:
+        u = v & masks.get(t, 0)
+        v = ((v + u) | (v - u)) & full
+    return n - bin(v).count("1")
+
+
+class ReferenceIndex:
+    """Precomputed statistics of one example's gold references.
+
+    Caches, per reference, the stemmed ROUGE tokens, their unigram counts and
+    LCS position masks, plus the merged (max over references) BLEU n-gram counts
+    and reference lengths after 13a tokenization. rouge/bleu then only have to
+    process the hypothesis; scores equal rouge_best/bleu_multi_ref.
+    """
+
+    def __init__(self, refs: Sequence[str], use_stemmer: bool = True, max_ngram_order: int = 4):
+        from sacrebleu.metrics.bleu import BLEU
+        from sacrebleu.metrics.helpers import extract_all_word_ngrams
+
+        self.refs = list(refs)
+        self.use_stemmer = use_stemmer
+        # ROUGE-1 / ROUGE-L
+        self._tokens = [rouge_tokens(r, use_stemmer) for r in self.refs]
+        self._unigrams = [Counter(t) for t in self._tokens]
+        self._masks = [_lcs_masks(t) for t in self._tokens]
+        # BLEU (same configuration as sacrebleu.sentence_bleu)
+        self._bleu = BLEU(effective_order=True)
+        self._extract_ngrams = extract_all_word_ngrams
+        self._max_order = max_ngram_order
+        self._ref_ngrams: Counter = Counter()
+        self._ref_lens: List[int] = []
+        for r in self.refs:
+            ngrams, n = extract_all_word_ngrams(self._bleu._preprocess_segment(r), 1, max_ngram_order)
+            self._ref_lens.append(n)
+            for g, c in ngrams.items():
+                if c > self._ref_ngrams[g]:
+                    self._ref_ngrams[g] = c
+
+    def rouge(self, hyp: str) -> Dict[str, float]:
+        """Best ROUGE-1 / ROUGE-L F1 over the references."""
+        h = rouge_tokens(hyp, self.use_stemmer)
+        h_uni = Counter(h)
+        best = {"rouge1": 0.0, "rougeL": 0.0}
+        for toks, uni, masks in zip(self._tokens, self._unigrams, self._masks):
+            overlap = sum(min(c, h_uni[t]) for t, c in uni.items())
+            r1 = _fmeasure(overlap / max(len(h), 1), overlap / max(len(toks), 1))
+            rl = 0.0
+            if toks and h:
+                lcs = _lcs_length(masks, len(toks), h)
+                rl = _fmeasure(lcs / len(h), lcs / len(toks))
+            best["rouge1"] = max(best["rouge1"], r1)
+            best["rougeL"] = max(best["rougeL"], rl)
+        return best
+
+    def bleu(self, hyp: str) -> float:
+        """Multi-reference sentence BLEU in [0, 1]."""
+        if not self.refs:
+            return 0.0
+        try:
+            ngrams, hyp_len = self._extract_ngrams(self._bleu._preprocess_segment(hyp), 1, self._max_order)
+            # closest reference length, ties going to the shorter one (as sacrebleu)
+            ref_len = min(self._ref_lens, key=lambda n: (abs(n - hyp_len), n))
+            correct = [0] * self._max_order
+            total = [0] * self._max_order
+            for g, c in ngrams.items():
+                total[len(g) - 1] += c
+                if g in self._ref_ngrams:
+                    correct[len(g) - 1] += min(c, self._ref_ngrams[g])
+            score = self._bleu.compute_bleu(
+                correct, total, hyp_len, ref_len,
+                smooth_method=self._bleu.smooth_method, smooth_value=self._bleu.smooth_value,
+                effective_order=True, max_ngram_order=self._max_order,
+            )
+            return score.score / 100
+        except Exception:
+            return 0.0
+
+
+@lru_cache(maxsize=4096)
+def _reference_index(refs: Tuple[str, ...], use_stemmer: bool) -> ReferenceIndex:
+    return ReferenceIndex(refs, use_stemmer=use_stemmer)
+
+
+def reference_index(refs: Sequence[str], use_stemmer: bool = True) -> ReferenceIndex:
+    """Shared ReferenceIndex for a reference set (LRU-cached, so each example's refs are indexed once)."""
+    return _reference_index(tuple(refs), use_stemmer)
+
+
 def bertscore_best(hyp: str, refs: List[str], scorer: Optional[BERTScorer]) -> float:
     if scorer is None:
         return 0.0
     best = 0.0
     for ref in refs:
-        _, _, F1 = scorer.score([hyp], [ref], device="cpu")
+        _, _, F1 = scorer.score([hyp], [ref])
         best = max(best, float(F1[0]))
-    return best
\ No newline at end of file
+    return best
+
+
+def bertscore_best_batch(hyps: List[str], refs: List[List[str]], scorer: Optional[BERTScorer], batch_size: int = 64) -> List[float]:
+    """Vectorized bertscore_best over many (hyp, refs) pairs.
+
+    Every unique text is embedded exactly once, in batches of `batch_size`; the
+    greedy-matching F1 is then computed per reference set with batched matmuls
+    and reduced with a max over references (clamped at 0, as in bertscore_best).
+    """
+    if scorer is None:
+        return [0.0] * len(hyps)
+    import torch
+    from torch.nn.utils.rnn import pad_sequence
+    from bert_score.utils import get_bert_embedding
+
+    if scorer.idf:
+        idf_dict = scorer._idf_dict
+    else:  # mirrors BERTScorer.score: uniform weights, [CLS]/[SEP] ignored
+        idf_dict = defaultdict(lambda: 1.0)
+        idf_dict[scorer._tokenizer.sep_token_id] = 0
+        idf_dict[scorer._tokenizer.cls_token_id] = 0
+
+    texts = list(dict.fromkeys(list(hyps) + [r for rs in refs for r in rs]))
+    emb: Dict[str, Tuple["torch.Tensor", "torch.Tensor"]] = {}
+    with torch.no_grad():
+        for start in range(0, len(texts), batch_size):
+            chunk = texts[start:start + batch_size]
+            e, mask, idf = get_bert_embedding(
+                chunk, scorer._model, scorer._tokenizer, idf_dict, device=scorer.device, all_layers=False
+            )
+            e = e / e.norm(dim=-1, keepdim=True)
+            for i, text in enumerate(chunk):
+                n = int(mask[i].sum())
+                emb[text] = (e[i, :n], idf[i, :n].float())
+
+    def _stack(items: List[str]):
+        es = pad_sequence([emb[t][0] for t in items], batch_first=True)
+        ws = pad_sequence([emb[t][1] for t in items], batch_first=True)  # padding gets weight 0
+        valid = pad_sequence([torch.ones(len(emb[t][1]), dtype=torch.bool, device=es.device) for t in items], batch_first=True)
+        return es, ws, valid
+
+    f_base = float(scorer.baseline_vals[2]) if scorer.rescale_with_baseline else None
+
+    # Rows of one example share the same gold refs: score each ref set against all its hyps at once.
+    groups: Dict[Tuple[str, ...], List[int]] = {}
+    for i, rs in enumerate(refs):
+        groups.setdefault(tuple(rs), []).append(i)
+
+    out = [0.0] * len(hyps)
+    with torch.no_grad():
+        for ref_set, idxs in groups.items():
+            if not ref_set:
+                continue
+            he, hw, hvalid = _stack([hyps[i] for i in idxs])  # (m, Lh, d)
+            re, rw, rvalid = _stack(list(ref_set))  # (k, Lr, d)
+            sim = torch.einsum("mhd,krd->mkhr", he, re)
+            neg = torch.finfo(sim.dtype).min
+            prec = sim.masked_fill(~rvalid[None, :, None, :], neg).max(dim=3).values  # (m, k, Lh)
+            rec = sim.masked_fill(~hvalid[:, None, :, None], neg).max(dim=2).values  # (m, k, Lr)
+            P = (prec * hw[:, None, :]).sum(-1) / hw.sum(-1, keepdim=True)
+            R = (rec * rw[None, :, :]).sum(-1) / rw.sum(-1)[None, :]
+            F = torch.nan_to_num(2 * P * R / (P + R))
+            if f_base is not None:
+                F = (F - f_base) / (1 - f_base)
+            best = F.max(dim=1).values.clamp(min=0.0)
+            for j, i in enumerate(idxs):
+                out[i] = float(best[j])
+    return out
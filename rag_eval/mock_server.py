@@ -0,0 +1,312 @@
+"""Local mock of the chat completions endpoint, for offline benchmarks and tests.
+
+    python -m rag_eval.mock_server --port 8000 --latency lognormal:0.3,0.5 --error-rate 0.02
+    OPENAI_BASE_URL=http://127.0.0.1:8000/v1 OPENAI_API_KEY=mock python scripts/run_eval.py
+
+Responses are deterministic functions of the request: summarizer prompts get the
+"Must-keep phrases / Facts / Synthesis / final sentence" layout built from the
+evidence lines, answer prompts one sentence built from the context. Latency and
+injected errors are drawn from a seeded generator. Tests can also script the
+outcome of a model's next requests:
+
+    python -m rag_eval.mock_server --script gpt-4o=429,429,ok,500 "*=500"
+"""
+from __future__ import annotations
+import argparse
+import hashlib
+import json
+import random
+import re
+import sys
+import threading
+import time
+from collections import deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Deque, Dict, List, Optional, Sequence, Tuple
+
+_WORD = re.compile(r"[A-Za-z0-9’'\-]+")
+
+
+class LatencyModel:
+    """Seconds before the first token, from a spec like "fixed:0.2", "uniform:0.1,0.5",
+    "normal:0.3,0.05" or "lognormal:MEDIAN,SIGMA" (never negative)."""
+
+    def __init__(self, spec: str = "fixed:0"):
+        kind, _, params = spec.partition(":")
+        self.kind = kind
+        self.params = [float(x) for x in params.split(",") if x]
+        expected = {"fixed": 1, "uniform": 2, "normal": 2, "lognormal": 2}
+        if expected.get(kind) != len(self.params):
+            raise ValueError(f"Invalid latency spec '{spec}'")
+
+    def sample(self, rng: random.Random) -> float:
+        p = self.params
+        if self.kind == "fixed":
+            return p[0]
+        if self.kind == "uniform":
+            return rng.uniform(p[0], p[1])
+        if self.kind == "normal":
+            return max(0.0, rng.gauss(p[0], p[1]))
+        return p[0] * rng.lognormvariate(0.0, p[1])
+
+
+def _words(text: str) -> List[str]:
+    return _WORD.findall(text)
+
+
+def _sentence(words: List[str], n: int) -> str:
+    out = (words * (n // max(len(words), 1) + 1))[:n] if words else ["Insufficient", "context"]
+    return " ".join(out).rstrip(".,;:") + "."
+
+
+def mock_content(messages: List[Dict[str, str]], max_tokens: int) -> str:
+    """Deterministic completion for a request (same messages, same text)."""
+    system = messages[0].get("content", "") if messages else ""
+    user = messages[-1].get("content", "") if messages else ""
+    digest = int(hashlib.sha1(json.dumps(messages, sort_keys=True).encode("utf-8")).hexdigest(), 16)
+    m = re.search(r"(\d+)\s*(?:–|-|and)\s*(\d+)\s*words", user)
+    lo, hi = (int(m.group(1)), int(m.group(2))) if m else (15, 40)
+    n_words = min(lo + digest % max(hi - lo + 1, 1), max_tokens)
+
+    if "Evidence chains" in user or "Evidence Weaver" in system:
+        evidence = [ln[2:] for ln in user.splitlines() if ln.startswith("- [")]
+        texts = [" ".join(re.sub(r"\[[^\]]*\]|--[^→]*→", " ", ln).split()) for ln in evidence]
+        words = _words(" ".join(texts))
+        phrases = sorted({w for w in words if w[:1].isupper() or w[:1].isdigit()})[:8]
+        lines = ["Must-keep phrases:"] + [f"- {p}" for p in phrases or ["none"]]
+        lines += ["Facts:"] + [f"- {t}" for t in texts[:6]]
+        lines.append("Synthesis: " + _sentence(words, min(20, len(words) or 2)))
+        lines.append(_sentence(words, n_words))
+        return "\n".join(lines)
+
+    ctx = re.search(r'Context:\s*"""(.*?)"""', user, re.S)
+    words = _words(ctx.group(1) if ctx else user)
+    start = digest % max(len(words), 1)
+    return _sentence(words[start:] + words[:start], n_words)
+
+
+# Scripted outcomes: "429" (rate limited, with retry-after-ms), "500" (server error), "ok" (normal response),
+# "cut" (the connection drops halfway through the response body, e.g. mid-stream).
+SCRIPT_ACTIONS = ("429", "500", "ok", "cut")
+
+
+class MockConfig:
+    def __init__(
+        self,
+        latency: str = "fixed:0",
+        token_latency: float = 0.0,
+        error_rate: float = 0.0,
+        rate_limit_rate: float = 0.0,
+        seed: int = 0,
+        script: Optional[Dict[str, Sequence[str]]] = None,
+        retry_after_ms: int = 200,
+    ):
+        self.latency = LatencyModel(latency)
+        self.token_latency = token_latency  # seconds per streamed completion token after the first
+        self.error_rate = error_rate  # share of requests answered with HTTP 500
+        self.rate_limit_rate = rate_limit_rate  # share answered with HTTP 429 (+ retry-after-ms)
+        self.retry_after_ms = retry_after_ms
+        # model (or "*" for any model without its own) -> outcomes of its next requests, before random draws
+        self._script: Dict[str, Deque[str]] = {}
+        for model, actions in (script or {}).items():
+            bad = [a for a in actions if a not in SCRIPT_ACTIONS]
+            if bad:
+                raise ValueError(f"Unknown script actions {bad}, expected {SCRIPT_ACTIONS}")
+            self._script[model] = deque(actions)
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        self.stats = {"requests": 0, "errors": 0, "rate_limited": 0}
+        self.log: List[Tuple[float, str, int]] = []  # (time.monotonic(), model, HTTP status) per completion request
+
+    def scripted(self, model: str) -> Optional[str]:
+        """Next scripted outcome for `model`, or None once its script (and "*") is used up."""
+        with self._lock:
+            for key in (model, "*"):
+                actions = self._script.get(key)
+                if actions:
+                    return actions.popleft()
+        return None
+
+    def record(self, model: str, status: int) -> None:
+        with self._lock:
+            self.log.append((time.monotonic(), model, status))
+            if status == 429:
+                self.stats["rate_limited"] += 1
+            elif status == 500:
+                self.stats["errors"] += 1
+
+    def draw(self) -> Tuple[float, float]:
+        """(latency, uniform draw for error injection), from the shared seeded generator."""
+        with self._lock:
+            self.stats["requests"] += 1
+            return self.latency.sample(self._rng), self._rng.random()
+
+
+class _Handler(BaseHTTPRequestHandler):
+    server: "MockServer"
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True  # small SSE chunks must not wait for delayed ACKs
+
+    def log_message(self, fmt: str, *args: Any) -> None:  # keep benchmark output clean
+        pass
+
+    def _json(self, status: int, body: Dict[str, Any], headers: Optional[Dict[str, str]] = None) -> None:
+        data = json.dumps(body).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        for k, v in (headers or {}).items():
+            self.send_header(k, v)
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_GET(self) -> None:
+        if self.path.rstrip("/").endswith("/models"):
+            self._json(200, {"object": "list", "data": []})
+        else:
+            self._json(404, {"error": {"message": "not found", "type": "invalid_request_error"}})
+
+    def do_POST(self) -> None:
+        length = int(self.headers.get("Content-Length") or 0)
+        req = json.loads(self.rfile.read(length) or b"{}")
+        if not self.path.rstrip("/").endswith("/chat/completions"):
+            self._json(404, {"error": {"message": "not found", "type": "invalid_request_error"}})
+            return
+        cfg = self.server.config
+        model = str(req.get("model", ""))
+        latency, u = cfg.draw()
+        action = cfg.scripted(model)
+        if action == "429" or (action is None and u < cfg.rate_limit_rate):
+            cfg.record(model, 429)
+            time.sleep(min(latency, 0.05))
+            self._json(
+                429, {"error": {"message": "mock rate limit", "type": "rate_limit_error"}},
+                {"retry-after-ms": str(cfg.retry_after_ms)},
+            )
+            return
+        if action == "500" or (action is None and u < cfg.rate_limit_rate + cfg.error_rate):
+            cfg.record(model, 500)
+            time.sleep(latency)
+            self._json(500, {"error": {"message": "mock server error", "type": "server_error"}})
+            return
+        cfg.record(model, 200)
+
+        messages = req.get("messages") or []
+        text = mock_content(messages, int(req.get("max_tokens") or 300))
+        prompt_tokens = sum(len(m.get("content") or "") for m in messages) // 4 + 4 * len(messages)
+        pieces = re.findall(r"\S+\s*", text)
+        usage = {"prompt_tokens": prompt_tokens, "completion_tokens": len(pieces), "total_tokens": prompt_tokens + len(pieces)}
+        base = {"id": f"chatcmpl-mock{cfg.stats['requests']}", "created": int(time.time()), "model": req.get("model", "mock")}
+        time.sleep(latency)
+        cut = action == "cut"
+
+        if not req.get("stream"):
+            time.sleep(cfg.token_latency * max(len(pieces) - 1, 0))
+            body = {
+                **base, "object": "chat.completion",
+                "choices": [{"index": 0, "message": {"role": "assistant", "content": text}, "finish_reason": "stop"}],
+                "usage": usage,
+            }
+            if not cut:
+                self._json(200, body)
+                return
+            data = json.dumps(body).encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data[: len(data) // 2])
+            self.close_connection = True
+            return
+
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+
+        def send(obj: Any) -> None:
+            data = ("data: " + (obj if isinstance(obj, str) else json.dumps(obj)) + "\n\n").encode("utf-8")
+            self.wfile.write(f"{len(data):x}\r\n".encode() + data + b"\r\n")
+            self.wfile.flush()
+
+        chunk = {**base, "object": "chat.completion.chunk"}
+        for i, piece in enumerate(pieces[: len(pieces) // 2] if cut else pieces):
+            if i:
+                time.sleep(cfg.token_latency)
+            delta = {"role": "assistant", "content": piece} if i == 0 else {"content": piece}
+            send({**chunk, "choices": [{"index": 0, "delta": delta, "finish_reason": None}]})
+        if cut:
+            self.close_connection = True  # no terminating chunk: the client sees a truncated body
+            return
+        send({**chunk, "choices": [{"index": 0, "delta": {}, "finish_reason": "stop"}]})
+        if (req.get("stream_options") or {}).get("include_usage"):
+            send({**chunk, "choices": [], "usage": usage})
+        send("[DONE]")
+        self.wfile.write(b"0\r\n\r\n")
+        self.wfile.flush()
+
+
+class MockServer(ThreadingHTTPServer):
+    """Threaded mock server; serve_forever() blocks, start() runs it on a daemon thread."""
+
+    daemon_threads = True
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 0, config: Optional[MockConfig] = None):
+        super().__init__((host, port), _Handler)
+        self.config = config or MockConfig()
+
+    @property
+    def base_url(self) -> str:
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}/v1"
+
+    def handle_error(self, request: Any, client_address: Any) -> None:
+        if not isinstance(sys.exc_info()[1], ConnectionError):  # clients closing a stream early are normal
+            super().handle_error(request, client_address)
+
+    def start(self) -> "MockServer":
+        threading.Thread(target=self.serve_forever, name="mock-llm", daemon=True).start()
+        return self
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Mock OpenAI chat completions server")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000, help="0 picks a free port")
+    parser.add_argument("--latency", default="fixed:0.2", help="fixed:S | uniform:A,B | normal:MU,SD | lognormal:MEDIAN,SIGMA")
+    parser.add_argument("--token-latency", type=float, default=0.0, help="Seconds per additional completion token")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Share of requests failing with HTTP 500")
+    parser.add_argument("--rate-limit-rate", type=float, default=0.0, help="Share of requests failing with HTTP 429")
+    parser.add_argument("--retry-after-ms", type=int, default=200, help="retry-after-ms header of 429 responses")
+    parser.add_argument(
+        "--script", nargs="*", default=[], metavar="MODEL=A,B,...",
+        help=f"Outcomes of a model's next requests ({', '.join(SCRIPT_ACTIONS)}) before random draws; MODEL * = any model",
+    )
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    script = {}
+    for spec in args.script:
+        model, sep, actions = spec.rpartition("=")
+        if not sep or not model:
+            parser.error(f"Invalid script '{spec}', expected MODEL=A,B,...")
+        script[model] = [a.strip() for a in actions.split(",") if a.strip()]
+    try:
+        config = MockConfig(
+            args.latency, args.token_latency, args.error_rate, args.rate_limit_rate, args.seed,
+            script=script, retry_after_ms=args.retry_after_ms,
+        )
+    except ValueError as e:
+        parser.error(str(e))
+    server = MockServer(args.host, args.port, config)
+    print(f"Mock LLM listening on {server.base_url}", flush=True)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,21 +1,203 @@
-from typing import Dict, List, Optional
-from openai import OpenAI
+import threading
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from typing import Any, Dict, Iterator, List, Optional
+
+from .cache import ResponseCache, cache_key
+from .profiling import CallInfo
+from .ratelimit import ModelThrottle, RateLimiter, RetryPolicy, estimate_tokens
+
+
+class Deferred(Exception):
+    """Raised instead of sleeping by a call made under Chat.deferred(): the model must not be
+    called for `delay` seconds. Repeat the call, under the same PendingCall, after that."""
+
+    def __init__(self, delay: float):
+        super().__init__(f"call deferred by {delay:.3f}s")
+        self.delay = delay
+
+
+@dataclass
+class PendingCall:
+    """One logical call across its Deferred re-runs; its time is measured from t0."""
+    t0: float
+    info: CallInfo = field(default_factory=CallInfo)
+    attempt: int = 0  # failed attempts so far
+    admitted: bool = False  # the next attempt's rate budget is taken (and its wait served)
 
 
 class Chat:
-    def __init__(self, api_key: str):
-        self.client = OpenAI(api_key=api_key)
-
-
-def call(self, messages: List[Dict[str, str]], model: str, temperature: float = 0.0, max_tokens: int = 300, seed: Optional[int] = None) -> str:
-    try:
-        resp = self.client.chat.completions.create(
-        model=model,
-        messages=messages,
-        temperature=temperature,
-        max_tokens=max_tokens,
-        seed=seed,
-        )
-        return resp.choices[0].message.content.strip()
-    except Exception as e:
-        return f"[ERROR: {type(e).__name__}: {e}]"
\ No newline at end of file
+    def __init__(
+        self,
+        api_key: str,
+        cache: Optional[ResponseCache] = None,
+        limiter: Optional[RateLimiter] = None,
+        retry: Optional[RetryPolicy] = None,
+        stream: bool = False,
+        base_url: Optional[str] = None,
+    ):
+        from openai import OpenAI  # deferred: the SDK is only needed once a client is built
+
+        # Retries are handled here (with throttling feedback), not inside the SDK.
+        self.client = OpenAI(api_key=api_key, base_url=base_url, max_retries=0)
+        self.cache = cache
+        self.endpoint = str(self.client.base_url)  # part of the cache key
+        self.limiter = limiter or RateLimiter()
+        self.retry = retry or RetryPolicy()
+        self.stream_default = stream
+        self._local = threading.local()
+
+    @contextmanager
+    def deferred(self, pending: PendingCall) -> Iterator[PendingCall]:
+        """Within the block, a call on this thread continues `pending` and raises Deferred where it
+        would sleep (rate budget, open breaker, retry backoff), so a scheduler can free the thread
+        and re-run the call later; other models' requests keep going in the meantime."""
+        self._local.pending = pending
+        try:
+            yield pending
+        finally:
+            self._local.pending = None
+
+    def _wait(self, seconds: float) -> None:
+        if getattr(self._local, "pending", None) is not None:
+            raise Deferred(seconds)
+        time.sleep(seconds)
+
+    def last_info(self) -> CallInfo:
+        """CallInfo of the most recent call()/stream() made on the current thread."""
+        return getattr(self._local, "info", None) or CallInfo()
+
+    def call(
+        self,
+        messages: List[Dict[str, str]],
+        model: str,
+        temperature: float = 0.0,
+        max_tokens: int = 300,
+        seed: Optional[int] = None,
+        stream: Optional[bool] = None,
+    ) -> str:
+        """Complete a chat; with stream=True (or Chat(stream=True)) the response is streamed
+        so that time-to-first-token is recorded in last_info().ttft_s. A failed call, including a
+        stream that broke partway, returns its "[ERROR: ...]" marker, never partial text."""
+        text = "".join(self._run(messages, model, temperature, max_tokens, seed, self.stream_default if stream is None else stream)).strip()
+        return self.last_info().error or text
+
+    def stream(self, messages: List[Dict[str, str]], model: str, temperature: float = 0.0, max_tokens: int = 300, seed: Optional[int] = None) -> Iterator[str]:
+        """Yield content deltas as they arrive (a cache hit or an error arrives as one piece). If the
+        stream breaks partway the deltas just stop; last_info().error then holds the error marker."""
+        return self._run(messages, model, temperature, max_tokens, seed, True)
+
+    def _run(self, messages: List[Dict[str, str]], model: str, temperature: float, max_tokens: int, seed: Optional[int], stream: bool) -> Iterator[str]:
+        state = getattr(self._local, "pending", None) or PendingCall(time.perf_counter())
+        info = state.info
+        self._local.info = info
+        key = None
+        if self.cache is not None:
+            key = cache_key(self.endpoint, model, messages, temperature, max_tokens, seed)
+            if info.cache != "miss":  # a re-run after Deferred has looked already
+                hit = self.cache.get(key)
+                if hit is not None:
+                    info.cache = "hit"
+                    info.service_s = info.ttft_s = time.perf_counter() - state.t0 - info.queue_s
+                    yield hit
+                    return
+                info.cache = "miss"
+
+        parts: List[str] = []
+        for delta in self._create(messages, model, temperature, max_tokens, seed, state, stream):
+            parts.append(delta)
+            yield delta
+        info.service_s = time.perf_counter() - state.t0 - info.queue_s
+        if info.ttft_s is None:
+            info.ttft_s = info.service_s
+        if key is not None and info.error is None:  # errors, and what a broken stream delivered, are never stored
+            self.cache.put(key, model, "".join(parts).strip())
+
+    def _create(
+        self,
+        messages: List[Dict[str, str]],
+        model: str,
+        temperature: float,
+        max_tokens: int,
+        seed: Optional[int],
+        state: PendingCall,
+        stream: bool,
+    ) -> Iterator[str]:
+        throttle = self.limiter.for_model(model)
+        est = estimate_tokens(messages, max_tokens)
+        info = state.info
+        extra: Dict[str, Any] = {"stream": True, "stream_options": {"include_usage": True}} if stream else {}
+        while True:
+            pause = throttle.pause()
+            if pause > 0:
+                info.queue_s += pause
+                self._wait(pause)
+                continue
+            if not state.admitted:
+                state.admitted = True
+                wait = throttle.reserve(est)
+                if wait > 0:
+                    info.queue_s += wait
+                    self._wait(wait)
+            try:
+                resp = self.client.chat.completions.create(
+                    model=model,
+                    messages=messages,
+                    temperature=temperature,
+                    max_tokens=max_tokens,
+                    seed=seed,
+                    **extra,
+                )
+                break
+            except Exception as e:
+                state.admitted = False
+                delay = self.retry.backoff(state.attempt, e)
+                throttle.on_failure(e, will_retry=delay is not None)
+                if delay is None:
+                    info.error = f"[ERROR: {type(e).__name__}: {e}]"
+                    yield info.error
+                    return
+                state.attempt += 1
+                info.retries = state.attempt
+                self._wait(delay)
+
+        if not stream:
+            try:
+                text = (resp.choices[0].message.content or "").strip()
+                self._record_usage(info, throttle, est, getattr(resp, "usage", None))
+            except Exception as e:  # a malformed response (e.g. no choices) fails this call, not the run
+                throttle.on_failure(e, will_retry=False)
+                info.error = f"[ERROR: {type(e).__name__}: {e}]"
+                yield info.error
+                return
+            yield text
+            return
+
+        usage = None
+        try:
+            for chunk in resp:
+                if getattr(chunk, "usage", None) is not None:
+                    usage = chunk.usage
+                if not chunk.choices:
+                    continue
+                delta = chunk.choices[0].delta.content
+                if delta:
+                    if info.ttft_s is None:
+                        info.ttft_s = time.perf_counter() - state.t0 - info.queue_s
+                    yield delta
+        except Exception as e:  # a broken stream is not retried: part of the answer was already delivered
+            throttle.on_failure(e, will_retry=False)
+            info.error = f"[ERROR: {type(e).__name__}: {e}]"
+            return
+        self._record_usage(info, throttle, est, usage)
+
+    @staticmethod
+    def _record_usage(info: CallInfo, throttle: ModelThrottle, est: int, usage) -> None:
+        info.prompt_tokens = getattr(usage, "prompt_tokens", None)
+        info.completion_tokens = getattr(usage, "completion_tokens", None)
+        throttle.on_success(est, getattr(usage, "total_tokens", None))
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        """Per-model throttle/retry counters."""
+        return self.limiter.stats()
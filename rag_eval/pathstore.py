@@ -0,0 +1,138 @@
+from __future__ import annotations
+import sys
+from array import array
+from typing import Dict, Iterable, Iterator, List, Sequence, overload
+
+from .data import Edge, Node, Path
+
+
+class PathStore(Sequence["PathView"]):
+    """Columnar storage for many paths over a shared node table.
+
+    Nodes are stored once (one Node per id) and every relation label gets a
+    small integer code. Per path, node positions and edge (src, dst, relation)
+    indices live in flat `array`s addressed through offset arrays, so an edge
+    costs 12 bytes instead of an Edge object plus its strings.
+    Indexing yields PathView objects, which linearize_path and the context
+    builders accept in place of Path.
+    """
+
+    def __init__(self) -> None:
+        self._node_index: Dict[str, int] = {}
+        self.node_table: List[Node] = []
+        self._rel_index: Dict[str, int] = {}
+        self.relations: List[str] = []
+        self._path_nodes = array("i")
+        self._node_offsets = array("q", [0])
+        self._edge_src = array("i")
+        self._edge_dst = array("i")
+        self._edge_rel = array("i")
+        self._edge_offsets = array("q", [0])
+
+    @classmethod
+    def from_paths(cls, paths: Iterable[Path]) -> "PathStore":
+        store = cls()
+        for p in paths:
+            store.add_path(p)
+        return store
+
+    def add_node(self, node_id: str, text: str) -> int:
+        """Index of node `node_id`, registering it on first sight; a later non-empty text fills a blank one."""
+        idx = self._node_index.get(node_id)
+        if idx is None:
+            node_id = sys.intern(node_id)
+            idx = len(self.node_table)
+            self._node_index[node_id] = idx
+            self.node_table.append(Node(node_id, text))
+        elif text and not self.node_table[idx].text:
+            self.node_table[idx] = Node(self.node_table[idx].id, text)
+        return idx
+
+    def _node_ref(self, node_id: str) -> int:
+        idx = self._node_index.get(node_id)
+        if idx is None:  # edge endpoint that never appears as a path node
+            idx = self.add_node(node_id, "")
+        return idx
+
+    def relation_code(self, relation: str) -> int:
+        code = self._rel_index.get(relation)
+        if code is None:
+            code = len(self.relations)
+            relation = sys.intern(relation)
+            self._rel_index[relation] = code
+            self.relations.append(relation)
+        return code
+
+    def add_path(self, path: Path) -> int:
+        """Append a path and return its position."""
+        for n in path.nodes:
+            self._path_nodes.append(self.add_node(n.id, n.text))
+        for e in path.edges:
+            self._edge_src.append(self._node_ref(e.src))
+            self._edge_dst.append(self._node_ref(e.dst))
+            self._edge_rel.append(self.relation_code(e.relation))
+        self._node_offsets.append(len(self._path_nodes))
+        self._edge_offsets.append(len(self._edge_rel))
+        return len(self._node_offsets) - 2
+
+    def __len__(self) -> int:
+        return len(self._node_offsets) - 1
+
+    @overload
+    def __getitem__(self, i: int) -> "PathView": ...
+    @overload
+    def __getitem__(self, i: slice) -> List["PathView"]: ...
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return [PathView(self, j) for j in range(*i.indices(len(self)))]
+        n = len(self)
+        if i < 0:
+            i += n
+        if not 0 <= i < n:
+            raise IndexError("PathStore index out of range")
+        return PathView(self, i)
+
+    def __iter__(self) -> Iterator["PathView"]:
+        for i in range(len(self)):
+            yield PathView(self, i)
+
+    @property
+    def num_edges(self) -> int:
+        return len(self._edge_rel)
+
+    def nbytes(self) -> int:
+        """Bytes held by the columnar arrays (excludes the node and relation tables)."""
+        arrays = (
+            self._path_nodes, self._node_offsets, self._edge_src, self._edge_dst, self._edge_rel, self._edge_offsets,
+        )
+        return sum(a.itemsize * len(a) for a in arrays)
+
+
+class PathView:
+    """Read-only Path-compatible view of one path in a PathStore."""
+
+    __slots__ = ("_store", "_i")
+
+    def __init__(self, store: PathStore, i: int):
+        self._store = store
+        self._i = i
+
+    @property
+    def nodes(self) -> List[Node]:
+        s = self._store
+        table = s.node_table
+        return [table[k] for k in s._path_nodes[s._node_offsets[self._i]:s._node_offsets[self._i + 1]]]
+
+    @property
+    def edges(self) -> List[Edge]:
+        s = self._store
+        lo, hi = s._edge_offsets[self._i], s._edge_offsets[self._i + 1]
+        table, rels = s.node_table, s.relations
+        return [
+            Edge(table[s._edge_src[k]].id, table[s._edge_dst[k]].id, rels[s._edge_rel[k]])
+            for k in range(lo, hi)
+        ]
+
+    def to_path(self) -> Path:
+        return Path(nodes=self.nodes, edges=self.edges)
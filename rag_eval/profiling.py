@@ -0,0 +1,126 @@
+from __future__ import annotations
+import json
+import os
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional
+
+PROFILE_FILE = "profile.json"
+
+# Per-row instrumentation columns of the detailed CSV. "context" is runner.concat_context
+# (local) or the make_fluent_context summarizer call; "answer" is answer_with_context.
+# *_s is service time (retries included), *_queue_s the time spent waiting for a pool
+# worker, a per-model slot, or the rate limiter, *_ttft_s the time to first token.
+# ttft_s / latency_s are what a user of the mode's pipeline would wait (context, then
+# answer; queueing excluded) until the first answer token / the complete answer.
+# retrieval_s is the --graph path search for the example (shared by both modes, not in latency_s).
+PROFILE_FIELDS = [
+    "retrieval_s",
+    "context_s", "context_queue_s", "context_ttft_s", "context_prompt_tokens", "context_completion_tokens", "context_retries", "context_cache",
+    "answer_s", "answer_queue_s", "answer_ttft_s", "answer_prompt_tokens", "answer_completion_tokens", "answer_retries", "answer_cache",
+    "ttft_s", "latency_s",
+    "rouge_s", "bleu_s", "bertscore_s",
+]
+
+TIMED_STAGES = ["retrieval", "context", "context_queue", "answer", "answer_queue", "answer_ttft", "ttft", "latency", "rouge", "bleu", "bertscore"]
+
+
+@dataclass
+class CallInfo:
+    """What one Chat.call cost; cache is "hit", "miss", "off" or "shared" (memoized in the scheduler)."""
+    service_s: float = 0.0
+    queue_s: float = 0.0
+    prompt_tokens: Optional[int] = None
+    completion_tokens: Optional[int] = None
+    retries: int = 0
+    cache: str = "off"
+    ttft_s: Optional[float] = None  # time to first token; equals service_s when not streaming
+    handoff_s: Optional[float] = None  # when the text was passed downstream, if before completion
+    error: Optional[str] = None  # "[ERROR: ...]" when the call failed, including a stream that broke partway
+
+    def columns(self, stage: str) -> Dict[str, str]:
+        return {
+            f"{stage}_s": f"{self.service_s:.6f}",
+            f"{stage}_queue_s": f"{self.queue_s:.6f}",
+            f"{stage}_ttft_s": "" if self.ttft_s is None else f"{self.ttft_s:.6f}",
+            f"{stage}_prompt_tokens": "" if self.prompt_tokens is None else str(self.prompt_tokens),
+            f"{stage}_completion_tokens": "" if self.completion_tokens is None else str(self.completion_tokens),
+            f"{stage}_retries": str(self.retries),
+            f"{stage}_cache": self.cache,
+        }
+
+
+def pipeline_latency(context: CallInfo, answer: CallInfo) -> Dict[str, str]:
+    """ttft_s / latency_s columns of a context -> answer pipeline."""
+    ready = context.handoff_s if context.handoff_s is not None else context.service_s
+    first = answer.ttft_s if answer.ttft_s is not None else answer.service_s
+    return {"ttft_s": f"{ready + first:.6f}", "latency_s": f"{ready + answer.service_s:.6f}"}
+
+
+def percentile(sorted_vals: List[float], q: float) -> float:
+    """Linear-interpolated percentile (q in [0, 100]) of an already sorted list."""
+    if not sorted_vals:
+        return 0.0
+    pos = (len(sorted_vals) - 1) * q / 100.0
+    lo = int(pos)
+    hi = min(lo + 1, len(sorted_vals) - 1)
+    return sorted_vals[lo] + (sorted_vals[hi] - sorted_vals[lo]) * (pos - lo)
+
+
+def _float(v: Any) -> Optional[float]:
+    try:
+        return float(v)
+    except (TypeError, ValueError):
+        return None
+
+
+def build_profile(rows: List[Dict[str, str]]) -> Dict[str, Any]:
+    """Latency percentiles per (model, mode, stage), plus token and cache totals per (model, mode)."""
+    groups: Dict[str, Dict[str, List[Dict[str, str]]]] = {}
+    for r in rows:
+        groups.setdefault(r["model"], {}).setdefault(r["mode"], []).append(r)
+
+    out: Dict[str, Any] = {}
+    for model, by_mode in groups.items():
+        out[model] = {}
+        for mode, items in by_mode.items():
+            stages: Dict[str, Any] = {}
+            for stage in TIMED_STAGES:
+                base = stage.split("_")[0]
+                # rows that reused a memoized call carry no cost of their own
+                vals = sorted(
+                    v for v in (_float(x.get(f"{stage}_s")) for x in items if x.get(f"{base}_cache") != "shared")
+                    if v is not None
+                )
+                if not vals:
+                    continue
+                stages[stage] = {
+                    "n": len(vals),
+                    "mean_s": sum(vals) / len(vals),
+                    "p50_s": percentile(vals, 50),
+                    "p95_s": percentile(vals, 95),
+                    "p99_s": percentile(vals, 99),
+                    "max_s": vals[-1],
+                    "total_s": sum(vals),
+                }
+            tokens: Dict[str, int] = {}
+            cache: Dict[str, int] = {}
+            retries = 0
+            for x in items:
+                for stage in ("context", "answer"):
+                    for kind in ("prompt", "completion"):
+                        v = _float(x.get(f"{stage}_{kind}_tokens"))
+                        if v is not None:
+                            tokens[f"{stage}_{kind}"] = tokens.get(f"{stage}_{kind}", 0) + int(v)
+                    status = x.get(f"{stage}_cache")
+                    if status:
+                        cache[f"{stage}_{status}"] = cache.get(f"{stage}_{status}", 0) + 1
+                    retries += int(_float(x.get(f"{stage}_retries")) or 0)
+            out[model][mode] = {"n_rows": len(items), "stages": stages, "tokens": tokens, "cache": cache, "retries": retries}
+    return out
+
+
+def write_profile(rows: List[Dict[str, str]], out_dir: str) -> str:
+    path = os.path.join(out_dir, PROFILE_FILE)
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(build_profile(rows), f, indent=2)
+    return path
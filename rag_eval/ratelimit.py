@@ -0,0 +1,209 @@
+from __future__ import annotations
+import random
+import threading
+import time
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional
+
+# Exception class names (openai>=1) worth retrying: throttling, timeouts, dropped connections, 5xx.
+RETRYABLE_ERRORS = {"RateLimitError", "APITimeoutError", "APIConnectionError", "InternalServerError", "ServiceUnavailableError"}
+
+
+def estimate_tokens(messages: List[Dict[str, str]], max_tokens: int) -> int:
+    """Rough request cost for tokens/min budgeting: ~4 chars per prompt token plus the completion cap."""
+    chars = sum(len(m.get("content") or "") for m in messages)
+    return chars // 4 + 4 * len(messages) + max_tokens
+
+
+def is_rate_limit(err: BaseException) -> bool:
+    return type(err).__name__ == "RateLimitError" or getattr(err, "status_code", None) == 429
+
+
+def is_retryable(err: BaseException) -> bool:
+    if type(err).__name__ in RETRYABLE_ERRORS:
+        return True
+    status = getattr(err, "status_code", None)
+    return status == 429 or (isinstance(status, int) and status >= 500)
+
+
+def retry_after_seconds(err: BaseException) -> Optional[float]:
+    """Server-suggested wait from Retry-After / retry-after-ms headers, if present."""
+    resp = getattr(err, "response", None)
+    headers = getattr(resp, "headers", None)
+    if not headers:
+        return None
+    try:
+        ms = headers.get("retry-after-ms")
+        if ms is not None:
+            return float(ms) / 1000.0
+        s = headers.get("retry-after")
+        if s is not None:
+            return float(s)
+    except (TypeError, ValueError):
+        return None  # HTTP-date form is not worth parsing here; fall back to backoff
+    return None
+
+
+class TokenBucket:
+    """Thread-safe token bucket refilled continuously at `rate_per_min`."""
+
+    def __init__(self, rate_per_min: float, capacity: Optional[float] = None):
+        self.max_rate = rate_per_min
+        self.rate = rate_per_min
+        self.capacity = capacity if capacity is not None else rate_per_min
+        self._level = self.capacity
+        self._stamp = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self, now: float) -> None:
+        self._level = min(self.capacity, self._level + (now - self._stamp) * self.rate / 60.0)
+        self._stamp = now
+
+    def reserve(self, amount: float) -> float:
+        """Take `amount` (may go negative) and return how long the caller must wait before using it."""
+        with self._lock:
+            now = time.monotonic()
+            self._refill(now)
+            amount = min(amount, self.capacity)  # a single oversized request must still be admissible
+            self._level -= amount
+            return 0.0 if self._level >= 0 else -self._level * 60.0 / self.rate
+
+    def adjust(self, delta: float) -> None:
+        """Credit (+) or debit (-) the bucket, e.g. once the real token usage is known."""
+        with self._lock:
+            self._refill(time.monotonic())
+            self._level = min(self.capacity, self._level + delta)
+
+    def scale_rate(self, factor: float, floor_frac: float = 0.05) -> None:
+        """Multiplicative decrease (factor < 1), bounded below by floor_frac of the configured rate."""
+        with self._lock:
+            self._refill(time.monotonic())
+            self.rate = max(self.max_rate * floor_frac, self.rate * factor)
+
+    def recover(self, frac: float = 0.05) -> None:
+        """Move the rate `frac` of the way back toward the configured rate."""
+        with self._lock:
+            self._refill(time.monotonic())
+            self.rate = min(self.max_rate, self.rate + frac * (self.max_rate - self.rate))
+
+
+@dataclass
+class RetryPolicy:
+    max_retries: int = 5
+    base_delay: float = 1.0
+    max_delay: float = 60.0
+
+    def backoff(self, attempt: int, err: BaseException) -> Optional[float]:
+        """Seconds to wait before retry number `attempt + 1`, or None to give up."""
+        if attempt >= self.max_retries or not is_retryable(err):
+            return None
+        hinted = retry_after_seconds(err)
+        if hinted is not None:
+            return min(self.max_delay, hinted)
+        # "full jitter" exponential backoff
+        return random.uniform(0, min(self.max_delay, self.base_delay * 2 ** attempt))
+
+
+class ModelThrottle:
+    """Request/token buckets plus a circuit breaker for one model.
+
+    The request rate adapts: each 429 halves it, each success recovers 5%
+    of the gap back to the configured rate. After `breaker_threshold`
+    consecutive failures the breaker opens and new requests wait out
+    `breaker_cooldown` instead of hitting the API. Nothing here sleeps:
+    pause() and reserve() say how long the caller has to wait (see Chat).
+    """
+
+    def __init__(self, rpm: Optional[float], tpm: Optional[float], breaker_threshold: int = 5, breaker_cooldown: float = 30.0):
+        self.requests = TokenBucket(rpm) if rpm else None
+        self.tokens = TokenBucket(tpm) if tpm else None
+        self.breaker_threshold = breaker_threshold
+        self.breaker_cooldown = breaker_cooldown
+        self._consecutive_failures = 0
+        self._open_until = 0.0
+        self._wait_counted_until = 0.0  # breaker_wait_s covers the open breaker up to here
+        self._lock = threading.Lock()
+        self.stats: Dict[str, float] = {
+            "requests": 0, "throttled": 0, "throttle_wait_s": 0.0, "rate_limited": 0,
+            "retries": 0, "failures": 0, "breaker_opens": 0, "breaker_wait_s": 0.0,
+        }
+
+    def _count(self, key: str, amount: float = 1) -> None:
+        with self._lock:
+            self.stats[key] += amount
+
+    def pause(self) -> float:
+        """Seconds until the breaker closes (0 when closed).
+
+        breaker_wait_s counts each stretch of an open breaker once, from the first
+        caller that meets it, however often deferred calls poll it again.
+        """
+        with self._lock:
+            now = time.monotonic()
+            pause = self._open_until - now
+            if pause <= 0:
+                return 0.0
+            self.stats["breaker_wait_s"] += self._open_until - max(now, self._wait_counted_until)
+            self._wait_counted_until = self._open_until
+            return pause
+
+    def reserve(self, est_tokens: int) -> float:
+        """Take a request and `est_tokens` from the budgets; returns how long to wait before sending it."""
+        wait = 0.0
+        if self.requests is not None:
+            wait = max(wait, self.requests.reserve(1))
+        if self.tokens is not None:
+            wait = max(wait, self.tokens.reserve(est_tokens))
+        if wait > 0:
+            self._count("throttled")
+            self._count("throttle_wait_s", wait)
+        self._count("requests")
+        return wait
+
+    def on_success(self, est_tokens: int, used_tokens: Optional[int]) -> None:
+        with self._lock:
+            self._consecutive_failures = 0
+        if self.tokens is not None and used_tokens is not None:
+            self.tokens.adjust(est_tokens - used_tokens)
+        if self.requests is not None:
+            self.requests.recover(0.05)
+
+    def on_failure(self, err: BaseException, will_retry: bool) -> None:
+        if is_rate_limit(err):
+            self._count("rate_limited")
+            if self.requests is not None:
+                self.requests.scale_rate(0.5)
+        self._count("retries" if will_retry else "failures")
+        if not is_retryable(err):
+            return
+        with self._lock:
+            self._consecutive_failures += 1
+            if self._consecutive_failures >= self.breaker_threshold:
+                self._consecutive_failures = 0
+                hinted = retry_after_seconds(err) or 0.0
+                self._open_until = time.monotonic() + max(self.breaker_cooldown, hinted)
+                self.stats["breaker_opens"] += 1
+
+
+class RateLimiter:
+    """Per-model ModelThrottle registry sharing one configuration."""
+
+    def __init__(self, rpm: Optional[float] = None, tpm: Optional[float] = None, breaker_threshold: int = 5, breaker_cooldown: float = 30.0):
+        self.rpm = rpm
+        self.tpm = tpm
+        self.breaker_threshold = breaker_threshold
+        self.breaker_cooldown = breaker_cooldown
+        self._models: Dict[str, ModelThrottle] = {}
+        self._lock = threading.Lock()
+
+    def for_model(self, model: str) -> ModelThrottle:
+        with self._lock:
+            t = self._models.get(model)
+            if t is None:
+                t = ModelThrottle(self.rpm, self.tpm, self.breaker_threshold, self.breaker_cooldown)
+                self._models[model] = t
+            return t
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        with self._lock:
+            return {m: dict(t.stats) for m, t in self._models.items()}
@@ -0,0 +1,251 @@
+from __future__ import annotations
+import os
+from operator import itemgetter
+from typing import Any, Dict, List, Optional, Sequence
+
+import numpy as np
+
+from .profiling import PROFILE_FIELDS, percentile
+
+# Column types of a detailed row (everything else is text). Integer columns are held
+# as float64 with NaN for "missing" and become nullable int64 in Arrow/Parquet output.
+METRIC_FIELDS = ["rouge1", "rougeL", "bleu", "bertscore_f1"]
+INT_FIELDS = [
+    "example", "summary_reused", "answer_reused", "context_paths", "context_tokens",
+    "context_prompt_tokens", "context_completion_tokens", "context_retries",
+    "answer_prompt_tokens", "answer_completion_tokens", "answer_retries",
+]
+FLOAT_FIELDS = METRIC_FIELDS + [f for f in PROFILE_FIELDS if f.endswith("_s")]
+
+DELTA_FIELDS = [
+    "model", "metric", "n_pairs", "mean_concat", "mean_fluent", "mean_delta", "ci_low", "ci_high", "p_value",
+]
+
+_NAN = float("nan")
+
+# Resampled means drawn per block, so a block holds about this many counts.
+_BLOCK = 1 << 22
+
+
+def _float_column(values: Sequence[Any]) -> np.ndarray:
+    """Numbers or numeric strings (timing columns, checkpoints of older runs); None and empty strings become NaN."""
+    try:
+        return np.fromiter(map(float, values), dtype=np.float64, count=len(values))
+    except (TypeError, ValueError):  # some values missing
+        return np.fromiter((_NAN if v is None or v == "" else float(v) for v in values), dtype=np.float64, count=len(values))
+
+
+class ResultTable:
+    """Typed, column-wise view of the detailed rows, grouped by (model, mode).
+
+    Each column is converted once, on first use, into a float64 array (numbers,
+    NaN for missing) or an object array (text); aggregating only touches the
+    columns it reads. Groups get integer codes in order of first appearance
+    (`groups[code]`), so per-group aggregates are np.bincount calls rather
+    than Python loops over rows.
+    """
+
+    def __init__(self, rows: Sequence[Dict[str, Any]], fields: Sequence[str], codes: np.ndarray, groups: List[tuple]):
+        self._rows = rows
+        self.fields = list(fields)
+        self.codes = codes
+        self.groups = groups
+        self._columns: Dict[str, np.ndarray] = {}
+
+    @classmethod
+    def from_rows(cls, rows: Sequence[Dict[str, Any]], fields: Optional[Sequence[str]] = None) -> "ResultTable":
+        if fields is None:
+            from .runner import DETAIL_FIELDS
+            fields = DETAIL_FIELDS
+        keys = list(map(itemgetter("model", "mode"), rows))
+        index = dict.fromkeys(keys)
+        for code, key in enumerate(index):
+            index[key] = code
+        codes = np.fromiter(map(index.__getitem__, keys), dtype=np.int64, count=len(keys))
+        return cls(rows, fields, codes, list(index))
+
+    def column(self, name: str) -> np.ndarray:
+        col = self._columns.get(name)
+        if col is None:
+            try:
+                values = list(map(itemgetter(name), self._rows))
+            except KeyError:
+                values = [r.get(name, "") for r in self._rows]
+            if name in FLOAT_FIELDS or name in INT_FIELDS:
+                col = _float_column(values)
+            else:
+                col = np.array(values, dtype=object)
+            self._columns[name] = col
+        return col
+
+    def __len__(self) -> int:
+        return len(self.codes)
+
+    def _means(self, name: str) -> np.ndarray:
+        """Mean of a column per group over its non-missing values (NaN for a group with none)."""
+        col = self.column(name)
+        ok = ~np.isnan(col)
+        n = np.bincount(self.codes[ok], minlength=len(self.groups))
+        sums = np.bincount(self.codes[ok], weights=col[ok], minlength=len(self.groups))
+        with np.errstate(invalid="ignore", divide="ignore"):
+            return sums / n
+
+    def summary(self) -> List[Dict[str, Any]]:
+        """runner.SUMMARY_FIELDS rows, one per (model, mode) in order of first appearance; the
+        counts are ints and the means floats (NaN where a group has no values)."""
+        n = np.bincount(self.codes, minlength=len(self.groups))
+        means = {name: self._means(name) for name in METRIC_FIELDS + ["context_tokens", "ttft_s", "latency_s"]}
+        latency = self.column("latency_s")
+        ok = ~np.isnan(latency)
+        order = np.lexsort((latency[ok], self.codes[ok]))
+        sorted_lat = latency[ok][order]
+        bounds = np.searchsorted(self.codes[ok][order], np.arange(len(self.groups) + 1))
+
+        out: List[Dict[str, Any]] = []
+        for g, (model, mode) in enumerate(self.groups):
+            lat = sorted_lat[bounds[g]:bounds[g + 1]]
+            out.append({
+                "model": model,
+                "mode": mode,
+                "n_examples": int(n[g]),
+                **{f"mean_{name}": float(means[name][g]) for name in METRIC_FIELDS},
+                "mean_context_tokens": float(means["context_tokens"][g]),
+                "mean_ttft_s": float(means["ttft_s"][g]),
+                "mean_latency_s": float(means["latency_s"][g]),
+                "p95_latency_s": percentile(lat.tolist(), 95) if len(lat) else _NAN,
+            })
+        return out
+
+    def paired_deltas(
+        self,
+        metrics: Sequence[str] = METRIC_FIELDS,
+        n_boot: int = 1000,
+        seed: int = 0,
+    ) -> List[Dict[str, Any]]:
+        """Per model and metric: mean fluent - concat difference over examples scored in both modes,
+        a 95% paired bootstrap CI, and a two-sided sign-flip permutation p-value (NaN with n_boot=0).
+
+        Pairs are matched on the `example` column; a pair with a missing metric value is
+        dropped. Every metric of a model is resampled with the same draws, so the
+        cost is O(n_boot * pairs) per model.
+        """
+        rng = np.random.default_rng(seed)
+        example = self.column("example")
+        group_of = {key: g for g, key in enumerate(self.groups)}
+        values = np.column_stack([self.column(m) for m in metrics])
+        out: List[Dict[str, Any]] = []
+        for model in dict.fromkeys(model for model, _ in self.groups):
+            rows = {
+                mode: np.flatnonzero(self.codes == group_of.get((model, mode), -1)) for mode in ("concat", "fluent")
+            }
+            common, ic, i_f = np.intersect1d(example[rows["concat"]], example[rows["fluent"]], return_indices=True)
+            a, b = values[rows["concat"][ic]], values[rows["fluent"][i_f]]
+            keep = np.isfinite(a).all(axis=1) & np.isfinite(b).all(axis=1) & ~np.isnan(common)
+            a, b = a[keep], b[keep]
+            if not len(a):
+                continue
+            d = b - a
+            observed = d.mean(axis=0)
+            if n_boot:
+                lo, hi = np.percentile(_bootstrap_means(d, n_boot, rng), [2.5, 97.5], axis=0)
+                p = _sign_flip_pvalues(d, observed, n_boot, rng)
+            else:
+                lo = hi = p = np.full(len(metrics), np.nan)
+            for j, metric in enumerate(metrics):
+                out.append({
+                    "model": model,
+                    "metric": metric,
+                    "n_pairs": len(d),
+                    "mean_concat": float(a[:, j].mean()),
+                    "mean_fluent": float(b[:, j].mean()),
+                    "mean_delta": float(observed[j]),
+                    "ci_low": float(lo[j]),
+                    "ci_high": float(hi[j]),
+                    "p_value": float(p[j]),
+                })
+        return out
+
+    def to_arrow(self):
+        """pyarrow.Table of the columns, with integer columns as nullable int64."""
+        pa = _pyarrow()
+        arrays = {}
+        for name in self.fields:
+            col = self.column(name)
+            if name in INT_FIELDS:
+                mask = np.isnan(col)
+                arrays[name] = pa.array(np.where(mask, 0, col).astype(np.int64), mask=mask)
+            elif col.dtype == object:
+                arrays[name] = pa.array(col.tolist(), type=pa.string())
+            else:
+                arrays[name] = pa.array(col, from_pandas=True)  # NaN -> null
+        return pa.table(arrays)
+
+
+def _bootstrap_means(d: np.ndarray, n_boot: int, rng: np.random.Generator) -> np.ndarray:
+    """(n_boot, k) means of d (n, k) over resamples of its rows, drawn as count vectors in blocks."""
+    n = len(d)
+    out = np.empty((n_boot, d.shape[1]))
+    per = max(1, _BLOCK // n)
+    for start in range(0, n_boot, per):
+        b = min(per, n_boot - start)
+        idx = rng.integers(0, n, size=(b, n)) + (np.arange(b) * n)[:, None]
+        counts = np.bincount(idx.ravel(), minlength=b * n).reshape(b, n)
+        out[start:start + b] = counts @ d / n
+    return out
+
+
+def _sign_flip_pvalues(d: np.ndarray, observed: np.ndarray, n_perm: int, rng: np.random.Generator) -> np.ndarray:
+    """Two-sided p-values of mean(d) != 0 per column: under H0 each paired difference is
+    equally likely to have either sign. Signs come from packed random bits, and
+    sum(s * d) = 2 * sum(d[s > 0]) - sum(d)."""
+    n = len(d)
+    total = d.sum(axis=0)
+    extreme = np.zeros(d.shape[1])
+    per = max(1, _BLOCK // n)
+    for start in range(0, n_perm, per):
+        b = min(per, n_perm - start)
+        bits = np.unpackbits(rng.integers(0, 256, size=(b, (n + 7) // 8), dtype=np.uint8), axis=1, count=n)
+        flipped = (2 * (bits.astype(np.float64) @ d) - total) / n
+        extreme += (np.abs(flipped) >= np.abs(observed) - 1e-12).sum(axis=0)
+    return (extreme + 1) / (n_perm + 1)
+
+
+def _pyarrow():
+    try:
+        import pyarrow
+        import pyarrow.parquet  # noqa: F401
+    except ImportError:
+        raise RuntimeError("Parquet output needs pyarrow (pip install pyarrow)") from None
+    return pyarrow
+
+
+def _typed_rows(rows: List[Dict[str, Any]], fields: Sequence[str], text_fields: Sequence[str]):
+    """Arrow table of small rows (summary, deltas): n_* counts as int64, other non-text fields as float64."""
+    pa = _pyarrow()
+    columns = {}
+    for f in fields:
+        values = [r.get(f) for r in rows]
+        if f in text_fields:
+            columns[f] = pa.array(values, type=pa.string())
+        elif f.startswith("n_"):
+            columns[f] = pa.array(values, type=pa.int64())
+        else:
+            columns[f] = pa.array(_float_column(values), from_pandas=True)
+    return pa.table(columns)
+
+
+def write_parquet(
+    table: ResultTable, summaries: List[Dict[str, Any]], deltas: Optional[List[Dict[str, Any]]], out_dir: str,
+) -> List[str]:
+    """Parquet twins of the detailed, summary and (if given) delta CSVs; returns the paths written."""
+    from .runner import OUTPUT_BASENAME, SUMMARY_FIELDS
+    pq = _pyarrow().parquet
+    os.makedirs(out_dir, exist_ok=True)
+    paths = [os.path.join(out_dir, f"{OUTPUT_BASENAME}_{kind}.parquet") for kind in ("detailed", "summary", "delta")]
+    pq.write_table(table.to_arrow(), paths[0])
+    pq.write_table(_typed_rows(summaries, SUMMARY_FIELDS, ("model", "mode")), paths[1])
+    if deltas is None:
+        return paths[:2]
+    pq.write_table(_typed_rows(deltas, DELTA_FIELDS, ("model", "metric")), paths[2])
+    return paths
+
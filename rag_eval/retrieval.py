@@ -0,0 +1,355 @@
+from __future__ import annotations
+import heapq
+import json
+import math
+import re
+import sys
+import time
+from array import array
+from typing import Dict, Iterable, Iterator, List, Optional, Sequence, Set, Tuple
+
+from .data import Edge, Example, Node, Path, _open_text
+
+# Label suffix for an edge walked against its stored direction (see Graph undirected=True).
+REVERSE_SUFFIX = " (reverse)"
+
+_WORD = re.compile(r"\w+")
+
+# Function words skipped by Graph.match_nodes: they are frequent in queries but rare enough in
+# short node texts that their idf would outrank the content words.
+STOPWORDS = frozenset("""
+    a about above after again against all also an and any are as at be because been before being
+    between both but by can could did do does doing down during each few for from further had has
+    have having how if in into is it its itself just may might more most no nor not of off on once
+    only or other our out over own same should so some such than that the their them then there
+    these they this those through to too under until up very was we were what when where which
+    while who whom why will with would you your
+""".split())
+
+
+# ---------------------------------------------------------------------------
+# Graph files
+#
+# One record per line (JSONL, optionally .gz), nodes and edges in any order:
+#   {"id": "ME0", "text": "Mercury is the closest planet to the Sun."}
+#   {"src": "ME0", "dst": "ME1", "relation": "has_property"}
+# Edge endpoints that never appear as a node record get an empty text.
+# ---------------------------------------------------------------------------
+
+def write_graph_jsonl(nodes: Iterable[Tuple[str, str]], edges: Iterable[Tuple[str, str, str]], path: str) -> None:
+    with _open_text(path, "w") as f:
+        for nid, text in nodes:
+            f.write(json.dumps({"id": nid, "text": text}, ensure_ascii=False) + "\n")
+        for src, dst, rel in edges:
+            f.write(json.dumps({"src": src, "dst": dst, "relation": rel}, ensure_ascii=False) + "\n")
+
+
+def iter_graph_jsonl(path: str) -> Iterator[Tuple[str, ...]]:
+    """Yield ("node", id, text) and ("edge", src, dst, relation) tuples from a graph file."""
+    with _open_text(path, "r") as f:
+        for lineno, line in enumerate(f, 1):
+            if not line.strip():
+                continue
+            rec = json.loads(line)
+            if "src" in rec:
+                yield "edge", rec["src"], rec["dst"], rec["relation"]
+            elif "id" in rec:
+                yield "node", rec["id"], rec.get("text", "")
+            else:
+                raise ValueError(f"{path}:{lineno}: expected a node (id) or edge (src/dst) record")
+
+
+def _content_words(text: str) -> Set[str]:
+    return {w for w in _WORD.findall(text.lower()) if (len(w) > 2 or w.isdigit()) and w not in STOPWORDS}
+
+
+class Graph:
+    """Node/edge graph with a CSR (compressed sparse row) adjacency index.
+
+    Node ids and texts live in two lists indexed by node number, relation
+    labels get small integer codes (as in PathStore). The neighbours of node
+    u are targets[offsets[u]:offsets[u + 1]], with the relation code of each
+    arc in `rels` at the same position. With undirected=True every edge is
+    also indexed from its dst, stored as code -1 - rel, so paths can walk it
+    backwards; the emitted Edge then keeps the walk order and its relation
+    label gets REVERSE_SUFFIX.
+    """
+
+    def __init__(self, undirected: bool = True) -> None:
+        self.undirected = undirected
+        self._index: Dict[str, int] = {}
+        self.ids: List[str] = []
+        self.texts: List[str] = []
+        self._rel_index: Dict[str, int] = {}
+        self.relations: List[str] = []
+        # edge list, folded into the CSR arrays by build()
+        self._src = array("i")
+        self._dst = array("i")
+        self._rel = array("i")
+        self.offsets = array("q", [0])
+        self.targets = array("i")
+        self.rels = array("i")
+        self._postings: Optional[Dict[str, array]] = None
+
+    @classmethod
+    def from_edges(
+        cls, nodes: Iterable[Tuple[str, str]], edges: Iterable[Tuple[str, str, str]], undirected: bool = True,
+    ) -> "Graph":
+        g = cls(undirected)
+        for nid, text in nodes:
+            g.add_node(nid, text)
+        for src, dst, rel in edges:
+            g.add_edge(src, dst, rel)
+        return g.build()
+
+    @classmethod
+    def load(cls, path: str, undirected: bool = True) -> "Graph":
+        """Read a graph file (see iter_graph_jsonl) and build its adjacency index."""
+        g = cls(undirected)
+        for rec in iter_graph_jsonl(path):
+            if rec[0] == "edge":
+                g.add_edge(rec[1], rec[2], rec[3])
+            else:
+                g.add_node(rec[1], rec[2])
+        return g.build()
+
+    def add_node(self, node_id: str, text: str = "") -> int:
+        """Index of node `node_id`, registering it on first sight; a later non-empty text fills a blank one."""
+        idx = self._index.get(node_id)
+        if idx is None:
+            node_id = sys.intern(node_id)
+            idx = len(self.ids)
+            self._index[node_id] = idx
+            self.ids.append(node_id)
+            self.texts.append(text)
+        elif text and not self.texts[idx]:
+            self.texts[idx] = text
+        return idx
+
+    def relation_code(self, relation: str) -> int:
+        code = self._rel_index.get(relation)
+        if code is None:
+            code = len(self.relations)
+            relation = sys.intern(relation)
+            self._rel_index[relation] = code
+            self.relations.append(relation)
+        return code
+
+    def add_edge(self, src: str, dst: str, relation: str) -> None:
+        """Queue an edge; it becomes visible to neighbors() after build(). Self-loops are dropped."""
+        s, d = self.add_node(src), self.add_node(dst)
+        if s != d:
+            self._src.append(s)
+            self._dst.append(d)
+            self._rel.append(self.relation_code(relation))
+
+    def build(self) -> "Graph":
+        """(Re)build the CSR arrays from every edge added so far, by a counting sort on the source node."""
+        n = len(self.ids)
+        src, dst, rel = self._src, self._dst, self._rel
+        counts = array("q", bytes(8 * (n + 1)))
+        for s in src:
+            counts[s + 1] += 1
+        if self.undirected:
+            for d in dst:
+                counts[d + 1] += 1
+        for i in range(n):
+            counts[i + 1] += counts[i]
+        total = counts[n]
+        targets = array("i", bytes(4 * total))
+        rels = array("i", bytes(4 * total))
+        cursor = array("q", counts)
+        for s, d, r in zip(src, dst, rel):
+            pos = cursor[s]
+            targets[pos] = d
+            rels[pos] = r
+            cursor[s] = pos + 1
+            if self.undirected:
+                pos = cursor[d]
+                targets[pos] = s
+                rels[pos] = -1 - r
+                cursor[d] = pos + 1
+        self.offsets, self.targets, self.rels = counts, targets, rels
+        self._postings = None
+        return self
+
+    # ---- queries -----------------------------------------------------------
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    @property
+    def num_edges(self) -> int:
+        return len(self._rel)
+
+    def node_index(self, node_id: str) -> int:
+        try:
+            return self._index[node_id]
+        except KeyError:
+            raise KeyError(f"Unknown node {node_id!r}") from None
+
+    def degree(self, u: int) -> int:
+        return self.offsets[u + 1] - self.offsets[u]
+
+    def neighbors(self, u: int) -> Iterator[Tuple[int, int]]:
+        """(neighbour, relation code) arcs out of node u; negative codes are reversed edges."""
+        for k in range(self.offsets[u], self.offsets[u + 1]):
+            yield self.targets[k], self.rels[k]
+
+    def relation_label(self, code: int) -> str:
+        return self.relations[code] if code >= 0 else self.relations[-1 - code] + REVERSE_SUFFIX
+
+    def to_path(self, nodes: Sequence[int], rels: Sequence[int], node_cache: Optional[Dict[int, Node]] = None) -> Path:
+        """Path over node numbers `nodes` joined by relation codes `rels` (len(nodes) - 1 of them)."""
+        cache = node_cache if node_cache is not None else {}
+        path_nodes = []
+        for u in nodes:
+            node = cache.get(u)
+            if node is None:
+                node = cache[u] = Node(self.ids[u], self.texts[u])
+            path_nodes.append(node)
+        edges = [
+            Edge(self.ids[a], self.ids[b], self.relation_label(r)) for a, b, r in zip(nodes, nodes[1:], rels)
+        ]
+        return Path(nodes=path_nodes, edges=edges)
+
+    def match_nodes(self, query: str, k: int = 5) -> List[str]:
+        """Ids of the k nodes whose text shares the most idf-weighted words with `query`.
+
+        A lexical stand-in for the dense node retrieval PathRAG seeds its search
+        with; stopwords and words under three characters (numbers excepted) are
+        ignored. The word index is built on first use.
+        """
+        if self._postings is None:
+            postings: Dict[str, array] = {}
+            for i, text in enumerate(self.texts):
+                for w in _content_words(text):
+                    postings.setdefault(w, array("i")).append(i)
+            self._postings = postings
+        n = max(len(self.ids), 1)
+        scores: Dict[int, float] = {}
+        for w in _content_words(query):
+            hits = self._postings.get(w)
+            if not hits:
+                continue
+            idf = math.log(1 + n / len(hits))
+            for i in hits:
+                scores[i] = scores.get(i, 0.0) + idf
+        best = heapq.nlargest(k, scores.items(), key=lambda kv: (kv[1], -kv[0]))
+        return [self.ids[i] for i, _ in best]
+
+    def nbytes(self) -> int:
+        """Bytes held by the edge list and CSR arrays (excludes the id, text and relation tables)."""
+        arrays = (self._src, self._dst, self._rel, self.offsets, self.targets, self.rels)
+        return sum(a.itemsize * len(a) for a in arrays)
+
+
+class PathRetriever:
+    """PathRAG-style flow-pruned search for paths between seed nodes.
+
+    From each seed, a resource of 1 flows outward: a node passes `alpha` of
+    its resource, split evenly over its arcs, to each neighbour. A branch is
+    only expanded while the resource reaching it is at least `threshold`, so
+    hubs and long detours are cut off early. A walk that reaches another seed
+    within `max_hops` edges becomes a candidate path, scored by the mean
+    resource of the nodes after its start. The `top_k` highest-scoring paths
+    are kept; a path and its reverse count once, with the better of their scores.
+    With a single seed there is nothing to connect, so every walk out of it is a
+    candidate instead: the seed's pruned neighbourhood.
+    """
+
+    def __init__(self, graph: Graph, max_hops: int = 3, alpha: float = 0.8, threshold: float = 0.05, top_k: int = 10):
+        self.graph = graph
+        self.max_hops = max_hops
+        self.alpha = alpha
+        self.threshold = threshold
+        self.top_k = top_k
+
+    def search(self, seeds: Sequence[str]) -> List[Tuple[float, Tuple[int, ...], Tuple[int, ...]]]:
+        """(score, node numbers, relation codes) of the best paths, highest score first."""
+        g = self.graph
+        seed_idx = list(dict.fromkeys(g.node_index(s) for s in seeds))
+        targets: Optional[Set[int]] = set(seed_idx) if len(seed_idx) > 1 else None
+        best: Dict[Tuple[int, ...], Tuple[float, Tuple[int, ...], Tuple[int, ...]]] = {}
+        offsets, adj, adj_rels = g.offsets, g.targets, g.rels
+        alpha, threshold, max_hops, top_k = self.alpha, self.threshold, self.max_hops, self.top_k
+
+        def record(score: float, nodes: List[int], rels: List[int]) -> None:
+            key = tuple(nodes)
+            if key[-1] < key[0]:  # both walk directions of a path map to one key
+                key = key[::-1]
+            old = best.get(key)
+            if old is None or score > old[0]:
+                best[key] = (score, tuple(nodes), tuple(rels))
+
+        nodes: List[int] = []
+        rels: List[int] = []
+        on_path: Set[int] = set()
+
+        def walk(u: int, resource: float, total: float) -> None:
+            lo, hi = offsets[u], offsets[u + 1]
+            if hi == lo:
+                return
+            share = alpha * resource / (hi - lo)
+            expand = share >= threshold and len(rels) + 1 < max_hops
+            for k in range(lo, hi):
+                v = adj[k]
+                if v in on_path:
+                    continue
+                hit = targets is None or v in targets
+                if not hit and not expand:
+                    continue
+                nodes.append(v)
+                rels.append(adj_rels[k])
+                if hit:
+                    record((total + share) / len(rels), nodes, rels)
+                if expand and (targets is None or not hit):
+                    on_path.add(v)
+                    walk(v, share, total + share)
+                    on_path.discard(v)
+                nodes.pop()
+                rels.pop()
+
+        for start in seed_idx:
+            nodes[:], rels[:] = [start], []
+            on_path.clear()
+            on_path.add(start)
+            walk(start, 1.0, 0.0)
+        return heapq.nlargest(top_k, best.values())
+
+    def retrieve(self, query: str, seeds: Optional[Sequence[str]] = None, n_seeds: int = 5) -> List[Path]:
+        """Best paths between `seeds` (default: Graph.match_nodes(query, n_seeds)) as Path objects,
+        ready for make_concat_context / make_fluent_context. Empty when no seed matches."""
+        if seeds is None:
+            seeds = self.graph.match_nodes(query, n_seeds)
+        cache: Dict[int, Node] = {}
+        return [self.graph.to_path(nodes, rels, cache) for _, nodes, rels in self.search(seeds)]
+
+
+def graph_from_paths(paths: Iterable[Path], undirected: bool = True) -> Graph:
+    """Graph of every node and edge on `paths`, e.g. the sample graph behind the built-in
+    examples: graph_from_paths(p for ex in build_examples() for p in ex.paths)."""
+    g = Graph(undirected)
+    for p in paths:
+        for node in p.nodes:
+            g.add_node(node.id, node.text)
+        for e in p.edges:
+            g.add_edge(e.src, e.dst, e.relation)
+    return g.build()
+
+
+def retrieve_examples(
+    examples: Iterable[Tuple[int, Example]], retriever: PathRetriever, n_seeds: int = 5,
+    timings: Optional[Dict[int, float]] = None, empty: Optional[Set[int]] = None,
+) -> Iterator[Tuple[int, Example]]:
+    """(index, example) pairs with each example's paths replaced by those `retriever` finds for
+    its query; the search time of each index is recorded in `timings` (first pass only) and the
+    indices whose search found no path are added to `empty`."""
+    for i, ex in examples:
+        t0 = time.perf_counter()
+        paths = retriever.retrieve(ex.query, n_seeds=n_seeds)
+        if timings is not None:
+            timings.setdefault(i, time.perf_counter() - t0)
+        if empty is not None and not paths:
+            empty.add(i)
+        yield i, Example(ex.query, paths, ex.gold_refs)
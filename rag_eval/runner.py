@@ -1,24 +1,73 @@
 from __future__ import annotations
 import csv
+import math
 import os
+import re
+import time
 from datetime import datetime
-from typing import Dict, List, Tuple
-from rouge_score import rouge_scorer
+from typing import TYPE_CHECKING, Any, Dict, List, Optional, Tuple
 
 from .config import Settings
 from .data import Example
-from .formatters import make_concat_context, linearize_path
-from .metrics import bleu_multi_ref, rouge_best, bertscore_best
+from .formatters import count_tokens, fit_paths, make_compact_context, make_concat_context, linearize_path
+from .metrics import bleu_multi_ref, rouge_best, bertscore_best, bertscore_best_batch, reference_index
 from .openai_client import Chat
+from .profiling import PROFILE_FIELDS
 
-try:
-    from bert_score import BERTScorer  # type: ignore
-except Exception:
-    BERTScorer = None  # type: ignore
+if TYPE_CHECKING:
+    from rouge_score import rouge_scorer
 
+# Context-formatting strategies, in the order rows are emitted per (model, example).
+MODES = ("concat", "fluent")
 
-def make_fluent_context(query: str, paths, summarizer_model: str, chat: Chat, min_words: int, max_words: int, seed: int) -> str:
-    """Ask a model to weave paths into a faithful, answer-ready single-sentence context."""
+DETAIL_FIELDS = [
+    "model", "mode",
+    # 1-based position of the example in the dataset, counted within the --shard slice when sharding;
+    # pairs concat/fluent rows (see results.ResultTable)
+    "example",
+    "query", "answer", "rouge1", "rougeL", "bleu", "bertscore_f1",
+    # 1 when the fluent summary / the answer itself was shared from another row (see scheduler.GridScheduler)
+    "summary_reused", "answer_reused",
+    # size of the context given to the answer model (concat: paths kept under MAX_CONTEXT_TOKENS)
+    "context_paths", "context_tokens",
+] + PROFILE_FIELDS
+SUMMARY_FIELDS = [
+    "model", "mode", "n_examples", "mean_rouge1", "mean_rougeL", "mean_bleu", "mean_bertscore_f1",
+    "mean_context_tokens",
+    # end-to-end pipeline latency (see profiling.PROFILE_FIELDS); empty in batch mode
+    "mean_ttft_s", "mean_latency_s", "p95_latency_s",
+]
+
+# Metrics, summaries and deltas carry numbers (floats, NaN or None when missing) and are only
+# rendered as text by write_csvs: with this format per column, ".4f" for any other float.
+CSV_FORMATS = {"mean_context_tokens": ".1f"}
+
+
+# Output files are <OUTPUT_BASENAME>_{detailed,summary,delta}.{csv,parquet}
+OUTPUT_BASENAME = "results_longform_fluent_vs_concat"
+
+# How the concat mode renders its paths
+CONCAT_FORMATS = {"full": make_concat_context, "compact": make_compact_context}
+
+# Completion caps per request kind
+SUMMARY_MAX_TOKENS = 360
+ANSWER_MAX_TOKENS = 160
+
+
+def concat_context(paths, settings: Settings) -> Tuple[str, int]:
+    """(context, number of paths kept) for the concat mode, in settings.concat_format and
+    trimmed to settings.max_context_tokens by dropping the lowest-ranked (last) paths."""
+    render = CONCAT_FORMATS[settings.concat_format]
+    kept = fit_paths(paths, render, settings.max_context_tokens)
+    return render(kept), len(kept)
+
+
+def context_columns(context: str, n_paths: Optional[int] = None) -> Dict[str, str]:
+    return {"context_paths": "" if n_paths is None else str(n_paths), "context_tokens": str(count_tokens(context))}
+
+
+def fluent_context_messages(query: str, paths, min_words: int, max_words: int) -> List[Dict[str, str]]:
+    """Summarizer prompt for make_fluent_context."""
     desc = "\n".join(f"- {linearize_path(p)}" for p in paths)
     target_low = max(min_words, max_words - 8)
 
@@ -52,17 +101,66 @@ Synthesis: <one sentence here>
 <final answer sentence here>
 """.strip()
 
+    return [{"role": "system", "content": sys}, {"role": "user", "content": user}]
+
+
+def make_fluent_context(query: str, paths, summarizer_model: str, chat: Chat, min_words: int, max_words: int, seed: int) -> str:
+    """Ask a model to weave paths into a faithful, answer-ready single-sentence context."""
     return chat.call(
-        messages=[{"role": "system", "content": sys}, {"role": "user", "content": user}],
+        messages=fluent_context_messages(query, paths, min_words, max_words),
         model=summarizer_model,
         temperature=0.0,
-        max_tokens=360,
+        max_tokens=SUMMARY_MAX_TOKENS,
         seed=seed,
     )
 
 
-def answer_with_context(query: str, context: str, answer_model: str, chat: Chat, min_words: int, max_words: int, strict_only: bool, seed: int) -> str:
-    """Answer using ONLY the provided context as a single {min_words}–{max_words} word sentence."""
+def summary_final_line(summary: str) -> str:
+    """The summarizer's final answer sentence (its last non-empty line)."""
+    lines = [ln.strip() for ln in summary.splitlines() if ln.strip()]
+    return lines[-1] if lines else summary
+
+
+# Sentence punctuation (and closing quotes) followed by whitespace: where a sentence certainly ends.
+# A "." that ends a stream delta may be a decimal point ("about 87" "." "97 days").
+_SENTENCE_END = re.compile(r"[.!?][\"')]*(?=\s)")
+
+
+class FinalLineWatcher:
+    """Spots the summarizer's final sentence while its response streams in.
+
+    Per the FORMAT of fluent_context_messages the final sentence is the line
+    after "Synthesis: ..."; it is taken as complete once it has at least
+    `min_words` words and its closing punctuation is followed by whitespace.
+    A sentence that ends the stream is only known at the end (summary_final_line).
+    """
+
+    def __init__(self, min_words: int):
+        self.min_words = min_words
+        self._buf = ""
+        self._start: Optional[int] = None  # offset of the final line in _buf
+
+    def feed(self, delta: str) -> Optional[str]:
+        """Add a delta; returns the final sentence once it is complete, else None."""
+        self._buf += delta
+        if self._start is None:
+            at = self._buf.find("Synthesis:")
+            nl = self._buf.find("\n", at) if at >= 0 else -1
+            if nl < 0:
+                return None
+            self._start = nl + 1
+        tail = self._buf[self._start:].lstrip()
+        for m in _SENTENCE_END.finditer(tail):
+            line = tail[:m.end()]
+            if "\n" in line:
+                return None
+            if len(line.split()) >= self.min_words:
+                return line
+        return None
+
+
+def answer_messages(query: str, context: str, min_words: int, max_words: int, strict_only: bool) -> List[Dict[str, str]]:
+    """Answer prompt for answer_with_context."""
     sys_core = "You are a careful QA assistant."
     if strict_only:
         sys_core += " Use ONLY the facts in the supplied context. If insufficient, respond exactly: Insufficient context."
@@ -79,11 +177,16 @@ Instructions:
 - If the answer isn't derivable from the context, reply exactly: Insufficient context.
 """.strip()
 
+    return [{"role": "system", "content": sys_core}, {"role": "user", "content": user}]
+
+
+def answer_with_context(query: str, context: str, answer_model: str, chat: Chat, min_words: int, max_words: int, strict_only: bool, seed: int) -> str:
+    """Answer using ONLY the provided context as a single {min_words}–{max_words} word sentence."""
     return chat.call(
-        messages=[{"role": "system", "content": sys_core}, {"role": "user", "content": user}],
+        messages=answer_messages(query, context, min_words, max_words, strict_only),
         model=answer_model,
         temperature=0.0,
-        max_tokens=160,
+        max_tokens=ANSWER_MAX_TOKENS,
         seed=seed,
     )
 
@@ -98,7 +201,7 @@ def run_one_example_on_model(
 ) -> List[Dict[str, str]]:
     """Run concat + fluent for one example and score both hypotheses."""
     # Build contexts
-    ctx_concat = make_concat_context(ex.paths)
+    ctx_concat, _ = concat_context(ex.paths, settings)
     summarizer_model = settings.model_summarizer_fixed or model_name
     ctx_fluent = make_fluent_context(ex.query, ex.paths, summarizer_model, chat, settings.min_words, settings.max_words, settings.seed)
 
@@ -106,86 +209,108 @@ def run_one_example_on_model(
     ans_concat = answer_with_context(ex.query, ctx_concat, model_name, chat, settings.min_words, settings.max_words, settings.strict_context_only, settings.seed)
     ans_fluent = answer_with_context(ex.query, ctx_fluent, model_name, chat, settings.min_words, settings.max_words, settings.strict_context_only, settings.seed)
 
-    # Metrics
-    r_concat = rouge_best(ans_concat, ex.gold_refs, rouge)
-    bleu_concat = bleu_multi_ref(ans_concat, ex.gold_refs)
-    bsf_concat = bertscore_best(ans_concat, ex.gold_refs, berts)
+    return score_answers(ex, model_name, {"concat": ans_concat, "fluent": ans_fluent}, rouge, berts)
 
-    r_fluent = rouge_best(ans_fluent, ex.gold_refs, rouge)
-    bleu_fluent = bleu_multi_ref(ans_fluent, ex.gold_refs)
-    bsf_fluent = bertscore_best(ans_fluent, ex.gold_refs, berts)
 
-    return [
-        {
+def score_answers(
+    ex: Example,
+    model_name: str,
+    answers: Dict[str, str],
+    rouge: Optional[rouge_scorer.RougeScorer],
+    berts,
+) -> List[Dict[str, Any]]:
+    """Score each answered mode against the example's gold references (rows in MODES order).
+
+    With rouge=None, ROUGE and BLEU come from the example's cached ReferenceIndex
+    (same scores, references tokenized once); otherwise the given scorer is used per pair.
+    """
+    index = reference_index(ex.gold_refs) if rouge is None else None
+    rows: List[Dict[str, Any]] = []
+    for mode in (m for m in MODES if m in answers):
+        ans = answers[mode]
+        t0 = time.perf_counter()
+        r = index.rouge(ans) if index is not None else rouge_best(ans, ex.gold_refs, rouge)
+        t1 = time.perf_counter()
+        bleu = index.bleu(ans) if index is not None else bleu_multi_ref(ans, ex.gold_refs)
+        t2 = time.perf_counter()
+        bsf = bertscore_best(ans, ex.gold_refs, berts)
+        t3 = time.perf_counter()
+        rows.append({
             "model": model_name,
-            "mode": "concat",
+            "mode": mode,
             "query": ex.query,
-            "answer": ans_concat,
-            "rouge1": f"{r_concat['rouge1']:.4f}",
-            "rougeL": f"{r_concat['rougeL']:.4f}",
-            "bleu": f"{bleu_concat:.4f}",
-            "bertscore_f1": f"{bsf_concat:.4f}",
-        },
+            "answer": ans,
+            "rouge1": r["rouge1"],
+            "rougeL": r["rougeL"],
+            "bleu": bleu,
+            "bertscore_f1": bsf,
+            "rouge_s": f"{t1 - t0:.6f}",
+            "bleu_s": f"{t2 - t1:.6f}",
+            "bertscore_s": f"{t3 - t2:.6f}" if berts is not None else "",
+        })
+    return rows
+
+
+def answer_rows(model_name: str, query: str, answers: Dict[str, str]) -> List[Dict[str, Any]]:
+    """Rows of answers not scored yet: the columns of score_answers with the metrics None
+    and their timings blank."""
+    return [
         {
-            "model": model_name,
-            "mode": "fluent",
-            "query": ex.query,
-            "answer": ans_fluent,
-            "rouge1": f"{r_fluent['rouge1']:.4f}",
-            "rougeL": f"{r_fluent['rougeL']:.4f}",
-            "bleu": f"{bleu_fluent:.4f}",
-            "bertscore_f1": f"{bsf_fluent:.4f}",
-        },
+            "model": model_name, "mode": mode, "query": query, "answer": answers[mode],
+            **dict.fromkeys(("rouge1", "rougeL", "bleu", "bertscore_f1")),
+            **dict.fromkeys(("rouge_s", "bleu_s", "bertscore_s"), ""),
+        }
+        for mode in MODES if mode in answers
     ]
 
 
-def summarize(rows: List[Dict[str, str]]) -> List[Dict[str, str]]:
+def fill_bertscore(rows: List[Dict[str, Any]], refs: List[List[str]], berts, batch_size: int = 64) -> None:
+    """Post-pass: set bertscore_f1 on every row in one batched scoring run (refs[i] are row i's gold refs).
+
+    bertscore_s is the batch time amortized over the rows.
+    """
+    t0 = time.perf_counter()
+    scores = bertscore_best_batch([r["answer"] for r in rows], refs, berts, batch_size=batch_size)
+    per_row = (time.perf_counter() - t0) / max(len(rows), 1)
+    for r, f1 in zip(rows, scores):
+        r["bertscore_f1"] = f1
+        r["bertscore_s"] = f"{per_row:.6f}"
+
+
+def summarize(rows: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
     """Aggregate mean metrics per (model, mode)."""
-    # group by (model, mode)
-    groups: Dict[Tuple[str, str], List[Dict[str, str]]] = {}
-    for r in rows:
-        key = (r["model"], r["mode"])
-        groups.setdefault(key, []).append(r)
-
-    summary_rows: List[Dict[str, str]] = []
-    for (model, mode), items in groups.items():
-        n = len(items)
-        mean_r1 = sum(float(x["rouge1"]) for x in items) / n
-        mean_rl = sum(float(x["rougeL"]) for x in items) / n
-        mean_bleu = sum(float(x["bleu"]) for x in items) / n
-        mean_bsf = sum(float(x["bertscore_f1"]) for x in items) / n
-        summary_rows.append({
-            "model": model,
-            "mode": mode,
-            "n_examples": str(n),
-            "mean_rouge1": f"{mean_r1:.4f}",
-            "mean_rougeL": f"{mean_rl:.4f}",
-            "mean_bleu": f"{mean_bleu:.4f}",
-            "mean_bertscore_f1": f"{mean_bsf:.4f}",
-        })
-    return summary_rows
+    from .results import ResultTable  # NumPy is only loaded once there are rows to aggregate
+
+    return ResultTable.from_rows(rows).summary()
+
+
+def csv_value(field: str, value: Any) -> Any:
+    """`value` as written to a CSV cell: floats in CSV_FORMATS (NaN and None empty), the rest as is."""
+    if value is None or (isinstance(value, float) and math.isnan(value)):
+        return ""
+    if isinstance(value, float):
+        return format(value, CSV_FORMATS.get(field, ".4f"))
+    return value
+
 
+def write_csvs(
+    rows: List[Dict[str, Any]],
+    summaries: List[Dict[str, Any]],
+    out_dir: str,
+    deltas: Optional[List[Dict[str, Any]]] = None,
+) -> None:
+    """Detailed and summary CSVs, plus the fluent-vs-concat delta CSV when `deltas` is given."""
+    from .results import DELTA_FIELDS
 
-def write_csvs(rows: List[Dict[str, str]], summaries: List[Dict[str, str]], out_dir: str) -> None:
     os.makedirs(out_dir, exist_ok=True)
-    detail = os.path.join(out_dir, "results_longform_fluent_vs_concat_detailed.csv")
-    summary = os.path.join(out_dir, "results_longform_fluent_vs_concat_summary.csv")
-
-    with open(detail, "w", newline="", encoding="utf-8") as f:
-        writer = csv.DictWriter(
-            f,
-            fieldnames=["model", "mode", "query", "answer", "rouge1", "rougeL", "bleu", "bertscore_f1"],
-        )
-        writer.writeheader()
-        writer.writerows(rows)
-
-    with open(summary, "w", newline="", encoding="utf-8") as f:
-        writer = csv.DictWriter(
-            f,
-            fieldnames=["model", "mode", "n_examples", "mean_rouge1", "mean_rougeL", "mean_bleu", "mean_bertscore_f1"],
-        )
-        writer.writeheader()
-        writer.writerows(summaries)
+    outputs = [("detailed", DETAIL_FIELDS, rows), ("summary", SUMMARY_FIELDS, summaries)]
+    if deltas is not None:
+        outputs.append(("delta", DELTA_FIELDS, deltas))
+    for kind, fields, data in outputs:
+        with open(os.path.join(out_dir, f"{OUTPUT_BASENAME}_{kind}.csv"), "w", newline="", encoding="utf-8") as f:
+            writer = csv.DictWriter(f, fieldnames=fields)
+            writer.writeheader()
+            writer.writerows({k: csv_value(k, v) for k, v in r.items()} for r in data)
 
 
 def timestamped_outdir(base: str) -> str:
@@ -0,0 +1,355 @@
+from __future__ import annotations
+import hashlib
+import threading
+import time
+from collections import OrderedDict, deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Any, Callable, Deque, Dict, Iterable, Iterator, List, Optional, Set, Tuple
+
+from .config import Settings
+from .data import Example
+from .formatters import linearize_path
+from .openai_client import Chat, Deferred, PendingCall
+from .profiling import CallInfo, pipeline_latency
+from .runner import (
+    MODES, SUMMARY_MAX_TOKENS, FinalLineWatcher, answer_with_context, concat_context, context_columns,
+    fluent_context_messages, make_fluent_context, summary_final_line,
+)
+
+
+@dataclass
+class WorkUnit:
+    model: str
+    index: int  # 1-based position of the example within this model's sweep
+    example: Example
+    modes: Tuple[str, ...] = MODES  # subset still to run, e.g. when resuming
+
+
+@dataclass
+class UnitResult:
+    unit: WorkUnit
+    answers: Dict[str, str]  # mode -> answer text
+    meta: Dict[str, Dict[str, str]]  # mode -> extra detailed-CSV columns
+
+
+# A finished request: (text, cost)
+Step = Tuple[str, CallInfo]
+
+
+@dataclass
+class _Submitted:
+    answers: Dict[str, Future]  # mode -> Future[Step]
+    contexts: Dict[str, "Future | CallInfo"]  # mode -> summarizer Future[Step] (fluent) or local CallInfo (concat)
+    meta: Dict[str, Dict[str, str]]
+    handoffs: Dict[str, Future]  # mode -> Future[Step] whose text the answer model got as context (fluent)
+
+
+def example_signature(ex: Example) -> str:
+    """Digest of everything an example contributes to its prompts (query + linearized paths)."""
+    h = hashlib.sha1(ex.query.encode("utf-8"))
+    for p in ex.paths:
+        h.update(b"\x00")
+        h.update(linearize_path(p).encode("utf-8"))
+    return h.hexdigest()
+
+
+class ModelLimits:
+    """Per-model caps on how many requests a single model has in flight."""
+
+    def __init__(self, default: int, overrides: Optional[Dict[str, int]] = None):
+        self.default = max(1, default)
+        self.overrides = {m: max(1, n) for m, n in (overrides or {}).items()}
+
+    def limit(self, model: str) -> int:
+        return self.overrides.get(model, self.default)
+
+
+@dataclass
+class _Call:
+    """A request in a model's queue, or holding one of the model's slots (running or deferred).
+    `fn` makes exactly one Chat call."""
+    model: str
+    fn: Callable[..., str]
+    args: Tuple[Any, ...]
+    future: Future  # Future[Step]
+    pending: PendingCall
+    ready_at: float  # since when it could have started; waiting from here on counts as queue time
+
+
+class GridScheduler:
+    """Thread-pool scheduler for the (model × example × mode) dependency graph.
+
+    Per work unit, the concat answer and the fluent summary start immediately;
+    the fluent answer is submitted as soon as its summary arrives.
+
+    Requests are memoized by their inputs in a bounded LRU of futures: a fluent
+    summary is computed once per (summarizer model, example) and shared by every
+    answer model when MODEL_SUMMARIZER_FIXED is set, and identical examples
+    (same query and paths) reuse each other's answers. Duplicates further apart
+    than the memo window fall through to the response cache.
+
+    With fluent_final_line, the summary is streamed and only its final
+    sentence becomes the answer context; the fluent answer is submitted as
+    soon as that line is complete, while the rest of the stream drains.
+
+    Requests wait for a per-model slot in their model's queue, not on a pool
+    thread: a model capped by `limits` never holds back the others. Only
+    requests holding a slot are handed to the pool. Likewise a request that
+    has to wait for its model's rate budget, an open circuit breaker or a
+    retry backoff (Chat.deferred) leaves the pool and keeps its slot until
+    a timer hands it back, so only that model's queue pauses.
+    """
+
+    def __init__(
+        self,
+        chat: Chat,
+        settings: Settings,
+        concurrency: int = 4,
+        limits: Optional[ModelLimits] = None,
+        memo_size: int = 4096,
+        fluent_final_line: bool = False,
+    ):
+        self.chat = chat
+        self.settings = settings
+        self.fluent_final_line = fluent_final_line
+        self.concurrency = max(1, concurrency)
+        self.limits = limits or ModelLimits(self.concurrency)
+        self._pool = ThreadPoolExecutor(max_workers=self.concurrency, thread_name_prefix="rag-eval")
+        self._memo: "OrderedDict[Tuple[str, str, str], Any]" = OrderedDict()
+        self._memo_size = memo_size
+        self._lock = threading.Lock()
+        self._queues: Dict[str, Deque[_Call]] = {}
+        self._running: Dict[str, int] = {}
+        self._timers: Set[threading.Timer] = set()
+
+    def close(self) -> None:
+        with self._lock:
+            timers, self._timers = self._timers, set()
+        for t in timers:
+            t.cancel()
+        self._pool.shutdown(wait=True)
+
+    def __enter__(self) -> "GridScheduler":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    def _dispatch(self, model: str, fn: Callable[..., str], *args, pending: Optional[PendingCall] = None) -> Future:
+        """Future[Step] of fn(*args), run on the pool once `model` has a free slot."""
+        pending = pending or PendingCall(time.perf_counter())
+        call = _Call(model, fn, args, Future(), pending, pending.t0)
+        with self._lock:
+            self._queues.setdefault(model, deque()).append(call)
+            ready = self._take(model)
+        for c in ready:
+            self._pool.submit(self._execute, c)
+        return call.future
+
+    def _take(self, model: str) -> List[_Call]:
+        """Queued calls of `model` that fit in its free slots, now counted as running (hold _lock)."""
+        queue = self._queues[model]
+        limit = self.limits.limit(model)
+        out = []
+        while queue and self._running.get(model, 0) < limit:
+            self._running[model] = self._running.get(model, 0) + 1
+            out.append(queue.popleft())
+        return out
+
+    def _execute(self, call: _Call) -> None:
+        """Pool task: run a call that holds a slot, then pass the slot on to the model's next call."""
+        call.pending.info.queue_s += time.perf_counter() - call.ready_at
+        try:
+            with self.chat.deferred(call.pending):
+                text = call.fn(*call.args)
+            call.future.set_result((text, self.chat.last_info()))
+        except Deferred as d:
+            self._resume_later(call, d.delay)
+            return  # the slot stays taken while the call waits
+        except BaseException as e:
+            call.future.set_exception(e)
+        with self._lock:
+            self._running[call.model] -= 1
+            ready = self._take(call.model)
+        for c in ready:
+            self._pool.submit(self._execute, c)
+
+    def _resume_later(self, call: _Call, delay: float) -> None:
+        call.ready_at = time.perf_counter() + delay
+
+        def fire() -> None:
+            with self._lock:
+                if timer not in self._timers:  # closed meanwhile
+                    return
+                self._timers.discard(timer)
+            self._pool.submit(self._execute, call)
+
+        timer = threading.Timer(delay, fire)
+        timer.daemon = True
+        with self._lock:
+            self._timers.add(timer)
+        timer.start()
+
+    def _answer(self, ex: Example, context: str, model: str) -> Future:
+        s = self.settings
+        return self._dispatch(
+            model, answer_with_context,
+            ex.query, context, model, self.chat, s.min_words, s.max_words, s.strict_context_only, s.seed,
+        )
+
+    def _fluent_answer(self, ex: Example, context: Step, model: str) -> Future:
+        """Answer from the fluent context; a failed summary fails the answer too, without a request."""
+        text, _ = context
+        if text.startswith("[ERROR"):
+            failed: Future = Future()
+            failed.set_result((text, CallInfo(cache="")))
+            return failed
+        return self._answer(ex, text, model)
+
+    def _summary_final_line(self, ex: Example, model: str, ready: Future, pending: PendingCall) -> str:
+        """Stream the summary, resolving `ready` with (final sentence, cost) as early as possible."""
+        s = self.settings
+        try:
+            watcher = FinalLineWatcher(s.min_words)
+            parts = []
+            messages = fluent_context_messages(ex.query, ex.paths, s.min_words, s.max_words)
+            for delta in self.chat.stream(messages, model, 0.0, SUMMARY_MAX_TOKENS, s.seed):
+                parts.append(delta)
+                line = None if ready.done() else watcher.feed(delta)
+                if line is not None:
+                    info = self.chat.last_info()
+                    info.handoff_s = time.perf_counter() - pending.t0 - info.queue_s
+                    ready.set_result((line, info))
+            text = self.chat.last_info().error or "".join(parts).strip()
+        except Deferred:
+            raise  # nothing was streamed yet; the call is re-run later
+        except BaseException as e:
+            if not ready.done():
+                ready.set_exception(e)
+            raise
+        if not ready.done():
+            ready.set_result((summary_final_line(text), self.chat.last_info()))
+        return text
+
+    def _submit_final_line(self, ex: Example, model: str) -> Tuple[Future, Future]:
+        """(full summary Future[Step], final-sentence Future[Step])."""
+        ready: Future = Future()
+        pending = PendingCall(time.perf_counter())
+        return self._dispatch(model, self._summary_final_line, ex, model, ready, pending, pending=pending), ready
+
+    def _then(self, upstream: Future, make: Callable[[Step], Future]) -> Future:
+        """Future of the request make(upstream.result()) dispatches once upstream completes."""
+        out: Future = Future()
+
+        def _relay(f: Future) -> None:
+            err = f.exception()
+            if err is not None:
+                out.set_exception(err)
+            else:
+                out.set_result(f.result())
+
+        def _on_done(f: Future) -> None:
+            err = f.exception()
+            if err is not None:
+                out.set_exception(err)
+                return
+            try:
+                make(f.result()).add_done_callback(_relay)
+            except BaseException as e:
+                out.set_exception(e)
+
+        upstream.add_done_callback(_on_done)
+        return out
+
+    def _shared(self, key: Tuple[str, str, str], make: Callable[[], Any]) -> Tuple[Any, bool]:
+        """(value, reused): the memoized future(s) for `key`, or new ones from make()."""
+        fut = self._memo.get(key)
+        if fut is not None:
+            self._memo.move_to_end(key)
+            return fut, True
+        fut = make()
+        self._memo[key] = fut
+        if len(self._memo) > self._memo_size:
+            self._memo.popitem(last=False)
+        return fut, False
+
+    def submit(self, unit: WorkUnit) -> _Submitted:
+        """Schedule the requests for `unit.modes`."""
+        s = self.settings
+        ex = unit.example
+        sig = example_signature(ex)
+        sub = _Submitted(answers={}, contexts={}, meta={}, handoffs={})
+        if "concat" in unit.modes:
+            t0 = time.perf_counter()
+            ctx, n_paths = concat_context(ex.paths, s)
+            sub.contexts["concat"] = CallInfo(service_s=time.perf_counter() - t0, cache="")
+            sub.answers["concat"], reused = self._shared(
+                ("concat", unit.model, sig),
+                lambda: self._answer(ex, ctx, unit.model),
+            )
+            sub.meta["concat"] = {"answer_reused": str(int(reused)), **context_columns(ctx, n_paths)}
+        if "fluent" in unit.modes:
+            summarizer_model = s.model_summarizer_fixed or unit.model
+            if self.fluent_final_line:
+                # memoized as a pair so a shared summary hands its early final line to every answer model
+                (summary, ready), summary_reused = self._shared(
+                    ("summary_final_line", summarizer_model, sig),
+                    lambda: self._submit_final_line(ex, summarizer_model),
+                )
+            else:
+                summary, summary_reused = self._shared(
+                    ("summary", summarizer_model, sig),
+                    lambda: self._dispatch(
+                        summarizer_model, make_fluent_context,
+                        ex.query, ex.paths, summarizer_model, self.chat, s.min_words, s.max_words, s.seed,
+                    ),
+                )
+                ready = summary
+            sub.contexts["fluent"] = summary
+            sub.handoffs["fluent"] = ready
+            sub.answers["fluent"], reused = self._shared(
+                ("fluent", unit.model, sig),
+                lambda: self._then(ready, lambda step: self._fluent_answer(ex, step, unit.model)),
+            )
+            sub.meta["fluent"] = {"summary_reused": str(int(summary_reused)), "answer_reused": str(int(reused))}
+        return sub
+
+    def run(self, units: Iterable[WorkUnit], window: Optional[int] = None) -> Iterator[UnitResult]:
+        """Yield results in submission order, keeping at most `window` units in flight."""
+        window = window or self.concurrency * 4
+        pending: Deque[Tuple[WorkUnit, _Submitted]] = deque()
+        for unit in units:
+            pending.append((unit, self.submit(unit)))
+            if len(pending) >= window:
+                yield self._collect(*pending.popleft())
+        while pending:
+            yield self._collect(*pending.popleft())
+
+    @staticmethod
+    def _collect(unit: WorkUnit, sub: _Submitted) -> UnitResult:
+        answers: Dict[str, str] = {}
+        for mode, fut in sub.answers.items():
+            text, info = fut.result()
+            answers[mode] = text
+            meta = sub.meta[mode]
+            ctx = sub.contexts[mode]
+            ctx_info = ctx.result()[1] if isinstance(ctx, Future) else ctx
+            if mode in sub.handoffs:
+                meta.update(context_columns(sub.handoffs[mode].result()[0]))
+            # latency is what this row's pipeline took, even when its calls were shared with another row
+            meta.update(pipeline_latency(ctx_info, info))
+            meta.update((CallInfo(cache="shared") if meta.get("summary_reused") == "1" else ctx_info).columns("context"))
+            meta.update((CallInfo(cache="shared") if meta["answer_reused"] == "1" else info).columns("answer"))
+        return UnitResult(unit=unit, answers=answers, meta=sub.meta)
+
+
+def parse_model_limits(specs: Optional[Iterable[str]]) -> Dict[str, int]:
+    """Parse ["gpt-4o=4", "gpt-4.1=2"] into {"gpt-4o": 4, "gpt-4.1": 2}."""
+    out: Dict[str, int] = {}
+    for spec in specs or []:
+        model, sep, n = spec.rpartition("=")
+        if not sep or not model.strip() or not n.strip().isdigit():
+            raise ValueError(f"Invalid model concurrency '{spec}', expected MODEL=N")
+        out[model.strip()] = int(n)
+    return out
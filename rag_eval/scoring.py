@@ -0,0 +1,118 @@
+from __future__ import annotations
+import multiprocessing
+import os
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor
+from dataclasses import dataclass
+from typing import Any, Deque, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple, TypeVar
+
+from .data import Example
+from .metrics import shared_bertscorer
+from .runner import fill_bertscore, score_answers
+
+T = TypeVar("T")
+
+
+@dataclass
+class ScoreJob:
+    """What scoring needs from one work unit (paths are not shipped to the workers)."""
+    model: str
+    query: str
+    gold_refs: List[str]
+    answers: Dict[str, str]  # mode -> answer text
+
+
+# Per-process state of a scoring worker, set once by _init_worker.
+_worker_scorer = None
+_worker_batch_size = 64
+
+
+def _init_worker(bertscore_model: Optional[str], batch_size: int, torch_threads: int) -> None:
+    global _worker_scorer, _worker_batch_size
+    _worker_batch_size = batch_size
+    if torch_threads > 0:
+        try:
+            import torch
+            torch.set_num_threads(torch_threads)  # workers share the cores instead of each taking all of them
+        except Exception:
+            pass
+    if bertscore_model:
+        _worker_scorer = shared_bertscorer(bertscore_model)
+
+
+def _score_chunk(jobs: Sequence[ScoreJob]) -> List[List[Dict[str, str]]]:
+    """Rows per job: ROUGE/BLEU per row, BERTScore in one batch over the whole chunk."""
+    out: List[List[Dict[str, str]]] = []
+    flat: List[Dict[str, str]] = []
+    refs: List[List[str]] = []
+    for job in jobs:
+        rows = score_answers(Example(job.query, [], job.gold_refs), job.model, job.answers, None, None)
+        out.append(rows)
+        flat.extend(rows)
+        refs.extend([job.gold_refs] * len(rows))
+    if _worker_scorer is not None and flat:
+        fill_bertscore(flat, refs, _worker_scorer, batch_size=_worker_batch_size)
+    return out
+
+
+class ScoringPool:
+    """Scores answers on worker processes while generation continues.
+
+    Each worker loads the BERTScorer once at startup. Jobs are sent in chunks
+    of `chunk` units (one BERTScore batch per chunk), and at most
+    `max_pending` chunks are in flight: when scoring falls behind, score()
+    stops pulling new units, which in turn holds back the generation window.
+    Worker processes are spawned (not forked) so they do not inherit the
+    caller's threads and open connections.
+    """
+
+    def __init__(
+        self,
+        workers: int,
+        bertscore_model: Optional[str],
+        batch_size: int = 64,
+        chunk: int = 4,
+        max_pending: Optional[int] = None,
+    ):
+        self.workers = max(1, workers)
+        self.chunk = max(1, chunk)
+        self.max_pending = max_pending or 2 * self.workers
+        torch_threads = max(1, (os.cpu_count() or 1) // self.workers)
+        self._pool = ProcessPoolExecutor(
+            max_workers=self.workers,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=_init_worker,
+            initargs=(bertscore_model, batch_size, torch_threads),
+        )
+
+    def close(self) -> None:
+        self._pool.shutdown(wait=True)
+
+    def __enter__(self) -> "ScoringPool":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    def score(self, items: Iterable[Tuple[T, ScoreJob]]) -> Iterator[Tuple[T, List[Dict[str, str]]]]:
+        """Yield (tag, rows) in input order."""
+        pending: Deque[Tuple[List[T], Future]] = deque()
+        tags: List[T] = []
+        jobs: List[ScoreJob] = []
+        for tag, job in items:
+            tags.append(tag)
+            jobs.append(job)
+            if len(jobs) >= self.chunk:
+                pending.append((tags, self._pool.submit(_score_chunk, jobs)))
+                tags, jobs = [], []
+            while pending and (len(pending) >= self.max_pending or pending[0][1].done()):
+                yield from self._pop(pending)
+        if jobs:
+            pending.append((tags, self._pool.submit(_score_chunk, jobs)))
+        while pending:
+            yield from self._pop(pending)
+
+    @staticmethod
+    def _pop(pending: Deque[Tuple[List[Any], Future]]) -> Iterator[Tuple[Any, List[Dict[str, str]]]]:
+        tags, fut = pending.popleft()
+        yield from zip(tags, fut.result())
@@ -0,0 +1,225 @@
+from __future__ import annotations
+import json
+import math
+import os
+import random
+from functools import lru_cache
+from typing import Any, Dict, Hashable, List, Optional, Sequence
+
+from .data import Example
+
+SEQUENTIAL_FILE = "sequential.json"
+
+
+def example_stratum(ex: Example) -> tuple:
+    """Stratum of an example for sampling: (number of paths, longest path in edges)."""
+    return len(ex.paths), max((len(p.edges) for p in ex.paths), default=0)
+
+
+def stratified_order(strata: Sequence[Hashable], seed: int) -> List[int]:
+    """A random order of range(len(strata)) in which every prefix holds each stratum in
+    about its overall proportion: items are shuffled within their stratum, then the
+    k-th of n items in a stratum is placed at (k + u) / n for a random u in [0, 1)."""
+    rng = random.Random(seed)
+    members: Dict[Hashable, List[int]] = {}
+    for i, s in enumerate(strata):
+        members.setdefault(s, []).append(i)
+    keyed = []
+    for items in members.values():
+        rng.shuffle(items)
+        u = rng.random()
+        keyed.extend(((k + u) / len(items), rng.random(), i) for k, i in enumerate(items))
+    keyed.sort()
+    return [i for _, _, i in keyed]
+
+
+def _betacf(a: float, b: float, x: float) -> float:
+    """Continued fraction of the incomplete beta function (modified Lentz)."""
+    tiny = 1e-300
+    c, d = 1.0, 1.0 - (a + b) * x / (a + 1)
+    d = 1.0 / (d if abs(d) > tiny else tiny)
+    h = d
+    for m in range(1, 300):
+        for aa in (m * (b - m) * x / ((a + 2 * m - 1) * (a + 2 * m)),
+                   -(a + m) * (a + b + m) * x / ((a + 2 * m) * (a + 2 * m + 1))):
+            d = 1.0 + aa * d
+            d = 1.0 / (d if abs(d) > tiny else tiny)
+            c = 1.0 + aa / c
+            c = c if abs(c) > tiny else tiny
+            h *= d * c
+        if abs(d * c - 1.0) < 1e-15:
+            break
+    return h
+
+
+def _betainc(a: float, b: float, x: float) -> float:
+    """Regularized incomplete beta function I_x(a, b)."""
+    if x <= 0.0 or x >= 1.0:
+        return 0.0 if x <= 0.0 else 1.0
+    front = math.exp(math.lgamma(a + b) - math.lgamma(a) - math.lgamma(b) + a * math.log(x) + b * math.log1p(-x))
+    if x < (a + 1) / (a + b + 2):
+        return front * _betacf(a, b, x) / a
+    return 1.0 - front * _betacf(b, a, 1.0 - x) / b
+
+
+@lru_cache(maxsize=None)
+def t_quantile(p: float, df: int) -> float:
+    """Quantile of Student's t distribution with `df` degrees of freedom, for 0.5 <= p < 1."""
+    tail = 1.0 - p
+
+    def upper(t: float) -> float:  # P(T > t) for t >= 0
+        return 0.5 * _betainc(df / 2.0, 0.5, df / (df + t * t))
+
+    lo, hi = 0.0, 1.0
+    while upper(hi) > tail:
+        lo, hi = hi, 2 * hi
+    for _ in range(100):
+        mid = (lo + hi) / 2
+        lo, hi = (mid, hi) if upper(mid) > tail else (lo, mid)
+    return (lo + hi) / 2
+
+
+class _ModelState:
+    __slots__ = ("n", "mean", "m2", "pending", "errors", "status", "looks", "ci")
+
+    def __init__(self) -> None:
+        self.n = 0
+        self.mean = 0.0
+        self.m2 = 0.0  # Welford sum of squared deviations of the paired deltas
+        self.pending: Dict[int, Dict[str, float]] = {}  # example -> mode -> metric, until both modes are in
+        self.errors = 0  # consecutive [ERROR answers
+        self.status = "running"
+        self.looks = 0
+        self.ci: Optional[tuple] = None
+
+
+class SequentialMonitor:
+    """Running fluent - concat delta per model, with early stopping.
+
+    Rows are fed in as they finish. Once a model has `min_examples` paired
+    examples, and then every `check_every` more, its confidence interval for
+    the mean delta of `metric` is checked:
+
+    * the interval excludes zero: the difference is decided ("significant");
+    * with `min_effect`, the interval lies within (-min_effect, +min_effect):
+      any difference is too small to matter ("below_min_effect").
+
+    The interval is a Student t interval (n - 1 degrees of freedom), which
+    stays honest at the small n that `min_examples` allows. Repeated looks
+    inflate the error rate of a fixed-sample interval, so alpha is split evenly
+    (Bonferroni) over the most looks the run could take (`max_looks`). Independently, a model is stopped ("errors") after
+    `max_errors` consecutive [ERROR answers (0 = never). Without `enabled`,
+    only the error rule applies.
+    """
+
+    def __init__(
+        self,
+        enabled: bool = True,
+        metric: str = "rougeL",
+        alpha: float = 0.05,
+        min_effect: Optional[float] = None,
+        min_examples: int = 20,
+        check_every: int = 10,
+        max_looks: int = 1,
+        max_errors: int = 0,
+    ):
+        self.enabled = enabled
+        self.metric = metric
+        self.alpha = alpha
+        self.min_effect = min_effect
+        self.min_examples = max(2, min_examples)
+        self.check_every = max(1, check_every)
+        self.max_looks = max(1, max_looks)
+        self.max_errors = max_errors
+        self.level = 1 - alpha / (2 * self.max_looks)  # per-look quantile of the two-sided interval
+        self._models: Dict[str, _ModelState] = {}
+
+    @staticmethod
+    def looks_for(n_examples: int, min_examples: int, check_every: int) -> int:
+        """How many checks a model with n_examples examples gets at most."""
+        if n_examples < min_examples:
+            return 1
+        return 1 + (n_examples - min_examples) // max(1, check_every)
+
+    def _state(self, model: str) -> _ModelState:
+        st = self._models.get(model)
+        if st is None:
+            st = self._models[model] = _ModelState()
+        return st
+
+    def stopped(self, model: str) -> bool:
+        st = self._models.get(model)
+        return st is not None and st.status != "running"
+
+    def update(self, model: str, index: int, rows: List[Dict[str, str]]) -> Optional[str]:
+        """Record a work unit's rows; returns the stop reason if this update stopped the model."""
+        st = self._state(model)
+        if st.status != "running":
+            return None
+        for r in rows:
+            if r["answer"].startswith("[ERROR"):
+                st.errors += 1
+            else:
+                st.errors = 0
+        if self.max_errors and st.errors >= self.max_errors:
+            st.status = "errors"
+            return st.status
+        if not self.enabled:
+            return None
+
+        got = st.pending.setdefault(index, {})
+        for r in rows:
+            if not r["answer"].startswith("[ERROR"):
+                got[r["mode"]] = float(r[self.metric])
+        if "concat" not in got or "fluent" not in got:
+            return None
+        del st.pending[index]
+        d = got["fluent"] - got["concat"]
+        st.n += 1
+        delta = d - st.mean
+        st.mean += delta / st.n
+        st.m2 += delta * (d - st.mean)
+        if st.n < self.min_examples or (st.n - self.min_examples) % self.check_every:
+            return None
+
+        st.looks += 1
+        half = t_quantile(self.level, st.n - 1) * math.sqrt(st.m2 / (st.n - 1) / st.n)
+        lo, hi = st.mean - half, st.mean + half
+        st.ci = (lo, hi)
+        if lo > 0 or hi < 0:
+            st.status = "significant"
+        elif self.min_effect is not None and -self.min_effect < lo and hi < self.min_effect:
+            st.status = "below_min_effect"
+        return None if st.status == "running" else st.status
+
+    def describe(self, model: str) -> str:
+        st = self._state(model)
+        if st.status == "errors":
+            return f"{model}: stopped after {st.errors} consecutive [ERROR answers"
+        ci = f" CI=[{st.ci[0]:+.4f}, {st.ci[1]:+.4f}]" if st.ci else ""
+        return f"{model}: {st.status} after {st.n} paired examples, mean {self.metric} delta {st.mean:+.4f}{ci}"
+
+    def report(self) -> Dict[str, Any]:
+        return {
+            "metric": self.metric,
+            "alpha": self.alpha,
+            "min_effect": self.min_effect,
+            "quantile": self.level,
+            "max_looks": self.max_looks,
+            "models": {
+                m: {
+                    "status": st.status,
+                    "n_pairs": st.n,
+                    "mean_delta": st.mean,
+                    "ci": list(st.ci) if st.ci else None,
+                    "looks": st.looks,
+                }
+                for m, st in self._models.items()
+            },
+        }
+
+    def write(self, out_dir: str) -> str:
+        path = os.path.join(out_dir, SEQUENTIAL_FILE)
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(self.report(), f, indent=2)
+        return path
@@ -0,0 +1,100 @@
+from __future__ import annotations
+import hashlib
+import json
+import os
+from typing import Any, Dict, List, Sequence, Tuple
+
+from .checkpoint import CHECKPOINT_FILE, RowKey, read_checkpoint
+from .runner import MODES
+
+MANIFEST_FILE = "shard.json"
+
+
+def unit_shard(model: str, index: int, count: int) -> int:
+    """Shard of the (model, example index) work unit. A fixed hash, unlike hash(), so every
+    process and Python version agrees, and units spread evenly whatever the model names."""
+    digest = hashlib.blake2b(f"{model}\0{index}".encode("utf-8"), digest_size=8).digest()
+    return int.from_bytes(digest, "big") % count
+
+
+def shard_dirname(index: int, count: int) -> str:
+    return f"shard-{index}-of-{count}"
+
+
+def write_manifest(out_dir: str, manifest: Dict[str, Any]) -> str:
+    """Written when a shard finishes; merge treats a shard directory without it as unfinished."""
+    path = os.path.join(out_dir, MANIFEST_FILE)
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2)
+    return path
+
+
+def find_shard_dirs(paths: Sequence[str]) -> List[str]:
+    """Shard directories among `paths`: each path is a shard directory itself, or a run
+    directory whose shard-* subdirectories are taken."""
+    out: List[str] = []
+    for p in paths:
+        subdirs = sorted(
+            os.path.join(p, d) for d in os.listdir(p)
+            if d.startswith("shard-") and os.path.isdir(os.path.join(p, d))
+        ) if os.path.isdir(p) else []
+        out.extend(subdirs or [p])
+    return out
+
+
+def merge_shards(shard_dirs: Sequence[str], allow_incomplete: bool = False) -> Tuple[Dict[str, Any], List[Dict[str, Any]]]:
+    """(manifest, checkpoint records) of a sharded run, checked for consistency and coverage.
+
+    Every shard 0..count-1 must have finished (written its manifest) with the same run
+    configuration. Records are deduplicated by (model, example, mode); an answered row beats an
+    [ERROR one, otherwise the later directory wins. Unless `allow_incomplete`, every
+    (model, example, mode) of the run must be present exactly once.
+    """
+    manifests: Dict[int, Dict[str, Any]] = {}
+    records: Dict[RowKey, Dict[str, Any]] = {}
+    problems: List[str] = []
+    for d in shard_dirs:
+        path = os.path.join(d, MANIFEST_FILE)
+        if not os.path.exists(path):
+            problems.append(f"{d}: no {MANIFEST_FILE}; the shard has not finished (continue it with --resume {d})")
+            continue
+        with open(path, encoding="utf-8") as f:
+            m = json.load(f)
+        first = next(iter(manifests.values()), None)
+        if first is not None and m["config"] != first["config"]:
+            diff = sorted(k for k in set(m["config"]) | set(first["config"]) if m["config"].get(k) != first["config"].get(k))
+            raise ValueError(f"{d}: run configuration differs from the other shards ({', '.join(diff)})")
+        manifests[m["shard_index"]] = m
+        for rec in read_checkpoint(os.path.join(d, CHECKPOINT_FILE)):
+            key = (rec["model"], rec["index"], rec["mode"])
+            old = records.get(key)
+            if old is None or not rec["row"]["answer"].startswith("[ERROR") or old["row"]["answer"].startswith("[ERROR"):
+                records[key] = rec
+    if not manifests:
+        raise ValueError("No finished shards to merge" + "".join(f"\n  {p}" for p in problems))
+
+    manifest = next(iter(manifests.values()))
+    count = manifest["config"]["shard_count"]
+    missing_shards = sorted(set(range(count)) - set(manifests))
+    if missing_shards:
+        problems.append(f"missing shards {missing_shards} of {count}")
+    expected = {
+        (model, i, mode)
+        for model in manifest["config"]["models"]
+        for i in range(1, manifest["n_examples"] + 1)
+        for mode in MODES
+    }
+    missing = expected - set(records)
+    extra = set(records) - expected
+    if missing:
+        sample = ", ".join(f"{m}#{i}/{mode}" for m, i, mode in sorted(missing)[:5])
+        problems.append(f"{len(missing)} of {len(expected)} rows missing (e.g. {sample})")
+    if problems and not allow_incomplete:
+        raise ValueError("Shards do not cover the run:\n  " + "\n  ".join(problems))
+    for p in problems:
+        print(f"[merge] warning: {p}")
+    if extra:
+        print(f"[merge] warning: dropping {len(extra)} rows outside the run's models/examples")
+        for key in extra:
+            del records[key]
+    return manifest, list(records.values())
@@ -0,0 +1,73 @@
+from __future__ import annotations
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, List, Optional
+
+import pytest
+
+from rag_eval.config import Settings
+from rag_eval.mock_server import MockConfig, MockServer
+from rag_eval.profiling import CallInfo
+
+
+@pytest.fixture
+def settings() -> Settings:
+    return Settings(
+        openai_api_key="test", model_list=["m1", "m2"], model_summarizer_fixed=None, seed=0,
+        strict_context_only=True, bertscore_model="", min_words=15, max_words=40,
+    )
+
+
+@pytest.fixture
+def mock_server():
+    """start(**MockConfig kwargs) -> a running MockServer, shut down after the test."""
+    servers: List[MockServer] = []
+
+    def start(**config) -> MockServer:
+        server = MockServer(config=MockConfig(**config)).start()
+        servers.append(server)
+        return server
+
+    yield start
+    for server in servers:
+        server.shutdown()
+        server.server_close()
+
+
+class FakeChat:
+    """In-process stand-in for Chat: every call sleeps `latency[model]` seconds and returns a fixed
+    text, and records (model, start, end) in `calls`."""
+
+    def __init__(self, latency: Dict[str, float], default: float = 0.0):
+        self.latency = latency
+        self.default = default
+        self.calls: List[tuple] = []
+        self._lock = threading.Lock()
+        self._local = threading.local()
+
+    @contextmanager
+    def deferred(self, pending):
+        self._local.pending = pending
+        try:
+            yield pending
+        finally:
+            self._local.pending = None
+
+    def last_info(self) -> CallInfo:
+        return getattr(self._local, "info", None) or CallInfo()
+
+    def call(self, messages, model: str, temperature: float = 0.0, max_tokens: int = 300,
+             seed: Optional[int] = None, stream: Optional[bool] = None) -> str:
+        t0 = time.perf_counter()
+        time.sleep(self.latency.get(model, self.default))
+        t1 = time.perf_counter()
+        pending = getattr(self._local, "pending", None)
+        self._local.info = pending.info if pending is not None else CallInfo()
+        self._local.info.service_s = t1 - t0
+        with self._lock:
+            self.calls.append((model, t0, t1))
+        return f"{model} answer\nSynthesis: joined facts.\nThe final sentence of the {model} summary is long enough here."
+
+    def stream(self, messages, model: str, temperature: float = 0.0, max_tokens: int = 300, seed: Optional[int] = None):
+        yield self.call(messages, model, temperature, max_tokens, seed)
@@ -0,0 +1,31 @@
+from __future__ import annotations
+
+import pytest
+
+from rag_eval.batch import BatchRunner, LocalBatchBackend, run_batch_grid
+from rag_eval.data import build_examples
+from rag_eval.mock_server import mock_content
+from rag_eval.openai_client import Chat
+from rag_eval.scheduler import GridScheduler, WorkUnit
+
+
+@pytest.mark.parametrize("final_line", [False, True])
+def test_local_mock_batch_matches_the_scheduler(mock_server, settings, tmp_path, final_line):
+    def units():
+        for i, ex in enumerate(build_examples(), start=1):
+            for model in settings.model_list:
+                yield WorkUnit(model, i, ex, ("concat", "fluent"))
+
+    backend = LocalBatchBackend(str(tmp_path / "local"), respond=lambda b: mock_content(b["messages"], b["max_tokens"]))
+    runner = BatchRunner(backend, str(tmp_path / "work"), poll_interval=0)
+    batch = list(run_batch_grid(units, settings, runner, fluent_final_line=final_line))
+
+    chat = Chat(api_key="test", base_url=mock_server().base_url)
+    with GridScheduler(chat, settings, concurrency=4, fluent_final_line=final_line) as sched:
+        online = list(sched.run(units()))
+
+    assert [r.unit for r in batch] == [r.unit for r in online]
+    assert [r.answers for r in batch] == [r.answers for r in online]
+    for b, o in zip(batch, online):  # the scheduler adds latency columns the batch cannot measure
+        assert b.meta == {mode: {k: o.meta[mode][k] for k in cols} for mode, cols in b.meta.items()}
+    assert not any(a.startswith("[ERROR") for r in batch for a in r.answers.values())
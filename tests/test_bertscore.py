@@ -0,0 +1,42 @@
+from __future__ import annotations
+
+import pytest
+
+torch = pytest.importorskip("torch")
+pytest.importorskip("bert_score")
+from bert_score import BERTScorer  # noqa: E402
+from transformers import BertConfig, BertModel, BertTokenizer  # noqa: E402
+
+from rag_eval.metrics import bertscore_best, bertscore_best_batch  # noqa: E402
+
+TEXTS = [
+    "mercury is the closest planet to the sun", "venus is hot", "the sun is a star",
+    "mars is red and cold", "a b c", "mercury has no moons and a thin exosphere",
+]
+
+
+def _tiny_scorer(tmp_path, rescale: bool) -> BERTScorer:
+    """A BERTScorer around a random one-layer BERT over the test vocabulary (no download)."""
+    vocab = tmp_path / "vocab.txt"
+    words = sorted({w for t in TEXTS for w in t.split()})
+    vocab.write_text("\n".join(["[PAD]", "[UNK]", "[CLS]", "[SEP]", "[MASK]"] + words) + "\n")
+    tokenizer = BertTokenizer(str(vocab), model_max_length=512)
+    torch.manual_seed(0)
+    config = BertConfig(vocab_size=len(tokenizer), hidden_size=16, num_hidden_layers=1, num_attention_heads=2, intermediate_size=32)
+    scorer = object.__new__(BERTScorer)
+    scorer.__dict__.update(
+        _idf=False, _tokenizer=tokenizer, _model=BertModel(config).eval(), device="cpu", all_layers=False,
+        _rescale_with_baseline=rescale, _baseline_vals=torch.tensor([0.6, 0.6, 0.6]),
+    )
+    return scorer
+
+
+@pytest.mark.parametrize("rescale", [False, True])
+@pytest.mark.parametrize("batch_size", [1, 2, 64])
+def test_batched_bertscore_matches_per_pair(tmp_path, rescale, batch_size):
+    scorer = _tiny_scorer(tmp_path, rescale)
+    # uneven reference lists, shared ref sets, and a hypothesis that is one of its references
+    refs = [[TEXTS[1]], TEXTS[2:5], [TEXTS[0], TEXTS[3]], TEXTS, TEXTS[2:5], [TEXTS[5]]]
+    hyps = [TEXTS[0], TEXTS[1], TEXTS[2], TEXTS[3], TEXTS[5], TEXTS[5]]
+    expected = [bertscore_best(h, r, scorer) for h, r in zip(hyps, refs)]
+    assert bertscore_best_batch(hyps, refs, scorer, batch_size=batch_size) == pytest.approx(expected, abs=1e-6)
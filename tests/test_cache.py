@@ -0,0 +1,53 @@
+from __future__ import annotations
+
+from rag_eval.cache import ResponseCache
+from rag_eval.openai_client import Chat
+
+MESSAGES = [{"role": "user", "content": 'Context:\n"""Mercury is the closest planet to the Sun."""\n\nQuestion: ?'}]
+
+
+def test_endpoints_do_not_share_cached_responses(mock_server, tmp_path):
+    cache = ResponseCache(str(tmp_path))
+    first, second = mock_server(), mock_server()
+    for server, expected in ((first, "miss"), (first, "hit"), (second, "miss")):
+        chat = Chat(api_key="test", base_url=server.base_url, cache=cache)
+        chat.call(MESSAGES, "m")
+        assert chat.last_info().cache == expected
+    assert [s.config.stats["requests"] for s in (first, second)] == [1, 1]
+
+
+def test_least_recently_used_entries_go_first(tmp_path):
+    cache = ResponseCache(str(tmp_path), max_bytes=30)
+    for key in "abc":
+        cache.put(key, "m", key * 10)
+    assert cache.get("a") == "a" * 10  # now b is the least recently used
+    cache.put("d", "m", "d" * 10)
+    assert [cache.get(k) is not None for k in "abcd"] == [True, False, True, True]
+    assert cache.stats()["evictions"] == 1 and cache.stats()["bytes"] == 30
+
+
+def test_entry_larger_than_the_cap_is_not_stored(tmp_path):
+    cache = ResponseCache(str(tmp_path), max_bytes=25)
+    cache.put("a", "m", "a" * 10)
+    cache.put("big", "m", "x" * 100)
+    assert cache.get("big") is None and cache.get("a") == "a" * 10
+    cache.put("b", "m", "b" * 20)  # the new entry survives its own eviction pass
+    assert cache.get("b") == "b" * 20 and cache.get("a") is None
+    assert cache.stats()["bytes"] == 20
+
+
+def test_read_and_write_modes(tmp_path):
+    ResponseCache(str(tmp_path)).put("k", "m", "stored")
+    read = ResponseCache(str(tmp_path), mode="read")
+    read.put("new", "m", "text")
+    assert read.get("k") == "stored" and read.get("new") is None and read.writes == 0
+    write = ResponseCache(str(tmp_path), mode="write")
+    assert write.get("k") is None
+    write.put("new", "m", "text")
+    assert ResponseCache(str(tmp_path)).get("new") == "text"
+
+
+def test_errors_are_never_stored(tmp_path):
+    cache = ResponseCache(str(tmp_path))
+    cache.put("k", "m", "[ERROR: RateLimitError: slow down]")
+    assert cache.get("k") is None and cache.writes == 0
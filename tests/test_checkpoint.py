@@ -0,0 +1,39 @@
+from __future__ import annotations
+import json
+
+from rag_eval.checkpoint import Checkpoint
+from rag_eval.data import build_examples
+from rag_eval.runner import answer_rows, score_answers
+
+
+def test_answers_checkpointed_before_scoring_survive_a_crash(tmp_path):
+    ex = build_examples()[0]
+    answers = {"concat": ex.gold_refs[0], "fluent": "Mercury is small."}
+    ckpt = Checkpoint(str(tmp_path))
+    ckpt.append("m1", 1, ex.gold_refs, [{**r, "answer_reused": "0"} for r in answer_rows("m1", ex.query, answers)])
+    ckpt.close()  # the run dies while the scoring pool holds the unit
+
+    ckpt = Checkpoint(str(tmp_path))
+    assert ckpt.completed_keys() == {("m1", 1, "concat"), ("m1", 1, "fluent")}  # not paid for twice
+    assert ckpt.score_unscored() == 2 and ckpt.score_unscored() == 0
+    expected = score_answers(ex, "m1", answers, None, None)
+    rows = sorted((r["row"] for r in ckpt.load()), key=lambda r: r["mode"])
+    assert [(r["rouge1"], r["rougeL"], r["bleu"], r["answer_reused"]) for r in rows] == \
+        [(e["rouge1"], e["rougeL"], e["bleu"], "0") for e in expected]
+
+
+def test_refs_are_written_once_per_example(tmp_path):
+    ex1, ex2 = build_examples()[:2]
+    ckpt = Checkpoint(str(tmp_path))
+    for model in ("m1", "m2"):
+        for i, ex in ((1, ex1), (2, ex2)):
+            ckpt.append(model, i, ex.gold_refs, answer_rows(model, ex.query, {"concat": "a", "fluent": "b"}))
+    ckpt.close()
+    ckpt = Checkpoint(str(tmp_path))  # reopened: refs already on file are not repeated
+    ckpt.append("m3", 1, ex1.gold_refs, answer_rows("m3", ex1.query, {"concat": "a"}))
+    with open(ckpt.path, encoding="utf-8") as f:
+        lines = [json.loads(line) for line in f]
+    assert sum("refs" in rec for rec in lines) == 2
+    records = ckpt.load()
+    assert len(records) == 9
+    assert all(r["refs"] == (ex1 if r["index"] == 1 else ex2).gold_refs for r in records)
@@ -0,0 +1,121 @@
+from __future__ import annotations
+import csv
+import json
+import os
+
+import pytest
+
+from rag_eval import cli
+from rag_eval.checkpoint import CHECKPOINT_FILE
+from rag_eval.data import build_examples
+from rag_eval.profiling import PROFILE_FILE
+from rag_eval.retrieval import write_graph_jsonl
+from rag_eval.runner import OUTPUT_BASENAME
+from rag_eval.sharding import MANIFEST_FILE
+
+
+@pytest.fixture
+def run_eval(mock_server, tmp_path, monkeypatch):
+    """run_eval(*args) -> runs the CLI against a mock server; outputs land under tmp_path/outputs."""
+    server = mock_server()
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setenv("OPENAI_API_KEY", "test")
+
+    def run(*args: str) -> None:
+        cli.main([
+            "--models", "m1", "m2", "--base-url", server.base_url, "--no-cache", "--no-bertscore",
+            "--bootstrap", "100", "--concurrency", "4", *args,
+        ])
+
+    return run
+
+
+def _rows(out_dir: str):
+    """Detailed CSV rows without their timing columns."""
+    with open(os.path.join(out_dir, f"{OUTPUT_BASENAME}_detailed.csv"), newline="", encoding="utf-8") as f:
+        return [{k: v for k, v in r.items() if not k.endswith("_s")} for r in csv.DictReader(f)]
+
+
+def _summary(out_dir: str):
+    with open(os.path.join(out_dir, f"{OUTPUT_BASENAME}_summary.csv"), newline="", encoding="utf-8") as f:
+        return [{k: v for k, v in r.items() if k.startswith(("model", "mode", "n_", "mean_rouge", "mean_bleu"))} for r in csv.DictReader(f)]
+
+
+def test_resume_after_a_crash_matches_an_uninterrupted_run(run_eval):
+    run_eval("--run-name", "full")
+    run_eval("--run-name", "crashed")
+    path = os.path.join("outputs", "crashed", CHECKPOINT_FILE)
+    with open(path, encoding="utf-8") as f:
+        lines = f.readlines()
+    with open(path, "w", encoding="utf-8") as f:  # three rows made it, the fourth was torn mid-write
+        f.writelines(lines[:3])
+        f.write(lines[3][: len(lines[3]) // 2])
+    for name in os.listdir(os.path.join("outputs", "crashed")):
+        if name != CHECKPOINT_FILE:
+            os.remove(os.path.join("outputs", "crashed", name))
+    run_eval("--resume", os.path.join("outputs", "crashed"))
+    assert len(_rows("outputs/full")) == 20  # 2 models x 5 examples x 2 modes
+    assert _rows("outputs/crashed") == _rows("outputs/full")
+    assert _summary("outputs/crashed") == _summary("outputs/full")
+
+
+def test_merged_shards_match_a_single_run(run_eval):
+    run_eval("--run-name", "single")
+    for i in range(3):
+        run_eval("--run-name", "sharded", "--shard-count", "3", "--shard-index", str(i))
+    cli.main(["merge", os.path.join("outputs", "sharded")])
+    assert _rows("outputs/sharded/merged") == _rows("outputs/single")
+    assert _summary("outputs/sharded/merged") == _summary("outputs/single")
+
+
+def test_timing_columns_and_profile_are_filled(run_eval, tmp_path):
+    graph = tmp_path / "graph.jsonl"
+    examples = build_examples()
+    nodes = {n.id: n.text for ex in examples for p in ex.paths for n in p.nodes}
+    edges = [(e.src, e.dst, e.relation) for ex in examples for p in ex.paths for e in p.edges]
+    write_graph_jsonl(nodes.items(), edges, str(graph))
+    run_eval("--run-name", "timed", "--stream", "--graph", str(graph))
+
+    with open(os.path.join("outputs", "timed", f"{OUTPUT_BASENAME}_detailed.csv"), newline="", encoding="utf-8") as f:
+        rows = list(csv.DictReader(f))
+    for r in rows:
+        timings = {k: float(r[k]) for k in ("retrieval_s", "context_s", "answer_s", "answer_ttft_s", "ttft_s", "latency_s")}
+        assert all(v >= 0 for v in timings.values()) and timings["ttft_s"] <= timings["latency_s"]
+        assert int(r["answer_prompt_tokens"]) > 0 and int(r["answer_completion_tokens"]) > 0
+        if r["mode"] == "fluent":
+            assert float(r["context_ttft_s"]) <= float(r["context_s"]) and int(r["context_completion_tokens"]) > 0
+
+    with open(os.path.join("outputs", "timed", PROFILE_FILE), encoding="utf-8") as f:
+        profile = json.load(f)
+    assert set(profile) == {"m1", "m2"}
+    for model in ("m1", "m2"):
+        for mode in ("concat", "fluent"):
+            p = profile[model][mode]
+            assert p["n_rows"] == 5
+            for stage in ("retrieval", "context", "answer", "answer_ttft", "ttft", "latency", "rouge", "bleu"):
+                assert p["stages"][stage]["n"] == 5 and p["stages"][stage]["total_s"] > 0
+            assert p["tokens"]["answer_prompt"] > 0 and p["tokens"]["answer_completion"] > 0
+            assert p["cache"]["answer_off"] == 5
+        assert profile[model]["fluent"]["tokens"]["context_completion"] > 0
+
+
+def test_shard_manifest_counts_examples_without_rereading(run_eval, monkeypatch):
+    passes = []
+    read = cli.iter_examples
+
+    def counting(*args, **kwargs):
+        passes.append(1)
+        return read(*args, **kwargs)
+
+    monkeypatch.setattr(cli, "iter_examples", counting)
+    run_eval("--run-name", "counted", "--shard-count", "2", "--shard-index", "0")
+    with open(os.path.join("outputs", "counted", "shard-0-of-2", MANIFEST_FILE), encoding="utf-8") as f:
+        assert json.load(f)["n_examples"] == 5
+    assert len(passes) == 2  # one pass per model, none just to count
+
+
+def test_existing_run_name_needs_resume(run_eval, capsys):
+    run_eval("--run-name", "taken", "--limit", "1")
+    with pytest.raises(SystemExit):
+        run_eval("--run-name", "taken", "--limit", "1")
+    assert "--resume" in capsys.readouterr().err
@@ -0,0 +1,19 @@
+from __future__ import annotations
+
+import pytest
+
+from rag_eval.data import build_examples, iter_examples, parse_shard
+
+
+def test_parse_shard():
+    assert parse_shard(None) == (0, 1)
+    assert parse_shard("1/4") == (1, 4)
+    for bad in ("3/2", "x", "1/x", "1", "-1/2"):
+        with pytest.raises(ValueError, match="Invalid shard"):
+            parse_shard(bad)
+
+
+def test_shards_partition_the_dataset():
+    queries = [ex.query for ex in build_examples()]
+    shards = [[ex.query for ex in iter_examples(shard=(i, 2))] for i in range(2)]
+    assert shards[0] == queries[0::2] and shards[1] == queries[1::2]
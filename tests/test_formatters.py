@@ -0,0 +1,49 @@
+from __future__ import annotations
+
+import pytest
+
+from rag_eval import formatters
+from rag_eval.data import Edge, Node, Path
+from rag_eval.formatters import MISMATCH, count_tokens, fit_paths, make_compact_context, make_concat_context
+
+
+def _path(*ids: str, rel: str = "r") -> Path:
+    return Path([Node(i, f"{i} text") for i in ids], [Edge(a, b, rel) for a, b in zip(ids, ids[1:])])
+
+
+def test_compact_context_shares_prefixes_and_mentions_text_once():
+    paths = [_path("A", "B", "C"), _path("A", "B", "D"), _path("C", "E"), _path("F", "A")]
+    assert make_compact_context(paths) == "\n".join([
+        "[A] A text",
+        "  --r→ [B] B text",
+        "    --r→ [C] C text",
+        "      --r→ [E] E text",  # a path starting at a placed node continues from it
+        "    --r→ [D] D text",
+        "[F] F text",
+        "  --r→ [A]",
+    ])
+
+
+def test_compact_context_flags_edges_that_do_not_join_their_nodes():
+    bad = Path([Node("A", "a"), Node("B", "b"), Node("C", "c")], [Edge("A", "X", "r")])
+    lines = make_compact_context([bad]).splitlines()
+    assert lines == ["[A] a", f"  --r {MISMATCH}→ [B] b", f"    --{MISMATCH}→ [C] c"]
+    assert MISMATCH in make_concat_context([bad])
+
+
+def test_count_tokens_falls_back_to_a_character_estimate(monkeypatch):
+    monkeypatch.setattr(formatters, "_encoding", lambda: None)
+    assert [count_tokens(t) for t in ("", "abc", "abcd", "abcde")] == [0, 1, 1, 2]
+
+
+@pytest.mark.parametrize("budget", [1, 12, 20, 30, 1000])
+def test_fit_paths_keeps_the_longest_prefix_within_budget(monkeypatch, budget):
+    monkeypatch.setattr(formatters, "_encoding", lambda: None)
+    paths = [_path(str(i), str(i + 1)) for i in range(0, 20, 2)]
+    kept = fit_paths(paths, make_concat_context, budget)
+    assert kept == paths[:len(kept)] and len(kept) >= 1  # the top path stays even over budget
+    if len(kept) > 1:
+        assert count_tokens(make_concat_context(kept)) <= budget
+    if len(kept) < len(paths):
+        assert count_tokens(make_concat_context(paths[:len(kept) + 1])) > budget
+    assert fit_paths(paths, make_concat_context, None) == paths
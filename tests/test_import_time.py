@@ -0,0 +1,14 @@
+from __future__ import annotations
+import os
+import subprocess
+import sys
+
+# Loaded only once needed (scoring, API calls, result tables, the mock server); see benchmarks/bench_import_time.py.
+HEAVY_MODULES = ("torch", "bert_score", "rouge_score", "sacrebleu", "numpy", "pyarrow", "openai", "http.server")
+
+
+def test_cli_import_stays_light():
+    code = f"import sys, rag_eval.cli; print(' '.join(m for m in {HEAVY_MODULES!r} if m in sys.modules))"
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    out = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True, cwd=root).stdout
+    assert out.split() == []
@@ -0,0 +1,25 @@
+from __future__ import annotations
+
+from rouge_score import rouge_scorer
+
+from rag_eval.data import build_examples
+from rag_eval.metrics import bleu_multi_ref, reference_index, rouge_best
+
+
+def _pairs():
+    examples = build_examples()
+    for ex in examples:
+        hyps = list(ex.gold_refs) + [r for other in examples if other is not ex for r in other.gold_refs[:1]]
+        hyps += ["", "Mercury.", ex.query, ex.gold_refs[0].upper(), "the the the the sun sun 42 4.5 billion-year"]
+        for hyp in hyps:
+            yield hyp, ex.gold_refs
+
+
+def test_reference_index_matches_the_reference_scorers():
+    rouge = rouge_scorer.RougeScorer(["rouge1", "rougeL"], use_stemmer=True)
+    for hyp, refs in _pairs():
+        index = reference_index(refs)
+        expected = rouge_best(hyp, refs, rouge)
+        got = (index.rouge(hyp)["rouge1"], index.rouge(hyp)["rougeL"], index.bleu(hyp))
+        want = (expected["rouge1"], expected["rougeL"], bleu_multi_ref(hyp, refs))
+        assert [f"{v:.4f}" for v in got] == [f"{v:.4f}" for v in want], hyp
@@ -0,0 +1,35 @@
+from __future__ import annotations
+from types import SimpleNamespace
+
+from rag_eval.cache import ResponseCache
+from rag_eval.openai_client import Chat
+
+MESSAGES = [{"role": "user", "content": "Question: ?"}]
+
+
+class _Completions:
+    def __init__(self, response):
+        self.response = response
+
+    def create(self, **kwargs):
+        return self.response
+
+
+def _chat_returning(response, **kw) -> Chat:
+    chat = Chat(api_key="test", **kw)
+    chat.client = SimpleNamespace(chat=SimpleNamespace(completions=_Completions(response)))
+    return chat
+
+
+def test_response_without_choices_is_an_error_not_a_crash(tmp_path):
+    cache = ResponseCache(str(tmp_path))
+    chat = _chat_returning(SimpleNamespace(choices=[], usage=None), cache=cache)
+    text = chat.call(MESSAGES, "m")
+    assert text.startswith("[ERROR: IndexError") and chat.last_info().error == text
+    assert chat.stats()["m"]["failures"] == 1
+    assert cache.writes == 0
+
+
+def test_malformed_message_is_an_error():
+    chat = _chat_returning(SimpleNamespace(choices=[SimpleNamespace()], usage=None))
+    assert chat.call(MESSAGES, "m").startswith("[ERROR: AttributeError")
@@ -0,0 +1,21 @@
+from __future__ import annotations
+
+from rag_eval.data import Edge, Node, Path, build_examples
+from rag_eval.formatters import linearize_path
+from rag_eval.pathstore import PathStore
+
+
+def test_views_match_paths():
+    paths = [p for ex in build_examples() for p in ex.paths]
+    store = PathStore.from_paths(paths)
+    assert [linearize_path(v) for v in store] == [linearize_path(p) for p in paths]
+
+
+def test_node_text_fills_blank_edge_endpoint():
+    a, b, c = Node("A", "alpha"), Node("B", "beta"), Node("C", "gamma")
+    store = PathStore()
+    store.add_path(Path([a, b], [Edge("A", "C", "r")]))  # C is only known as an edge endpoint so far
+    store.add_path(Path([c], []))
+    assert store[1].nodes == [c]
+    store.add_node("C", "")  # a blank text never overwrites a real one
+    assert store.node_table[store.add_node("C", "other")].text == "gamma"
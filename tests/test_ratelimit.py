@@ -0,0 +1,107 @@
+from __future__ import annotations
+import time
+
+from rag_eval.data import build_examples
+from rag_eval.openai_client import Chat
+from rag_eval.ratelimit import RateLimiter, RetryPolicy, TokenBucket
+from rag_eval.scheduler import GridScheduler, WorkUnit
+
+MESSAGES = [{"role": "system", "content": "You are a careful QA assistant."},
+            {"role": "user", "content": 'Context:\n"""Mercury is the closest planet to the Sun."""\n\nQuestion: ?'}]
+
+
+def _chat(server, **kw) -> Chat:
+    return Chat(api_key="test", base_url=server.base_url, **kw)
+
+
+def _times(server, model, status=None):
+    return [t for t, m, s in server.config.log if m == model and (status is None or s == status)]
+
+
+def test_retries_honour_retry_after(mock_server):
+    server = mock_server(script={"m": ["429", "429"]}, retry_after_ms=150)
+    chat = _chat(server, retry=RetryPolicy(max_retries=3))
+    text = chat.call(MESSAGES, "m")
+    assert not text.startswith("[ERROR")
+    assert chat.last_info().retries == 2
+    sent = _times(server, "m")
+    assert len(sent) == 3 and all(b - a >= 0.15 for a, b in zip(sent, sent[1:]))
+    st = chat.stats()["m"]
+    assert (st["rate_limited"], st["retries"], st["failures"]) == (2, 2, 0)
+
+
+def test_gives_up_after_max_retries(mock_server):
+    server = mock_server(script={"m": ["500"] * 3})
+    chat = _chat(server, retry=RetryPolicy(max_retries=2, base_delay=0.01))
+    assert chat.call(MESSAGES, "m").startswith("[ERROR: InternalServerError")
+    st = chat.stats()["m"]
+    assert (st["retries"], st["failures"]) == (2, 1)
+
+
+def test_breaker_opens_after_consecutive_failures(mock_server):
+    server = mock_server(script={"m": ["500", "500"]})
+    limiter = RateLimiter(breaker_threshold=2, breaker_cooldown=0.3)
+    chat = _chat(server, limiter=limiter, retry=RetryPolicy(max_retries=0))
+    assert chat.call(MESSAGES, "m").startswith("[ERROR")
+    assert chat.call(MESSAGES, "m").startswith("[ERROR")
+    assert not chat.call(MESSAGES, "m").startswith("[ERROR")  # waits out the cooldown first
+    sent = _times(server, "m")
+    assert sent[2] - sent[1] >= 0.3
+    st = chat.stats()["m"]
+    assert st["breaker_opens"] == 1 and st["breaker_wait_s"] > 0
+
+
+def test_open_breaker_pauses_only_its_model(mock_server, settings):
+    # Two pool workers. While "bad" waits out its breaker, its calls must not sit on them.
+    server = mock_server(script={"bad": ["500", "500"]})
+    chat = _chat(server, limiter=RateLimiter(breaker_threshold=2, breaker_cooldown=0.5),
+                 retry=RetryPolicy(max_retries=3, base_delay=0.01))
+    ex = build_examples()[0]
+    units = [WorkUnit("bad", i, ex, ("concat",)) for i in (1, 2)] + [WorkUnit("good", i, ex, ("concat",)) for i in range(1, 7)]
+    with GridScheduler(chat, settings, concurrency=2, memo_size=0) as sched:
+        t0 = time.perf_counter()
+        subs = [sched.submit(u) for u in units]
+        good = [s.answers["concat"].result() for s in subs[2:]]
+        good_done = time.perf_counter() - t0
+        bad = [s.answers["concat"].result() for s in subs[:2]]
+        bad_done = time.perf_counter() - t0
+    assert not any(text.startswith("[ERROR") for text, _ in good + bad)
+    assert good_done < 0.3 <= 0.5 <= bad_done
+    assert sum(info.retries for _, info in bad) == 2
+
+
+def test_throttled_model_does_not_hold_the_pool(mock_server, settings):
+    server = mock_server()
+    limiter = RateLimiter(rpm=60)
+    limiter.for_model("budget").requests.reserve(60)  # spent: the next request waits ~1 s
+    chat = _chat(server, limiter=limiter)
+    ex = build_examples()[0]
+    with GridScheduler(chat, settings, concurrency=1) as sched:
+        t0 = time.perf_counter()
+        throttled = sched.submit(WorkUnit("budget", 1, ex, ("concat",)))
+        free = sched.submit(WorkUnit("free", 1, ex, ("concat",)))
+        free.answers["concat"].result()
+        free_done = time.perf_counter() - t0
+        _, info = throttled.answers["concat"].result()
+    assert free_done < 0.5
+    assert info.queue_s >= 0.9 and info.service_s < 0.5
+    assert chat.stats()["budget"]["throttled"] == 1
+
+
+def test_token_bucket_reserve():
+    bucket = TokenBucket(rate_per_min=60, capacity=2)  # one token per second
+    assert bucket.reserve(1) == 0 and bucket.reserve(1) == 0
+    assert 0.9 < bucket.reserve(1) <= 1.0
+
+
+def test_breaker_wait_is_counted_once_per_opening():
+    class ServerError(Exception):
+        status_code = 500
+
+    throttle = RateLimiter(breaker_threshold=1, breaker_cooldown=0.3).for_model("m")
+    throttle.on_failure(ServerError(), will_retry=True)
+    polls = [throttle.pause() for _ in range(5)]  # deferred calls re-polling the same open breaker
+    time.sleep(0.1)
+    polls.append(throttle.pause())
+    assert all(0 < p <= 0.3 for p in polls)
+    assert 0.25 < throttle.stats["breaker_wait_s"] <= 0.3
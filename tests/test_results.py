@@ -0,0 +1,107 @@
+from __future__ import annotations
+
+import csv
+import math
+import os
+
+import numpy as np
+import pytest
+
+from rag_eval.results import ResultTable, write_parquet
+from rag_eval.runner import OUTPUT_BASENAME, write_csvs
+
+# Paired rouge1 deltas (fluent - concat) 0.1, -0.1, 0.3: of the 8 sign flips, |sum| >= 0.3 for
+# 6 (exact p = 0.75). rougeL deltas 0.1 .. 0.5 are all positive: only the all-plus and the
+# all-minus flips are as extreme (exact p = 2 / 2**5).
+CONCAT = {"rouge1": [0.2, 0.5, 0.4, 0.1, 0.1], "rougeL": [0.0, 0.1, 0.2, 0.3, 0.4]}
+FLUENT = {"rouge1": [0.3, 0.4, 0.7, None, 0.1], "rougeL": [0.1, 0.3, 0.5, 0.7, 0.9]}
+
+
+def _rows():
+    rows = []
+    for i in range(5):
+        for mode, vals in (("concat", CONCAT), ("fluent", FLUENT)):
+            rows.append({
+                "model": "m", "mode": mode, "example": str(i + 1), "rouge1": vals["rouge1"][i],
+                "rougeL": vals["rougeL"][i], "bleu": 0.25, "bertscore_f1": None,
+                "context_tokens": "100", "latency_s": f"{i + 1:.6f}",
+            })
+    return rows
+
+
+def _deltas(**kw):
+    out = ResultTable.from_rows(_rows()).paired_deltas(["rouge1", "rougeL"], **kw)
+    return {d["metric"]: d for d in out}
+
+
+def test_paired_deltas_match_hand_computed_means():
+    d = _deltas(n_boot=0)
+    # example 4 has no fluent rouge1 and example 5 is a tie, so rouge1 pairs over 1, 2, 3 and 5
+    # (the pair is dropped for every metric of the call)
+    assert d["rouge1"]["n_pairs"] == d["rougeL"]["n_pairs"] == 4
+    assert d["rouge1"]["mean_concat"] == pytest.approx(0.3)
+    assert d["rouge1"]["mean_fluent"] == pytest.approx(0.375)
+    assert d["rouge1"]["mean_delta"] == pytest.approx(0.075)
+    assert d["rougeL"]["mean_delta"] == pytest.approx((0.1 + 0.2 + 0.3 + 0.5) / 4)
+    assert all(math.isnan(d[m][k]) for m in d for k in ("ci_low", "ci_high", "p_value"))
+
+
+def test_sign_flip_pvalues_match_exact_enumeration():
+    table = ResultTable.from_rows([r for r in _rows() if r["example"] in ("1", "2", "3")])
+    [r1] = table.paired_deltas(["rouge1"], n_boot=20000, seed=1)
+    assert r1["n_pairs"] == 3 and r1["p_value"] == pytest.approx(0.75, abs=0.02)
+    [rl] = ResultTable.from_rows(_rows()).paired_deltas(["rougeL"], n_boot=20000, seed=1)
+    assert rl["n_pairs"] == 5 and rl["p_value"] == pytest.approx(2 / 32, abs=0.01)
+
+
+def test_bootstrap_ci_brackets_the_mean_within_the_observed_deltas():
+    d = _deltas(n_boot=5000, seed=0)
+    for metric, (lo, hi) in {"rouge1": (-0.1, 0.3), "rougeL": (0.1, 0.5)}.items():
+        row = d[metric]
+        assert lo <= row["ci_low"] < row["mean_delta"] < row["ci_high"] <= hi
+    assert d["rougeL"]["ci_low"] > 0  # every delta is positive
+    constant = [dict(r, rougeL=0.2 if r["mode"] == "fluent" else 0.0) for r in _rows()]
+    [row] = ResultTable.from_rows(constant).paired_deltas(["rougeL"], n_boot=200)
+    assert row["ci_low"] == pytest.approx(0.2) and row["ci_high"] == pytest.approx(0.2)
+
+
+def test_metrics_are_floats_until_written(tmp_path):
+    table = ResultTable.from_rows(_rows())
+    summary = {s["mode"]: s for s in table.summary()}
+    assert summary["concat"]["n_examples"] == 5
+    assert summary["concat"]["mean_rouge1"] == pytest.approx(0.26)
+    assert summary["fluent"]["mean_rouge1"] == pytest.approx(0.375)
+    assert math.isnan(summary["concat"]["mean_bertscore_f1"])
+
+    write_csvs(_rows(), table.summary(), str(tmp_path), table.paired_deltas(["rouge1"], n_boot=0))
+    with open(os.path.join(tmp_path, f"{OUTPUT_BASENAME}_detailed.csv"), newline="", encoding="utf-8") as f:
+        detailed = list(csv.DictReader(f))
+    assert [r["rouge1"] for r in detailed[:2]] == ["0.2000", "0.3000"]
+    assert detailed[7]["rouge1"] == "" and detailed[0]["bertscore_f1"] == ""
+    with open(os.path.join(tmp_path, f"{OUTPUT_BASENAME}_summary.csv"), newline="", encoding="utf-8") as f:
+        s = next(csv.DictReader(f))
+    assert (s["n_examples"], s["mean_rouge1"], s["mean_bertscore_f1"], s["mean_context_tokens"]) == ("5", "0.2600", "", "100.0")
+    with open(os.path.join(tmp_path, f"{OUTPUT_BASENAME}_delta.csv"), newline="", encoding="utf-8") as f:
+        d = next(csv.DictReader(f))
+    assert (d["n_pairs"], d["mean_delta"], d["ci_low"], d["p_value"]) == ("4", "0.0750", "", "")
+
+
+def test_parquet_keeps_types_and_full_precision(tmp_path):
+    pq = pytest.importorskip("pyarrow.parquet")
+    rows = _rows()
+    rows[0]["rouge1"] = 1 / 3
+    table = ResultTable.from_rows(rows)
+    paths = write_parquet(table, table.summary(), table.paired_deltas(["rouge1"], n_boot=50), str(tmp_path))
+
+    detailed = pq.read_table(paths[0])
+    assert str(detailed.schema.field("rouge1").type) == "double"
+    assert str(detailed.schema.field("example").type) == "int64"
+    rouge1 = detailed.column("rouge1").to_pylist()
+    assert rouge1[0] == 1 / 3 and rouge1[7] is None
+    assert detailed.column("example").to_pylist()[:3] == [1, 1, 2]
+
+    summary = pq.read_table(paths[1]).to_pylist()
+    assert summary[0]["n_examples"] == 5 and summary[0]["mean_bertscore_f1"] is None
+    assert summary[0]["mean_rouge1"] == pytest.approx((1 / 3 + 0.5 + 0.4 + 0.1 + 0.1) / 5, abs=1e-12)
+    [delta] = pq.read_table(paths[2]).to_pylist()
+    assert delta["n_pairs"] == 4 and np.isfinite(delta["ci_low"]) and 0 < delta["p_value"] <= 1
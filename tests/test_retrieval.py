@@ -0,0 +1,54 @@
+from __future__ import annotations
+
+import pytest
+
+from rag_eval.data import Example, build_examples
+from rag_eval.retrieval import Graph, PathRetriever, graph_from_paths, retrieve_examples
+
+
+@pytest.fixture(scope="module")
+def sample_graph():
+    return graph_from_paths(p for ex in build_examples() for p in ex.paths)
+
+
+def test_path_keeps_its_better_direction():
+    # Walked from hub A the edge to B scores alpha / 5, walked from leaf B it scores alpha / 1.
+    edges = [("A", "B", "r")] + [("A", f"x{i}", "r") for i in range(4)]
+    graph = Graph.from_edges([("A", "alpha"), ("B", "beta")], edges)
+    [(score, nodes, _)] = PathRetriever(graph, alpha=0.8, top_k=1).search(["A", "B"])
+    assert score == pytest.approx(0.8)
+    assert [graph.ids[u] for u in nodes] == ["B", "A"]
+
+
+def test_retrieve_examples_replaces_paths_and_times_them():
+    graph = Graph.from_edges([("A", "Mercury orbit"), ("B", "Mercury day")], [("A", "B", "r")])
+    timings = {}
+    [(i, ex)] = retrieve_examples([(3, Example("Mercury?", [], ["ref"]))], PathRetriever(graph), timings=timings)
+    assert i == 3 and ex.gold_refs == ["ref"]
+    assert [[n.id for n in p.nodes] for p in ex.paths] == [["A", "B"]]
+    assert list(timings) == [3]
+
+
+def test_match_nodes_ignores_stopwords_and_short_words():
+    graph = Graph.from_edges([("A", "the orbit of the planet"), ("B", "Mercury is a planet"), ("C", "it is in an AU")], [])
+    assert graph.match_nodes("What is the orbit of Mercury?", k=2) == ["A", "B"]
+    assert graph.match_nodes("is it an AU?") == []
+
+
+def test_single_seed_expands_its_neighbourhood():
+    graph = Graph.from_edges([], [("A", "B", "r"), ("B", "C", "r"), ("D", "E", "r")])
+    found = {tuple(graph.ids[u] for u in nodes) for _, nodes, _ in PathRetriever(graph).search(["A"])}
+    assert found == {("A", "B"), ("A", "B", "C")}
+
+
+@pytest.mark.parametrize("query", [ex.query for ex in build_examples()] + ["How are neural networks trained?"])
+def test_sample_graph_queries_retrieve_paths(sample_graph, query):
+    assert PathRetriever(sample_graph).retrieve(query)
+
+
+def test_retrieve_examples_counts_empty_retrievals(sample_graph):
+    empty = set()
+    items = [(1, Example("How are neural networks trained?", [], [])), (2, Example("zzz", [], []))]
+    out = dict(retrieve_examples(items, PathRetriever(sample_graph), empty=empty))
+    assert out[1].paths and not out[2].paths
+    assert empty == {2}
@@ -0,0 +1,81 @@
+from __future__ import annotations
+import dataclasses
+import time
+from collections import Counter
+
+import pytest
+
+from rag_eval.data import build_examples
+from rag_eval.scheduler import GridScheduler, ModelLimits, WorkUnit, parse_model_limits
+
+from conftest import FakeChat
+
+
+def _units(models, n, modes=("concat", "fluent")):
+    examples = build_examples()
+    return [WorkUnit(m, i + 1, examples[i % len(examples)], modes) for m in models for i in range(n)]
+
+
+def _wall(settings, concurrency: int) -> float:
+    chat = FakeChat({}, default=0.03)
+    t0 = time.perf_counter()
+    with GridScheduler(chat, settings, concurrency=concurrency) as sched:
+        results = list(sched.run(_units(["m1", "m2"], 4)))
+    assert len(results) == 8
+    return time.perf_counter() - t0
+
+
+def test_wall_clock_scales_with_concurrency(settings):
+    # 8 units x 3 calls of 30 ms: ~0.7 s one at a time, two calls deep (summary -> fluent answer) when parallel
+    serial, parallel = _wall(settings, 1), _wall(settings, 8)
+    assert parallel < serial / 3
+
+
+def test_results_in_submission_order(settings):
+    units = _units(["m1", "m2"], 3)
+    with GridScheduler(FakeChat({"m1": 0.02}), settings, concurrency=4) as sched:
+        out = [(r.unit.model, r.unit.index, tuple(r.answers)) for r in sched.run(units, window=2)]
+    assert out == [(u.model, u.index, u.modes) for u in units]
+
+
+def test_capped_model_does_not_hold_back_others(settings):
+    chat = FakeChat({"slow": 0.2, "fast": 0.01})
+    limits = ModelLimits(4, {"slow": 1})
+    with GridScheduler(chat, settings, concurrency=4, limits=limits) as sched:
+        t0 = time.perf_counter()
+        subs = [sched.submit(u) for u in _units(["slow"], 4, ("concat",)) + _units(["fast"], 6, ("concat",))]
+        for s in subs[4:]:
+            s.answers["concat"].result()
+        fast_done = time.perf_counter() - t0
+        for s in subs[:4]:
+            s.answers["concat"].result()
+    # the three waiting slow calls sit in the model's queue, not on pool threads
+    assert fast_done < 0.15
+    slow = sorted((t0_, t1_) for m, t0_, t1_ in chat.calls if m == "slow")
+    assert all(b[0] >= a[1] for a, b in zip(slow, slow[1:]))  # never two slow calls at once
+
+
+def test_parse_model_limits():
+    assert parse_model_limits(["gpt-4o=4", "a=b=2"]) == {"gpt-4o": 4, "a=b": 2}
+    for bad in ("gpt-4o", "=3", "gpt-4o=abc"):
+        with pytest.raises(ValueError):
+            parse_model_limits([bad])
+
+
+def test_fixed_summarizer_and_duplicate_examples_share_calls(settings):
+    settings = dataclasses.replace(settings, model_summarizer_fixed="sum")
+    ex1, ex2 = build_examples()[:2]
+    examples = [ex1, ex2, ex1]  # the third example repeats the first
+    units = [WorkUnit(m, i, ex, ("concat", "fluent")) for i, ex in enumerate(examples, 1) for m in ("m1", "m2")]
+    chat = FakeChat({})
+    with GridScheduler(chat, settings, concurrency=4) as sched:
+        results = list(sched.run(units))
+    calls = Counter(model for model, _, _ in chat.calls)
+    # one summary per distinct example for all models; per model, one concat + one fluent answer per distinct example
+    assert calls == {"sum": 2, "m1": 4, "m2": 4}
+    reused = [(r.unit.model, r.unit.index, r.meta["fluent"]["summary_reused"], r.meta["concat"]["answer_reused"]) for r in results]
+    assert reused == [
+        ("m1", 1, "0", "0"), ("m2", 1, "1", "0"), ("m1", 2, "0", "0"),
+        ("m2", 2, "1", "0"), ("m1", 3, "1", "1"), ("m2", 3, "1", "1"),
+    ]
+    assert results[4].answers == results[0].answers
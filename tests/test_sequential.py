@@ -0,0 +1,64 @@
+from __future__ import annotations
+import random
+from collections import Counter
+
+import pytest
+
+from rag_eval.sequential import SequentialMonitor, stratified_order, t_quantile
+
+
+def _rows(fluent: float, concat: float, error: bool = False):
+    return [
+        {"mode": "concat", "answer": "[ERROR: x]" if error else "a", "rougeL": f"{concat:.4f}"},
+        {"mode": "fluent", "answer": "a", "rougeL": f"{fluent:.4f}"},
+    ]
+
+
+def _feed(monitor: SequentialMonitor, deltas):
+    for i, d in enumerate(deltas, 1):
+        reason = monitor.update("m", i, _rows(0.5 + d, 0.5))
+        if reason:
+            return reason, i
+    return None, len(deltas)
+
+
+@pytest.mark.parametrize("p,df,expected", [(0.975, 1, 12.7062), (0.975, 10, 2.2281), (0.995, 4, 4.6041), (0.975, 1000, 1.9623)])
+def test_t_quantile_matches_tables(p, df, expected):
+    assert t_quantile(p, df) == pytest.approx(expected, abs=1e-4)
+
+
+def test_two_examples_do_not_decide_what_a_z_interval_would():
+    # mean 0.2, standard error 0.1: z gives [0.004, 0.396], t with 1 df spans zero
+    reason, _ = _feed(SequentialMonitor(min_examples=2), [0.1, 0.3])
+    assert reason is None
+
+
+def test_clear_difference_stops_at_the_first_look():
+    rng = random.Random(0)
+    monitor = SequentialMonitor(min_examples=10, check_every=5, max_looks=5)
+    reason, n = _feed(monitor, [0.1 + rng.gauss(0, 0.02) for _ in range(40)])
+    assert (reason, n) == ("significant", 10)
+    assert monitor.stopped("m") and monitor.report()["models"]["m"]["ci"][0] > 0
+
+
+def test_no_difference_runs_on_unless_below_min_effect():
+    rng = random.Random(1)
+    deltas = [rng.gauss(0, 0.01) for _ in range(40)]
+    assert _feed(SequentialMonitor(min_examples=10, check_every=5, max_looks=7), deltas) == (None, 40)
+    reason, n = _feed(SequentialMonitor(min_examples=10, check_every=5, max_looks=7, min_effect=0.05), deltas)
+    assert reason == "below_min_effect" and n == 10
+
+
+def test_consecutive_errors_stop_a_model():
+    monitor = SequentialMonitor(enabled=False, max_errors=2)
+    assert monitor.update("m", 1, _rows(0.5, 0.5, error=True)) is None  # the fluent row resets the count
+    assert monitor.update("m", 2, [{"mode": "concat", "answer": "[ERROR: x]"}, {"mode": "fluent", "answer": "[ERROR: y]"}]) == "errors"
+
+
+def test_stratified_order_keeps_every_prefix_balanced():
+    strata = ["a"] * 30 + ["b"] * 10
+    order = stratified_order(strata, seed=3)
+    assert sorted(order) == list(range(40))
+    assert order == stratified_order(strata, seed=3) and order != stratified_order(strata, seed=4)
+    for k in range(1, 41):
+        assert abs(Counter(strata[i] for i in order[:k])["b"] - k / 4) <= 1
@@ -0,0 +1,48 @@
+from __future__ import annotations
+
+from rag_eval.cache import ResponseCache
+from rag_eval.data import build_examples
+from rag_eval.openai_client import Chat
+from rag_eval.ratelimit import RetryPolicy
+from rag_eval.runner import FinalLineWatcher
+from rag_eval.scheduler import GridScheduler, WorkUnit
+
+MESSAGES = [{"role": "system", "content": "You are a careful QA assistant."},
+            {"role": "user", "content": 'Context:\n"""Mercury is the closest planet to the Sun."""\n\nQuestion: ?'}]
+
+
+def _feed(watcher, deltas):
+    return [watcher.feed(d) for d in deltas]
+
+
+def test_watcher_waits_out_a_decimal_split_across_deltas():
+    deltas = ["Facts:\n- x\nSynthesis: a b.\n", "Mercury orbits the Sun in about 87", ".", "97 days", ".", "\n"]
+    got = _feed(FinalLineWatcher(min_words=5), deltas)
+    assert got[:-1] == [None] * 5
+    assert got[-1] == "Mercury orbits the Sun in about 87.97 days."
+
+
+def test_watcher_leaves_a_sentence_ending_the_stream_to_the_caller():
+    assert _feed(FinalLineWatcher(min_words=3), ["Synthesis: a.\n", "It takes 88 days."]) == [None, None]
+
+
+def test_broken_stream_is_an_error_and_not_cached(mock_server, tmp_path):
+    server = mock_server(script={"m": ["cut"]})
+    cache = ResponseCache(str(tmp_path))
+    chat = Chat(api_key="test", base_url=server.base_url, cache=cache, retry=RetryPolicy(max_retries=0), stream=True)
+    text = chat.call(MESSAGES, "m")
+    assert text.startswith("[ERROR") and chat.last_info().error == text
+    assert cache.writes == 0
+    text = chat.call(MESSAGES, "m")  # the script is used up: a complete response
+    assert not text.startswith("[ERROR") and chat.last_info().cache == "miss"
+    assert cache.writes == 1
+
+
+def test_broken_summary_fails_the_fluent_answer(mock_server, settings):
+    server = mock_server(script={"m1": ["cut"]})
+    chat = Chat(api_key="test", base_url=server.base_url, retry=RetryPolicy(max_retries=0))
+    ex = build_examples()[0]
+    with GridScheduler(chat, settings, concurrency=2, fluent_final_line=True) as sched:
+        [res] = list(sched.run([WorkUnit("m1", 1, ex, ("fluent",))]))
+    assert res.answers["fluent"].startswith("[ERROR")
+    assert [m for _, m, _ in server.config.log] == ["m1"]  # no answer was requested from the error